@@ -1,10 +1,114 @@
-from fastapi import APIRouter, Request, Response
+import asyncio
+from fastapi import APIRouter, Request, Response, WebSocket
+from fastapi.responses import FileResponse
+from app.core.config import settings
+from app.services import twiml
+from app.services.intent_router import CANNED_RESPONSES
 from app.services.twilio_service import TwilioService
 from app.services.conversation_manager import ConversationManager
 from app.services.deepgram_service import DeepgramService
+from app.services.session_registry import call_sessions
+from app.services.media_stream import MediaStreamHandler
+from app.services.tenant_resolver import tenant_resolver
+from app.services.tts_cache import tts_cache
 
 twilio_router = APIRouter()
 
+# Stop background work for calls that have ended or expired
+call_sessions.add_completion_hook(lambda call_sid, manager, reason: manager.close())
+
+# How long a continuation request waits for more of the response before polling again
+SPEECH_CONTINUE_TIMEOUT = 8.0
+
+def _get_conversation_manager(call_sid, tenant=None):
+    """
+    Get the conversation manager for a call, creating it on the first turn
+    """
+    return call_sessions.get_or_create(
+        call_sid,
+        lambda: ConversationManager(call_sid=call_sid, tenant=tenant)
+    )
+
+async def _get_call_conversation(call_sid, to_number):
+    """
+    Get the conversation manager for a call, resolving the tenant that owns
+    the dialed number only if the call has no session yet
+    """
+    conversation_manager = call_sessions.get(call_sid)
+    if conversation_manager is None:
+        tenant = await tenant_resolver.resolve(to_number)
+        conversation_manager = _get_conversation_manager(call_sid, tenant)
+    return conversation_manager
+
+def _templates_for(tenant):
+    """
+    Compiled TwiML templates for a call's tenant
+    """
+    return twiml.compile_templates(tenant.greeting if tenant else None)
+
+async def _speech_verbs(request, templates, phrases):
+    """
+    TwiML verbs speaking each phrase: <Play> of cached audio when the TTS
+    cache has it, otherwise <Say>.
+    
+    Only the fixed prompts and canned responses, which every call repeats,
+    are worth waiting for (up to the render timeout). Any other phrase that
+    is not cached yet, such as a new LLM sentence, is spoken with <Say>
+    right away. If it comes up again (e.g. as a cached response) it is
+    rendered in the background, so later calls play the audio; one-off
+    sentences are never synthesized.
+    """
+    if not settings.TTS_CACHE_ENABLED or not phrases:
+        return {phrase: templates.say(phrase) for phrase in phrases}
+    
+    def play(name):
+        return twiml.play(f"https://{request.url.netloc}/webhook/twilio/audio/{name}")
+    
+    async def speak(phrase):
+        name = tts_cache.cached(phrase)
+        if name is not None:
+            return play(name)
+        
+        if phrase not in templates.prompts and phrase not in CANNED_RESPONSES:
+            tts_cache.warm(phrase)
+            return templates.say(phrase)
+        
+        try:
+            name = await asyncio.wait_for(tts_cache.get(phrase), settings.TTS_RENDER_TIMEOUT_SECONDS)
+        except Exception:
+            # Renders that miss the deadline keep going in the background
+            return templates.say(phrase)
+        return play(name)
+    
+    unique = list(dict.fromkeys(phrases))
+    verbs = await asyncio.gather(*(speak(phrase) for phrase in unique))
+    return dict(zip(unique, verbs))
+
+def _call_ending(conversation_manager):
+    """
+    The verb that ends the call after the current turn (hang up or transfer), if any
+    """
+    if conversation_manager is None:
+        return None
+    tenant = conversation_manager.tenant
+    return twiml.call_ending(conversation_manager.call_action, tenant.transfer_number if tenant else None)
+
+async def _render_speech_twiml(request, templates, sentences, finished, error=None, turn=None, ending=None):
+    """
+    Render TwiML that speaks the given sentences, then either gathers the
+    caller's next utterance, redirects back for the rest of the response,
+    or ends the call with the given ending verb
+    """
+    if error and not sentences:
+        sentences = [twiml.ERROR_PROMPT]
+    
+    follow_up = [twiml.FOLLOW_UP_PROMPT] if finished and not ending else []
+    verbs = await _speech_verbs(request, templates, list(sentences) + follow_up)
+    return templates.turn(
+        (verbs[sentence] for sentence in sentences), finished,
+        speak=verbs.get, turn_number=turn, ending=ending
+    )
+
 @twilio_router.post("/voice")
 async def twilio_voice_webhook(request: Request):
     """
@@ -15,16 +119,33 @@ async def twilio_voice_webhook(request: Request):
     from_number = form_data.get("From")
     to_number = form_data.get("To")
     
-    # Find the user and configuration based on the Twilio number
-    # Implementation would look up user_id and config
+    # Find the tenant and its configuration from the dialed number (cached)
+    tenant = await tenant_resolver.resolve(to_number)
+    
+    # Set up the call session now so services and the knowledge base are warm for the first turn
+    _get_conversation_manager(call_sid, tenant)
     
     # Initialize Twilio service
-    twilio_service = TwilioService()
+    twilio_service = TwilioService(config=tenant.integration("twilio") if tenant else None)
+    
+    # Stream call audio over a WebSocket when media streams are enabled
+    stream_url = None
+    if settings.TWILIO_MEDIA_STREAMS_ENABLED:
+        stream_url = f"wss://{request.url.netloc}/webhook/twilio/media"
+    
+    # Speak the tenant's greeting, from cached audio when available
+    templates = _templates_for(tenant)
+    verbs = await _speech_verbs(request, templates, [templates.greeting, twiml.LISTEN_PROMPT])
     
     # Generate TwiML response
-    twiml = twilio_service.handle_incoming_call(call_sid, from_number, to_number)
+    content = twilio_service.handle_incoming_call(
+        call_sid, from_number, to_number,
+        stream_url=stream_url,
+        templates=templates,
+        speak=verbs.get
+    )
     
-    return Response(content=twiml, media_type="application/xml")
+    return Response(content=content, media_type="application/xml")
 
 @twilio_router.post("/speech")
 async def twilio_speech_webhook(request: Request):
@@ -35,28 +156,96 @@ async def twilio_speech_webhook(request: Request):
     call_sid = form_data.get("CallSid")
     speech_result = form_data.get("SpeechResult")
     
-    # Find user_id and knowledge_base_id for this call
-    # Implementation would lookup this information
+    # Reuse the conversation manager (and its warm services) across turns
+    conversation_manager = await _get_call_conversation(call_sid, form_data.get("To"))
+    
+    # Start generating and speak the first sentence as soon as it is ready
+    speech_stream = conversation_manager.start_speech_stream(speech_result)
+    templates = _templates_for(conversation_manager.tenant)
     
-    # Initialize conversation manager
-    conversation_manager = ConversationManager(
-        call_sid=call_sid,
-        user_id="user_id_here",
-        knowledge_base_id="knowledge_base_id_here"
+    if settings.TWILIO_ASYNC_TURNS_ENABLED:
+        # Don't hold the webhook through retrieval and the LLM: unless the
+        # answer is ready almost at once (e.g. cached), speak a filler and
+        # have Twilio come back for the answer to this turn
+        sentences, finished = await speech_stream.next_batch(timeout=settings.TWILIO_FILLER_AFTER_SECONDS)
+        if not sentences and not finished:
+            verbs = await _speech_verbs(request, templates, [twiml.FILLER_PROMPT])
+            content = templates.turn([verbs[twiml.FILLER_PROMPT]], False, turn_number=speech_stream.turn)
+            return Response(content=content, media_type="application/xml")
+    else:
+        sentences, finished = await speech_stream.next_batch()
+    
+    content = await _render_speech_twiml(
+        request, templates, sentences, finished, speech_stream.error,
+        turn=speech_stream.turn, ending=_call_ending(conversation_manager)
     )
     
-    # Process user input
-    response = await conversation_manager.process_user_input(speech_result)
+    return Response(content=content, media_type="application/xml")
+
+@twilio_router.post("/speech/continue")
+async def twilio_speech_continue_webhook(request: Request):
+    """
+    Speak the next part of a response that is still being generated. The
+    turn query parameter names the caller turn being answered; a response
+    that has since been superseded is not spoken.
+    """
+    form_data = await request.form()
+    call_sid = form_data.get("CallSid")
+    turn = request.query_params.get("turn")
+    turn = int(turn) if turn and turn.isdigit() else None
+    
+    conversation_manager = call_sessions.get(call_sid)
+    speech_stream = conversation_manager.get_speech_stream(turn) if conversation_manager else None
     
-    # Generate TwiML with response
-    twiml = f"""
-    <?xml version="1.0" encoding="UTF-8"?>
-    <Response>
-        <Say>{response}</Say>
-        <Gather input="speech" action="/webhook/twilio/speech" method="POST" speechTimeout="auto" speechModel="phone_call">
-            <Say>Anything else I can help you with?</Say>
-        </Gather>
-    </Response>
+    if speech_stream is None:
+        sentences, finished, error = [], True, None
+    else:
+        sentences, finished = await speech_stream.next_batch(timeout=SPEECH_CONTINUE_TIMEOUT)
+        error = speech_stream.error
+    
+    templates = _templates_for(conversation_manager.tenant if conversation_manager else None)
+    ending = _call_ending(conversation_manager) if speech_stream is not None else None
+    content = await _render_speech_twiml(request, templates, sentences, finished, error, turn=turn, ending=ending)
+    
+    return Response(content=content, media_type="application/xml")
+
+@twilio_router.get("/audio/{name}")
+async def twilio_audio(name: str):
     """
+    Serve synthesized speech from the TTS cache. Files are named by the hash
+    of their content, so they never change and can be cached forever.
+    """
+    path = tts_cache.path(name)
+    if path is None:
+        return Response(status_code=404)
+    
+    return FileResponse(
+        path,
+        media_type=tts_cache.media_type(name),
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
+
+@twilio_router.websocket("/media")
+async def twilio_media_stream(websocket: WebSocket):
+    """
+    Handle a bidirectional Twilio Media Streams connection
+    """
+    await websocket.accept()
+    
+    handler = MediaStreamHandler(websocket, DeepgramService(), _get_conversation_manager)
+    await handler.run()
+
+@twilio_router.post("/status")
+async def twilio_status_webhook(request: Request):
+    """
+    Handle Twilio call status callback
+    """
+    form_data = await request.form()
+    call_sid = form_data.get("CallSid")
+    call_status = form_data.get("CallStatus")
+    
+    # Release the call session once the call is over
+    if call_status in ("completed", "busy", "failed", "no-answer", "canceled"):
+        await call_sessions.complete(call_sid, reason=call_status)
     
-    return Response(content=twiml, media_type="application/xml")
+    return Response(status_code=204)
@@ -25,13 +25,99 @@ class Settings(BaseSettings):
     # Twilio
     TWILIO_ACCOUNT_SID: str = os.getenv("TWILIO_ACCOUNT_SID", "")
     TWILIO_AUTH_TOKEN: str = os.getenv("TWILIO_AUTH_TOKEN", "")
+    TWILIO_MEDIA_STREAMS_ENABLED: bool = os.getenv("TWILIO_MEDIA_STREAMS_ENABLED", "False").lower() == "true"
+    # Answer speech webhooks at once with filler audio and a redirect, instead
+    # of holding the request open until the first sentence is ready
+    TWILIO_ASYNC_TURNS_ENABLED: bool = os.getenv("TWILIO_ASYNC_TURNS_ENABLED", "False").lower() == "true"
+    # How long a speech webhook waits for the answer before speaking the filler
+    TWILIO_FILLER_AFTER_SECONDS: float = float(os.getenv("TWILIO_FILLER_AFTER_SECONDS", "0.3"))
     
     # OpenAI
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4")
     
+    # Turn pipeline stage timeouts
+    RETRIEVAL_TIMEOUT_SECONDS: float = float(os.getenv("RETRIEVAL_TIMEOUT_SECONDS", "0.8"))
+    
+    # Knowledge-base context assembly
+    RETRIEVAL_TOP_K: int = int(os.getenv("RETRIEVAL_TOP_K", "8"))
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "800"))
+    CONTEXT_MMR_LAMBDA: float = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))
+    
+    # Local intent routing (short, formulaic utterances skip retrieval and the LLM)
+    INTENT_ROUTER_ENABLED: bool = os.getenv("INTENT_ROUTER_ENABLED", "True").lower() == "true"
+    INTENT_MIN_CONFIDENCE: float = float(os.getenv("INTENT_MIN_CONFIDENCE", "0.8"))
+    INTENT_MAX_WORDS: int = int(os.getenv("INTENT_MAX_WORDS", "8"))
+    
+    # Write-behind message persistence
+    MESSAGE_WRITER_MAX_BUFFER: int = int(os.getenv("MESSAGE_WRITER_MAX_BUFFER", "10000"))
+    MESSAGE_WRITER_BATCH_SIZE: int = int(os.getenv("MESSAGE_WRITER_BATCH_SIZE", "200"))
+    MESSAGE_WRITER_FLUSH_SECONDS: float = float(os.getenv("MESSAGE_WRITER_FLUSH_SECONDS", "0.5"))
+    
+    # Conversation history
+    HISTORY_TOKEN_BUDGET: int = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))
+    HISTORY_KEEP_RECENT_MESSAGES: int = int(os.getenv("HISTORY_KEEP_RECENT_MESSAGES", "6"))
+    
+    # LLM response cache
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "4096"))
+    RESPONSE_CACHE_TTL_SECONDS: int = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "900"))
+    RESPONSE_CACHE_HISTORY_MESSAGES: int = int(os.getenv("RESPONSE_CACHE_HISTORY_MESSAGES", "2"))
+    
+    # Knowledge base vector store
+    EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
+    EMBEDDING_BATCH_MAX_SIZE: int = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "64"))
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))
+    EMBEDDING_CACHE_SIZE: int = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+    VECTOR_STORE_DIR: str = os.getenv("VECTOR_STORE_DIR", "data/vector_store")
+    VECTOR_STORAGE_MODE: str = os.getenv("VECTOR_STORAGE_MODE", "float32")  # "float32", "float16" or "int8"
+    QUANTIZED_RERANK_FACTOR: int = int(os.getenv("QUANTIZED_RERANK_FACTOR", "8"))
+    INDEX_MEMORY_BUDGET_MB: int = int(os.getenv("INDEX_MEMORY_BUDGET_MB", "2048"))
+    VECTOR_SEARCH_MODE: str = os.getenv("VECTOR_SEARCH_MODE", "exact")  # "exact" or "approximate"
+    ANN_MIN_ROWS: int = int(os.getenv("ANN_MIN_ROWS", "20000"))
+    ANN_NPROBE: int = int(os.getenv("ANN_NPROBE", "8"))
+    ANN_RERANK_FACTOR: int = int(os.getenv("ANN_RERANK_FACTOR", "10"))
+    ANN_PQ_SUBVECTORS: int = int(os.getenv("ANN_PQ_SUBVECTORS", "0"))
+    HYBRID_CANDIDATE_FACTOR: int = int(os.getenv("HYBRID_CANDIDATE_FACTOR", "4"))
+    HYBRID_RRF_K: int = int(os.getenv("HYBRID_RRF_K", "60"))
+    LEXICAL_IDENTIFIER_MAX_DF: int = int(os.getenv("LEXICAL_IDENTIFIER_MAX_DF", "20"))
+    
+    # Document ingestion
+    CHUNK_MAX_TOKENS: int = int(os.getenv("CHUNK_MAX_TOKENS", "256"))
+    CHUNK_OVERLAP_TOKENS: int = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+    INGEST_EXTRACT_WORKERS: int = int(os.getenv("INGEST_EXTRACT_WORKERS", "2"))
+    INGEST_EMBED_BATCH_SIZE: int = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "64"))
+    INGEST_EMBED_CONCURRENCY: int = int(os.getenv("INGEST_EMBED_CONCURRENCY", "4"))
+    
+    # Outbound API clients (connection pools per provider and credential)
+    CLIENT_REGISTRY_MAX_CLIENTS: int = int(os.getenv("CLIENT_REGISTRY_MAX_CLIENTS", "256"))
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "60"))
+    HTTP_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_TIMEOUT_SECONDS", "30"))
+    HTTP2_ENABLED: bool = os.getenv("HTTP2_ENABLED", "True").lower() == "true"
+    
     # Deepgram
     DEEPGRAM_API_KEY: str = os.getenv("DEEPGRAM_API_KEY", "")
+    TTS_VOICE: str = os.getenv("TTS_VOICE", "aura-asteria-en")
+    
+    # Synthesized speech cache (content-addressed audio files served to Twilio)
+    TTS_CACHE_ENABLED: bool = os.getenv("TTS_CACHE_ENABLED", "False").lower() == "true"
+    TTS_CACHE_DIR: str = os.getenv("TTS_CACHE_DIR", "data/tts_cache")
+    TTS_CACHE_MAX_MB: int = int(os.getenv("TTS_CACHE_MAX_MB", "1024"))
+    TTS_RENDER_TIMEOUT_SECONDS: float = float(os.getenv("TTS_RENDER_TIMEOUT_SECONDS", "1.5"))
+    # Background renders of repeated phrases: at most this many at once
+    TTS_WARM_CONCURRENCY: int = int(os.getenv("TTS_WARM_CONCURRENCY", "4"))
+    TTS_WARM_TRACKED_PHRASES: int = int(os.getenv("TTS_WARM_TRACKED_PHRASES", "10000"))
+    
+    # Tenant resolution (dialed number -> tenant config)
+    TENANT_CACHE_TTL_SECONDS: int = int(os.getenv("TENANT_CACHE_TTL_SECONDS", "300"))
+    TENANT_CACHE_NEGATIVE_TTL_SECONDS: int = int(os.getenv("TENANT_CACHE_NEGATIVE_TTL_SECONDS", "30"))
+    TENANT_CACHE_MAX_ENTRIES: int = int(os.getenv("TENANT_CACHE_MAX_ENTRIES", "10000"))
+    
+    # Call sessions
+    CALL_SESSION_TTL_SECONDS: int = int(os.getenv("CALL_SESSION_TTL_SECONDS", "7200"))
+    CALL_SESSION_IDLE_SECONDS: int = int(os.getenv("CALL_SESSION_IDLE_SECONDS", "600"))
+    CALL_SESSION_SWEEP_SECONDS: int = int(os.getenv("CALL_SESSION_SWEEP_SECONDS", "30"))
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,291 @@
+import argparse
+import math
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+ASSIGN_BLOCK_ROWS = 16384
+
+
+def _assign(data: np.ndarray, centroids: np.ndarray, metric: str) -> np.ndarray:
+    """
+    Nearest centroid for every row, computed in blocks to bound memory
+    """
+    assignments = np.empty(len(data), dtype=np.int32)
+    centroid_norms = (centroids * centroids).sum(axis=1) if metric == "l2" else None
+
+    for start in range(0, len(data), ASSIGN_BLOCK_ROWS):
+        block = np.asarray(data[start:start + ASSIGN_BLOCK_ROWS], dtype=np.float32)
+        scores = block @ centroids.T
+        if metric == "l2":
+            # argmin ||x - c||^2 == argmax (2 x.c - ||c||^2)
+            scores = 2 * scores - centroid_norms
+        assignments[start:start + len(block)] = scores.argmax(axis=1)
+
+    return assignments
+
+
+def kmeans(data: np.ndarray, k: int, iterations: int = 20, metric: str = "ip",
+           sample_size: Optional[int] = None, seed: int = 0) -> np.ndarray:
+    """
+    Lloyd's k-means over the rows of data.
+
+    With metric="ip" centroids are kept at unit length (spherical k-means,
+    for normalized vectors); with metric="l2" they are plain means.
+    """
+    rng = np.random.default_rng(seed)
+    if sample_size and len(data) > sample_size:
+        data = data[np.sort(rng.choice(len(data), sample_size, replace=False))]
+    data = np.asarray(data, dtype=np.float32)
+
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = _assign(data, centroids, metric)
+
+        counts = np.bincount(assignments, minlength=k)
+        order = np.argsort(assignments, kind="stable")
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        nonempty = counts > 0
+
+        sums = np.zeros_like(centroids)
+        sums[nonempty] = np.add.reduceat(data[order], starts[nonempty], axis=0)
+        centroids[nonempty] = sums[nonempty] / counts[nonempty, None]
+
+        # Re-seed empty clusters with random points
+        empty = np.flatnonzero(~nonempty)
+        if len(empty):
+            centroids[empty] = data[rng.choice(len(data), len(empty), replace=False)]
+
+        if metric == "ip":
+            centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+
+    return centroids
+
+
+class ProductQuantizer:
+    """
+    Splits vectors into equal subspaces and encodes each with one byte
+    (256 centroids per subspace). Inner products against a query are then
+    table lookups (asymmetric distance computation).
+    """
+    def __init__(self, codebooks: np.ndarray):
+        # codebooks: (subvectors, 256, subvector_dim)
+        self.codebooks = codebooks.astype(np.float32)
+        self.subvectors, _, self.subvector_dim = codebooks.shape
+
+    @classmethod
+    def train(cls, data: np.ndarray, subvectors: int, iterations: int = 15,
+              sample_size: int = 20000, seed: int = 0) -> "ProductQuantizer":
+        dim = data.shape[1]
+        if dim % subvectors:
+            raise ValueError(f"Dimension {dim} is not divisible into {subvectors} subvectors")
+
+        rng = np.random.default_rng(seed)
+        if len(data) > sample_size:
+            data = data[np.sort(rng.choice(len(data), sample_size, replace=False))]
+        data = np.asarray(data, dtype=np.float32)
+
+        width = dim // subvectors
+        codebooks = np.zeros((subvectors, 256, width), dtype=np.float32)
+        for j in range(subvectors):
+            centroids = kmeans(data[:, j * width:(j + 1) * width], 256, iterations, metric="l2", seed=seed + j)
+            codebooks[j, :len(centroids)] = centroids
+
+        return cls(codebooks)
+
+    def encode(self, data: np.ndarray) -> np.ndarray:
+        codes = np.empty((len(data), self.subvectors), dtype=np.uint8)
+        width = self.subvector_dim
+        for j in range(self.subvectors):
+            codes[:, j] = _assign(data[:, j * width:(j + 1) * width], self.codebooks[j], "l2")
+        return codes
+
+    def lookup_table(self, query: np.ndarray) -> np.ndarray:
+        """
+        Inner product of each query subvector with every codeword: (subvectors, 256)
+        """
+        subqueries = query.reshape(self.subvectors, self.subvector_dim)
+        return np.einsum("jcd,jd->jc", self.codebooks, subqueries)
+
+    def score(self, table: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        return table[np.arange(self.subvectors), codes].sum(axis=1)
+
+
+class IVFIndex:
+    """
+    Inverted-file index: rows are bucketed by their nearest coarse centroid
+    and a query only scores the rows in its nprobe closest buckets.
+
+    With product quantization enabled, each row's residual from its centroid
+    is stored as PQ codes; candidates are first scored from those codes and
+    only the best rerank_factor * top_k are scored exactly.
+    Rows appended after the index was built are searched exactly until the
+    next rebuild, so results never miss new content.
+    """
+    FILE = "ivf.npz"
+
+    def __init__(self, centroids: np.ndarray, list_offsets: np.ndarray, list_rows: np.ndarray,
+                 built_count: int, pq: ProductQuantizer = None, codes: np.ndarray = None):
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_rows = list_rows
+        self.built_count = built_count
+        self.pq = pq
+        self.codes = codes
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, nlist: int = None, pq_subvectors: int = 0,
+              iterations: int = 20, sample_size: int = 100000, seed: int = 0) -> "IVFIndex":
+        count = len(vectors)
+        nlist = nlist or default_nlist(count)
+
+        centroids = kmeans(vectors, nlist, iterations, metric="ip", sample_size=sample_size, seed=seed)
+        assignments = _assign(vectors, centroids, "ip")
+
+        list_rows = np.argsort(assignments, kind="stable").astype(np.int64)
+        list_offsets = np.concatenate(([0], np.cumsum(np.bincount(assignments, minlength=len(centroids)))))
+
+        pq = codes = None
+        if pq_subvectors:
+            # Encode each row's residual from its list centroid (IVFADC)
+            residuals = np.asarray(vectors, dtype=np.float32) - centroids[assignments]
+            pq = ProductQuantizer.train(residuals, pq_subvectors, seed=seed)
+            codes = pq.encode(residuals)
+
+        return cls(centroids, list_offsets, list_rows, count, pq, codes)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["IVFIndex"]:
+        file_path = Path(path) / cls.FILE
+        if not file_path.exists():
+            return None
+
+        data = np.load(file_path)
+        pq = ProductQuantizer(data["pq_codebooks"]) if "pq_codebooks" in data else None
+        return cls(
+            centroids=data["centroids"],
+            list_offsets=data["list_offsets"],
+            list_rows=data["list_rows"],
+            built_count=int(data["built_count"]),
+            pq=pq,
+            codes=data["codes"] if pq is not None else None
+        )
+
+    def save(self, path: Path):
+        arrays = {
+            "centroids": self.centroids,
+            "list_offsets": self.list_offsets,
+            "list_rows": self.list_rows,
+            "built_count": np.array(self.built_count),
+        }
+        if self.pq is not None:
+            arrays["pq_codebooks"] = self.pq.codebooks
+            arrays["codes"] = self.codes
+
+        tmp_path = Path(path) / ("tmp-" + self.FILE)
+        np.savez(tmp_path, **arrays)
+        tmp_path.replace(Path(path) / self.FILE)
+
+    def remove_rows(self, keep: np.ndarray, new_rows: np.ndarray):
+        """
+        Drop rows from the lists after the vectors were compacted. keep marks
+        the surviving rows and new_rows maps old row numbers to new ones.
+        """
+        live = keep[self.list_rows]
+        list_ids = np.repeat(np.arange(self.nlist), np.diff(self.list_offsets))
+        counts = np.bincount(list_ids[live], minlength=self.nlist)
+
+        self.list_rows = new_rows[self.list_rows[live]].astype(np.int64)
+        self.list_offsets = np.concatenate(([0], np.cumsum(counts)))
+        if self.codes is not None:
+            self.codes = self.codes[keep[:self.built_count]]
+        self.built_count = int(keep[:self.built_count].sum())
+
+    def search(self, vectors: np.ndarray, query: np.ndarray, top_k: int, nprobe: int = None,
+               rerank_factor: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate top-k for one normalized query; returns (rows, scores)
+        """
+        nprobe = min(nprobe or settings.ANN_NPROBE, self.nlist)
+        rerank_factor = rerank_factor or settings.ANN_RERANK_FACTOR
+
+        coarse_scores = self.centroids @ query
+        probed = np.argpartition(-coarse_scores, nprobe - 1)[:nprobe]
+        lists = [self.list_rows[self.list_offsets[i]:self.list_offsets[i + 1]] for i in probed]
+        candidates = np.concatenate(lists)
+
+        if self.pq is not None and len(candidates) > top_k * rerank_factor:
+            # q.x = q.centroid + q.residual; the first term is shared by the whole list
+            list_scores = np.repeat(coarse_scores[probed], [len(rows) for rows in lists])
+            approx = list_scores + self.pq.score(self.pq.lookup_table(query), self.codes[candidates])
+            keep = np.argpartition(-approx, top_k * rerank_factor - 1)[:top_k * rerank_factor]
+            candidates = candidates[keep]
+
+        # Rows added since the build are not in any list yet
+        if len(vectors) > self.built_count:
+            candidates = np.concatenate((candidates, np.arange(self.built_count, len(vectors))))
+
+        if len(candidates) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        candidates.sort()
+        scores = np.asarray(vectors[candidates], dtype=np.float32) @ query
+        k = min(top_k, len(candidates))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return candidates[best], scores[best]
+
+
+def default_nlist(count: int) -> int:
+    """
+    Number of coarse lists for an index of this size (about 4 * sqrt(n))
+    """
+    return max(1, min(count, int(4 * math.sqrt(count))))
+
+
+def main():
+    """
+    Build or rebuild the approximate index for a knowledge base.
+
+    Usage: python -m app.services.ann_index {build,rebuild} KNOWLEDGE_BASE_ID [--nlist N] [--pq M]
+    """
+    from app.services.vector_store import KnowledgeBaseIndex
+
+    parser = argparse.ArgumentParser(description="Build the approximate (IVF/PQ) index for a knowledge base")
+    parser.add_argument("command", choices=["build", "rebuild"])
+    parser.add_argument("knowledge_base_id")
+    parser.add_argument("--nlist", type=int, default=None, help="number of coarse lists (default ~4*sqrt(n))")
+    parser.add_argument("--pq", type=int, default=settings.ANN_PQ_SUBVECTORS,
+                        help="product-quantization subvectors (0 disables PQ)")
+    parser.add_argument("--storage-dir", default=settings.VECTOR_STORE_DIR)
+    args = parser.parse_args()
+
+    index = KnowledgeBaseIndex.load(Path(args.storage_dir) / args.knowledge_base_id)
+    if len(index) == 0:
+        parser.error(f"Knowledge base {args.knowledge_base_id} has no vectors")
+
+    if args.command == "build" and index.ann is not None and index.ann.built_count == len(index):
+        print(f"Index for {args.knowledge_base_id} is up to date ({len(index)} rows); use rebuild to force")
+        return
+
+    start_time = time.perf_counter()
+    index.build_ann(nlist=args.nlist, pq_subvectors=args.pq)
+    print(
+        f"Built IVF index for {args.knowledge_base_id}: {len(index)} rows, "
+        f"{index.ann.nlist} lists, PQ={'off' if not args.pq else args.pq} "
+        f"in {time.perf_counter() - start_time:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+# Telephony audio from Twilio Media Streams: 8 kHz mono mu-law, 20 ms per frame
+TELEPHONY_SAMPLE_RATE = 8000
+TELEPHONY_FRAME_MS = 20
+
+MULAW_BIAS = 0x84
+MULAW_CLIP = 32635
+
+
+def _build_mulaw_decode_table() -> np.ndarray:
+    codes = ~np.arange(256, dtype=np.int32) & 0xFF
+    sign = codes & 0x80
+    exponent = (codes >> 4) & 0x07
+    mantissa = codes & 0x0F
+    magnitude = (((mantissa << 3) + MULAW_BIAS) << exponent) - MULAW_BIAS
+    return np.where(sign != 0, -magnitude, magnitude).astype(np.int16)
+
+
+def _build_mulaw_encode_table() -> np.ndarray:
+    # Indexed by the 16-bit sample reinterpreted as uint16
+    pcm = np.arange(65536, dtype=np.int32).astype(np.uint16).view(np.int16).astype(np.int32)
+    sign = np.where(pcm < 0, 0x80, 0)
+    magnitude = np.minimum(np.abs(pcm), MULAW_CLIP) + MULAW_BIAS
+    exponent = np.floor(np.log2(magnitude)).astype(np.int32) - 7
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    return (~(sign | (exponent << 4) | mantissa) & 0xFF).astype(np.uint8)
+
+
+MULAW_DECODE_TABLE = _build_mulaw_decode_table()
+MULAW_DECODE_TABLE_FLOAT = (MULAW_DECODE_TABLE / 32768.0).astype(np.float32)
+MULAW_ENCODE_TABLE = _build_mulaw_encode_table()
+
+
+def decode_mulaw(data: BytesLike) -> np.ndarray:
+    """
+    Decode mu-law bytes to 16-bit PCM.
+
+    The input is viewed in place (no copy) and decoded with a single table lookup.
+    """
+    codes = np.frombuffer(memoryview(data), dtype=np.uint8)
+    return MULAW_DECODE_TABLE[codes]
+
+
+def decode_mulaw_float(data: BytesLike) -> np.ndarray:
+    """
+    Decode mu-law bytes to float32 samples in [-1, 1)
+    """
+    codes = np.frombuffer(memoryview(data), dtype=np.uint8)
+    return MULAW_DECODE_TABLE_FLOAT[codes]
+
+
+def encode_mulaw(pcm: np.ndarray) -> bytes:
+    """
+    Encode 16-bit PCM samples to mu-law bytes
+    """
+    samples = np.ascontiguousarray(pcm, dtype=np.int16)
+    return MULAW_ENCODE_TABLE[samples.view(np.uint16)].tobytes()
+
+
+class Resampler:
+    """
+    Linear-interpolation resampler between two fixed sample rates.
+
+    Interpolation positions and weights are computed once per input length,
+    so resampling a stream of equally sized frames is a gather and a blend.
+    """
+    def __init__(self, src_rate: int, dst_rate: int):
+        self.src_rate = src_rate
+        self.dst_rate = dst_rate
+        self._plans: Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+    def _plan(self, length: int):
+        plan = self._plans.get(length)
+        if plan is None:
+            out_length = int(round(length * self.dst_rate / self.src_rate))
+            positions = np.arange(out_length, dtype=np.float64) * (self.src_rate / self.dst_rate)
+            left = np.minimum(positions.astype(np.int64), length - 1)
+            right = np.minimum(left + 1, length - 1)
+            weight = (positions - left).astype(np.float32)
+            plan = (left, right, weight)
+            self._plans[length] = plan
+        return plan
+
+    def resample(self, samples: np.ndarray) -> np.ndarray:
+        """
+        Resample a block of samples, preserving its dtype
+        """
+        if self.src_rate == self.dst_rate or len(samples) == 0:
+            return samples
+
+        left, right, weight = self._plan(len(samples))
+        x = samples.astype(np.float32, copy=False)
+        out = x[left] + (x[right] - x[left]) * weight
+
+        if np.issubdtype(samples.dtype, np.integer):
+            return np.clip(np.rint(out), -32768, 32767).astype(samples.dtype)
+        return out
+
+
+def frame_energy_db(samples: np.ndarray, frame_length: int) -> np.ndarray:
+    """
+    Energy of each complete frame in dBFS, for float samples in [-1, 1)
+    """
+    frame_count = len(samples) // frame_length
+    frames = samples[:frame_count * frame_length].reshape(frame_count, frame_length)
+    power = np.einsum("ij,ij->i", frames, frames) / frame_length
+    return 10.0 * np.log10(power + 1e-10)
+
+
+class EnergyVAD:
+    """
+    Energy-based voice activity detector and endpointer.
+
+    Frame energy is compared against an adaptive noise floor. Speech starts
+    after a short run of loud frames and ends after a configurable stretch of
+    quiet ones, at which point the caller's turn is considered over.
+
+    The floor follows quiet frames closely and is never below the quietest
+    frame of the last noise_window_ms (minimum statistics), so a steady line
+    noise louder than the initial floor is learned instead of being taken
+    for never-ending speech.
+    """
+    SPEECH_START = "speech_start"
+    SPEECH_END = "speech_end"
+
+    def __init__(self, sample_rate: int = TELEPHONY_SAMPLE_RATE, frame_ms: int = TELEPHONY_FRAME_MS,
+                 threshold_db: float = 12.0, min_speech_ms: int = 60, endpoint_ms: int = 600,
+                 noise_floor_db: float = -60.0, noise_adapt_rate: float = 0.05,
+                 noise_window_ms: int = 2000):
+        self.frame_length = sample_rate * frame_ms // 1000
+        self.threshold_db = threshold_db
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.endpoint_frames = max(1, endpoint_ms // frame_ms)
+        self.noise_floor_db = noise_floor_db
+        self.noise_adapt_rate = noise_adapt_rate
+
+        # Ring buffer of recent frame energies for the minimum-statistics floor
+        self._recent_energy = np.full(max(1, noise_window_ms // frame_ms), np.inf)
+        self._recent_index = 0
+        self._recent_filled = False
+
+        self.in_speech = False
+        self._speech_run = 0
+        self._silence_run = 0
+        self._remainder = np.zeros(0, dtype=np.float32)
+
+    def process(self, samples: np.ndarray) -> Optional[str]:
+        """
+        Feed float samples and return SPEECH_START, SPEECH_END or None.
+
+        Samples need not align with frame boundaries; leftovers are carried over.
+        """
+        if len(self._remainder):
+            samples = np.concatenate((self._remainder, samples))
+
+        usable = len(samples) - len(samples) % self.frame_length
+        self._remainder = samples[usable:].copy()
+        if not usable:
+            return None
+
+        event = None
+        for energy in frame_energy_db(samples[:usable], self.frame_length).tolist():
+            frame_event = self._process_frame(energy)
+            if frame_event is not None:
+                event = frame_event
+        return event
+
+    def process_mulaw(self, data: BytesLike) -> Optional[str]:
+        """
+        Feed raw mu-law bytes straight from a media frame
+        """
+        return self.process(decode_mulaw_float(data))
+
+    def reset(self):
+        self.in_speech = False
+        self._speech_run = 0
+        self._silence_run = 0
+        self._remainder = np.zeros(0, dtype=np.float32)
+
+    def _process_frame(self, energy_db: float) -> Optional[str]:
+        loud = energy_db > self.noise_floor_db + self.threshold_db
+
+        if not loud:
+            # Track the background level closely while it is quiet
+            self.noise_floor_db += self.noise_adapt_rate * (energy_db - self.noise_floor_db)
+
+        self._recent_energy[self._recent_index] = energy_db
+        self._recent_index = (self._recent_index + 1) % len(self._recent_energy)
+        if self._recent_index == 0:
+            self._recent_filled = True
+        if self._recent_filled:
+            # Nothing in the window was quieter, so the background is at least this loud
+            self.noise_floor_db = max(self.noise_floor_db, float(self._recent_energy.min()))
+
+        if self.in_speech:
+            self._silence_run = 0 if loud else self._silence_run + 1
+            if self._silence_run >= self.endpoint_frames:
+                self.in_speech = False
+                self._speech_run = 0
+                self._silence_run = 0
+                return self.SPEECH_END
+        else:
+            self._speech_run = self._speech_run + 1 if loud else 0
+            if self._speech_run >= self.min_speech_frames:
+                self.in_speech = True
+                self._silence_run = 0
+                return self.SPEECH_START
+
+        return None
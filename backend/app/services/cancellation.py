@@ -0,0 +1,105 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Optional, Set, TypeVar
+
+T = TypeVar("T")
+
+
+class TurnCancelled(Exception):
+    """
+    Raised in work for a turn whose cancel token was cancelled
+    """
+
+
+class CancelToken:
+    """
+    Cancellation signal for one caller turn.
+
+    Work for the turn (retrieval, the LLM request, speech synthesis) runs
+    through run() or iterate(); cancelling the token cancels whatever is in
+    flight at that moment, closing its upstream connection, and makes the
+    turn raise TurnCancelled instead of carrying on.
+    """
+    def __init__(self):
+        self.reason: Optional[str] = None
+        self._tasks: Set[asyncio.Future] = set()
+        # Set on cancellation; created by the first stream that watches for it
+        self._cancelled_event: Optional[asyncio.Event] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def cancel(self, reason: str = "cancelled"):
+        if self.cancelled:
+            return
+        self.reason = reason
+        for task in list(self._tasks):
+            task.cancel()
+        if self._cancelled_event is not None:
+            self._cancelled_event.set()
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise TurnCancelled(self.reason)
+
+    async def run(self, awaitable: Awaitable[T]) -> T:
+        """
+        Await something on behalf of the turn, abandoning it on cancellation
+        """
+        self.raise_if_cancelled()
+        task = asyncio.ensure_future(awaitable)
+        self._tasks.add(task)
+        try:
+            return await task
+        except asyncio.CancelledError:
+            current = asyncio.current_task()
+            if self.cancelled and not (current is not None and current.cancelling()):
+                raise TurnCancelled(self.reason) from None
+            raise
+        finally:
+            self._tasks.discard(task)
+
+    async def iterate(self, iterator: AsyncIterator[T]) -> AsyncIterator[T]:
+        """
+        Items of an async iterator, stopping as soon as the token is cancelled.
+
+        The iterator is consumed directly. One watcher task per stream
+        interrupts the consuming task if the token is cancelled while it is
+        waiting for the next item.
+        """
+        self.raise_if_cancelled()
+        if self._cancelled_event is None:
+            self._cancelled_event = asyncio.Event()
+
+        consumer = asyncio.current_task()
+        waiting = False
+        interrupted = False
+
+        async def watch():
+            nonlocal interrupted
+            await self._cancelled_event.wait()
+            if waiting:
+                interrupted = True
+                consumer.cancel()
+
+        watcher = asyncio.ensure_future(watch())
+        iterator = iterator.__aiter__()
+        try:
+            while True:
+                self.raise_if_cancelled()
+                waiting = True
+                try:
+                    item = await iterator.__anext__()
+                except StopAsyncIteration:
+                    return
+                except asyncio.CancelledError:
+                    # Only our own interruption becomes TurnCancelled; a
+                    # cancellation of the consumer from outside propagates
+                    if interrupted and consumer.uncancel() == 0:
+                        raise TurnCancelled(self.reason) from None
+                    raise
+                finally:
+                    waiting = False
+                yield item
+        finally:
+            watcher.cancel()
@@ -0,0 +1,182 @@
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import httpx
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger("app")
+
+# Evicted clients are closed after this long so in-flight requests can finish
+CLOSE_GRACE_SECONDS = 60
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class ClientRegistry:
+    """
+    Process-wide owner of provider API clients.
+
+    One client is kept per provider and credential, so each tenant's
+    requests reuse a keep-alive connection pool instead of paying for a new
+    TLS handshake, and no client ever holds global state (like
+    openai.api_key) shared between tenants. Clients are created on first
+    use; the least recently used are closed once more than max_clients are
+    open. Everything is closed when the app shuts down.
+
+    Callers look a client up for each request instead of keeping it, so a
+    client that has been evicted and closed is never used again; requests
+    already in flight get CLOSE_GRACE_SECONDS to finish.
+    """
+    def __init__(self, max_clients: int = None, max_connections: int = None,
+                 max_keepalive_connections: int = None, keepalive_expiry: float = None,
+                 http2: bool = None, timeout: float = None):
+        self.max_clients = max_clients or settings.CLIENT_REGISTRY_MAX_CLIENTS
+        self.limits = httpx.Limits(
+            max_connections=max_connections or settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=max_keepalive_connections or settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=keepalive_expiry or settings.HTTP_KEEPALIVE_EXPIRY_SECONDS
+        )
+        self.http2 = (settings.HTTP2_ENABLED if http2 is None else http2) and _http2_available()
+        self.timeout = httpx.Timeout(timeout or settings.HTTP_TIMEOUT_SECONDS)
+
+        # (provider, credential digest) -> (client, close function)
+        self._clients: "OrderedDict[Tuple[str, str], Tuple[Any, Callable]]" = OrderedDict()
+        # Close tasks for evicted clients, with their close functions
+        self._closing: Dict[asyncio.Task, Callable] = {}
+        self.created = 0
+
+    async def start(self):
+        if settings.HTTP2_ENABLED and not self.http2:
+            logger.info("HTTP/2 requested but the h2 package is not installed; using HTTP/1.1")
+        logger.info(f"Client registry started (HTTP/2 {'on' if self.http2 else 'off'}, up to {self.max_clients} clients)")
+
+    async def stop(self):
+        """
+        Close every client
+        """
+        closes = [close for _, close in self._clients.values()]
+        self._clients.clear()
+        for task, close in list(self._closing.items()):
+            task.cancel()
+            closes.append(close)
+        self._closing.clear()
+
+        for close in closes:
+            await self._close(close)
+
+    def http(self, provider: str, credential: str = "", base_url: str = "", headers: Dict[str, str] = None) -> httpx.AsyncClient:
+        """
+        Pooled async HTTP client for a provider and credential
+        """
+        return self._get(provider, credential, lambda: (
+            self._http_client(base_url, headers),
+            lambda client: client.aclose()
+        ))
+
+    def openai(self, api_key: str):
+        """
+        AsyncOpenAI client for an API key
+        """
+        from openai import AsyncOpenAI
+
+        return self._get("openai", api_key, lambda: (
+            AsyncOpenAI(api_key=api_key, http_client=self._http_client()),
+            lambda client: client.close()
+        ))
+
+    def twilio(self, account_sid: str, auth_token: str):
+        """
+        Twilio REST client for an account. Its HTTP client keeps a pooled
+        requests session, so reusing the client reuses connections.
+        """
+        from twilio.http.http_client import TwilioHttpClient
+        from twilio.rest import Client
+
+        return self._get("twilio", f"{account_sid}:{auth_token}", lambda: (
+            Client(account_sid, auth_token, http_client=TwilioHttpClient(
+                pool_connections=True,
+                timeout=settings.HTTP_TIMEOUT_SECONDS
+            )),
+            lambda client: asyncio.to_thread(client.http_client.session.close)
+        ))
+
+    def deepgram(self, api_key: str):
+        """
+        Deepgram SDK client for an API key
+        """
+        from deepgram import Deepgram
+
+        return self._get("deepgram", api_key, lambda: (Deepgram(api_key), None))
+
+    def stats(self) -> Dict[str, Any]:
+        providers: Dict[str, int] = {}
+        for provider, _ in self._clients:
+            providers[provider] = providers.get(provider, 0) + 1
+        return {"clients": len(self._clients), "created": self.created, "by_provider": providers, "http2": self.http2}
+
+    def _http_client(self, base_url: str = "", headers: Dict[str, str] = None) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            limits=self.limits,
+            timeout=self.timeout,
+            http2=self.http2
+        )
+
+    def _get(self, provider: str, credential: str, factory: Callable[[], Tuple[Any, Optional[Callable]]]):
+        key = (provider, hashlib.sha256(credential.encode("utf-8")).hexdigest())
+        entry = self._clients.get(key)
+        if entry is not None:
+            self._clients.move_to_end(key)
+            return entry[0]
+
+        client, close = factory()
+        self._clients[key] = (client, (lambda: close(client)) if close else None)
+        self.created += 1
+
+        while len(self._clients) > self.max_clients:
+            _, (_, evicted_close) = self._clients.popitem(last=False)
+            self._schedule_close(evicted_close)
+
+        return client
+
+    def _schedule_close(self, close: Optional[Callable]):
+        if close is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        async def close_later():
+            await asyncio.sleep(CLOSE_GRACE_SECONDS)
+            await self._close(close)
+
+        task = loop.create_task(close_later())
+        self._closing[task] = close
+        task.add_done_callback(lambda done: self._closing.pop(done, None))
+
+    @staticmethod
+    async def _close(close: Optional[Callable]):
+        if close is None:
+            return
+        try:
+            result = close()
+            if asyncio.iscoroutine(result) or isinstance(result, asyncio.Future):
+                await result
+        except Exception as e:
+            logger.warning(f"Error closing client: {str(e)}")
+
+
+# Process-wide registry, started and stopped with the app
+clients = ClientRegistry()
@@ -0,0 +1,96 @@
+from typing import List, Sequence, Set
+
+from app.core.config import settings
+from app.services.conversation_history import count_tokens
+from app.services.lexical_index import tokenize
+from app.services.text_chunker import SEGMENT_BOUNDARY
+
+
+def _sentences(text: str) -> List[str]:
+    sentences = []
+    start = 0
+    for match in SEGMENT_BOUNDARY.finditer(text):
+        sentences.append(text[start:match.end()])
+        start = match.end()
+    if text[start:].strip():
+        sentences.append(text[start:])
+    return sentences
+
+
+def _normalize(sentence: str) -> str:
+    return " ".join(sentence.lower().split())
+
+
+def _similarity(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class ContextPacker:
+    """
+    Turns retrieval results into the knowledge-base context for a prompt.
+
+    Results are re-ordered by maximal marginal relevance (relevance from the
+    retrieval rank, redundancy from term overlap with results already
+    chosen), sentences already included from an overlapping chunk are
+    dropped, and results are added until the token budget is spent.
+    """
+    def __init__(self, token_budget: int = None, mmr_lambda: float = None, model: str = None):
+        self.token_budget = token_budget or settings.CONTEXT_TOKEN_BUDGET
+        self.mmr_lambda = mmr_lambda if mmr_lambda is not None else settings.CONTEXT_MMR_LAMBDA
+        self.model = model
+
+    def pack(self, results: Sequence) -> str:
+        if not results:
+            return ""
+
+        seen: Set[str] = set()
+        parts: List[str] = []
+        used_tokens = 0
+
+        for result in self._mmr_order(results):
+            # Keep only sentences not already included from another chunk
+            sentences = []
+            keys: Set[str] = set()
+            for sentence in _sentences(result.text):
+                key = _normalize(sentence)
+                if key and key not in seen and key not in keys:
+                    keys.add(key)
+                    sentences.append(sentence)
+            text = "".join(sentences).strip()
+            if not text:
+                continue
+
+            tokens = count_tokens(text, self.model)
+            if used_tokens + tokens > self.token_budget:
+                # A smaller, later result may still fit, including one that
+                # repeats these sentences
+                continue
+            parts.append(text)
+            seen |= keys
+            used_tokens += tokens
+
+        return "\n\n".join(parts)
+
+    def _mmr_order(self, results: Sequence) -> List:
+        """
+        Results in maximal-marginal-relevance order
+        """
+        terms = [set(tokenize(result.text)) for result in results]
+        # Results arrive best first; relevance decays with rank
+        relevance = [1.0 / (1 + rank) for rank in range(len(results))]
+
+        remaining = list(range(len(results)))
+        max_similarity = [0.0] * len(results)
+        order = []
+        while remaining:
+            best = max(
+                remaining,
+                key=lambda i: self.mmr_lambda * relevance[i] - (1 - self.mmr_lambda) * max_similarity[i]
+            )
+            remaining.remove(best)
+            order.append(results[best])
+            for i in remaining:
+                max_similarity[i] = max(max_similarity[i], _similarity(terms[i], terms[best]))
+        return order
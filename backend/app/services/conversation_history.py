@@ -0,0 +1,148 @@
+import asyncio
+import functools
+from typing import Dict, List, Optional
+
+import tiktoken
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger("llm")
+
+# Fixed per-message overhead of the chat format (role and separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_INSTRUCTIONS = (
+    "Summarize the earlier part of this phone conversation in a few sentences. "
+    "Keep names, dates, times, phone numbers and any decisions or requests the caller made."
+)
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding(model: str = None):
+    """
+    Get the tiktoken encoding for a model, falling back to cl100k_base
+    """
+    try:
+        return tiktoken.encoding_for_model(model)
+    except (KeyError, TypeError):
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str, model: str = None) -> int:
+    return len(get_encoding(model).encode(text or "", disallowed_special=()))
+
+
+class ConversationHistory:
+    """
+    Conversation history bounded by a token budget.
+
+    Each message's token count is computed once when it is added. When the
+    history outgrows the budget, older turns are folded into a running
+    summary by a background task; until that finishes the prompt view simply
+    leaves the oldest messages out, so the hot path never waits.
+    """
+    def __init__(self, llm_service, token_budget: int = None, keep_recent_messages: int = None):
+        self.llm_service = llm_service
+        self.model = getattr(llm_service, "model", None)
+        self.token_budget = token_budget or settings.HISTORY_TOKEN_BUDGET
+        self.keep_recent_messages = keep_recent_messages or settings.HISTORY_KEEP_RECENT_MESSAGES
+
+        self.messages: List[Dict[str, str]] = []
+        self._token_counts: List[int] = []
+        self._message_tokens = 0
+
+        self.summary = ""
+        self._summary_tokens = 0
+        self._summarize_task: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return len(self.messages)
+
+    @property
+    def token_count(self) -> int:
+        """
+        Tokens the full history (summary included) would take in a prompt
+        """
+        return self._message_tokens + self._summary_tokens
+
+    def append(self, role: str, content: str):
+        """
+        Add a message and schedule summarization if the budget is exceeded
+        """
+        tokens = count_tokens(content, self.model) + MESSAGE_OVERHEAD_TOKENS
+        self.messages.append({"role": role, "content": content})
+        self._token_counts.append(tokens)
+        self._message_tokens += tokens
+
+        if self.token_count > self.token_budget:
+            self._schedule_summary()
+
+    def for_prompt(self) -> List[Dict[str, str]]:
+        """
+        Messages to send with the next prompt, kept within the token budget
+        """
+        budget = self.token_budget - self._summary_tokens
+        start = len(self.messages)
+        used = 0
+
+        # Walk back from the newest message until the budget is spent
+        while start > 0 and used + self._token_counts[start - 1] <= budget:
+            start -= 1
+            used += self._token_counts[start]
+
+        prompt_messages = self.messages[start:]
+        if self.summary:
+            prompt_messages = [
+                {"role": "system", "content": f"Summary of the earlier conversation: {self.summary}"}
+            ] + prompt_messages
+
+        return prompt_messages
+
+    def close(self):
+        """
+        Cancel any summarization still in progress
+        """
+        if self._summarize_task is not None and not self._summarize_task.done():
+            self._summarize_task.cancel()
+
+    def _schedule_summary(self):
+        if self._summarize_task is not None and not self._summarize_task.done():
+            return
+        if len(self.messages) <= self.keep_recent_messages:
+            return
+
+        try:
+            self._summarize_task = asyncio.get_running_loop().create_task(self._summarize())
+        except RuntimeError:
+            # No running loop (e.g. history built synchronously); the prompt view still trims
+            pass
+
+    async def _summarize(self):
+        fold_count = len(self.messages) - self.keep_recent_messages
+        folded = self.messages[:fold_count]
+
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in folded)
+        if self.summary:
+            transcript = f"Earlier summary: {self.summary}\n\n{transcript}"
+
+        try:
+            summary = await self.llm_service.generate_response(
+                prompt=transcript,
+                system_prompt=SUMMARY_INSTRUCTIONS
+            )
+        except Exception as e:
+            logger.error(f"Error summarizing conversation history: {str(e)}", exc_info=True)
+            return
+
+        # Only appends happen meanwhile, so the folded messages are still at the front
+        del self.messages[:fold_count]
+        self._message_tokens -= sum(self._token_counts[:fold_count])
+        del self._token_counts[:fold_count]
+
+        self.summary = summary
+        self._summary_tokens = count_tokens(summary, self.model) + MESSAGE_OVERHEAD_TOKENS
+
+        self._summarize_task = None
+        if self.token_count > self.token_budget:
+            self._schedule_summary()
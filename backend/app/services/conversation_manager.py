@@ -1,21 +1,65 @@
-from typing import List, Dict, Any
+import time
+from typing import List, Dict, Any, AsyncIterator
+from app.core.config import settings
+from app.core.logging import get_call_logger
 from app.models.call import CallSession
-from app.services.llm_service import LLMService
+from app.services.llm_service import LLMService, split_sentences
 from app.services.knowledge_service import KnowledgeService
-from app.db.crud import save_message, get_call_session
+from app.services.context_packer import ContextPacker
+from app.services.speech_stream import SpeechStream
+from app.services.cancellation import CancelToken
+from app.services import intent_router as intents
+from app.services.response_cache import response_cache
+from app.services.conversation_history import ConversationHistory
+from app.services.turn_pipeline import TurnPipeline, Stage
+from app.services.message_writer import message_writer
+from app.services.index_manager import index_manager
+from app.services.tenant_resolver import TenantConfig
+from app.db.crud import get_call_session
 
 class ConversationManager:
-    def __init__(self, call_sid: str, user_id: str, knowledge_base_id: str = None):
+    def __init__(self, call_sid: str, user_id: str = None, knowledge_base_id: str = None,
+                 tenant: TenantConfig = None):
         self.call_sid = call_sid
-        self.user_id = user_id
-        self.knowledge_base_id = knowledge_base_id
+        self.tenant = tenant
+        self.user_id = user_id or (tenant.user_id if tenant else None)
+        self.knowledge_base_id = knowledge_base_id or (tenant.knowledge_base_id if tenant else None)
+        self.logger = get_call_logger(call_sid, self.user_id)
+        
+        # Per-stage timings (seconds) of the most recent turn
+        self.turn_timings: Dict[str, float] = {}
         
         # Initialize services
-        self.llm_service = LLMService(user_id=user_id)
+        self.llm_service = LLMService(
+            user_id=self.user_id,
+            config=tenant.integration("openai") if tenant else None
+        )
         self.knowledge_service = KnowledgeService()
+        self.context_packer = ContextPacker(model=self.llm_service.model)
+        
+        # Keep this call's knowledge base resident, loading it before the first question
+        if self.knowledge_base_id:
+            index_manager.acquire(self.knowledge_base_id)
         
         # Get or create call session
         self.session = get_call_session(call_sid) or self._create_call_session()
+        
+        # Conversation history kept for the lifetime of the call
+        self.history = ConversationHistory(self.llm_service)
+        
+        # Response currently being spoken, if any, and the caller turns so far
+        self.speech_stream: SpeechStream = None
+        self.turn_number = 0
+        
+        # Cancels the turn in progress when the caller speaks again or hangs up
+        self.cancel_token: CancelToken = None
+        
+        # How the current turn ends the call, if it does: "hangup" or "transfer"
+        self.call_action: str = None
+        
+        # Whether each answer is followed by the "anything else?" prompt (webhook
+        # turns); media streams speak the answer alone
+        self.asks_follow_up = True
     
     def _create_call_session(self) -> CallSession:
         """
@@ -26,60 +70,242 @@ class ConversationManager:
     
     async def process_user_input(self, user_input: str) -> str:
         """
-        Process user input and generate a response
+        Process user input and generate a response. Raises TurnCancelled if
+        the turn is superseded by a newer one or the call ends first.
         """
-        # Save user message
-        save_message(
-            call_sid=self.call_sid,
-            role="user",
-            content=user_input
-        )
+        cancel_token = self.begin_turn()
         
-        # Query knowledge base if available
-        context = ""
-        if self.knowledge_base_id:
-            knowledge_results = await self.knowledge_service.query_knowledge(
-                knowledge_base_id=self.knowledge_base_id,
-                query=user_input
+        # Trivial utterances are answered locally
+        response = self._answer_intent(user_input)
+        if response is not None:
+            return response
+        
+        history, system_prompt, context = await self._prepare_turn(user_input, cancel_token)
+        
+        # Answer repeated questions from the cache
+        cache_key = response_cache.make_key(self.user_id, user_input, system_prompt, history, context)
+        response = response_cache.get(cache_key)
+        
+        if response is None:
+            # Generate response
+            start_time = time.perf_counter()
+            response = await self.llm_service.generate_response(
+                prompt=user_input,
+                conversation_history=history,
+                system_prompt=system_prompt,
+                context=context,
+                cancel_token=cancel_token
             )
-            context = "\n\n".join([result.text for result in knowledge_results])
+            self.turn_timings["llm"] = time.perf_counter() - start_time
+            response_cache.set(cache_key, response)
         
-        # Get conversation history
-        history = self._get_conversation_history()
+        self._finish_turn(user_input, response)
+        return response
+    
+    async def stream_user_input(self, user_input: str) -> AsyncIterator[str]:
+        """
+        Process user input and yield the response one sentence at a time.
+        Stops with TurnCancelled if the turn is superseded or the call ends.
+        """
+        cancel_token = self.begin_turn()
         
-        # Build prompt with context
-        system_prompt = self._build_system_prompt(context)
+        # Trivial utterances are answered locally
+        response = self._answer_intent(user_input)
+        if response is not None:
+            for sentence in split_sentences(response):
+                yield sentence
+            return
         
-        # Generate response
-        response = await self.llm_service.generate_response(
+        history, system_prompt, context = await self._prepare_turn(user_input, cancel_token)
+        
+        # Answer repeated questions from the cache
+        cache_key = response_cache.make_key(self.user_id, user_input, system_prompt, history, context)
+        response = response_cache.get(cache_key)
+        
+        if response is not None:
+            for sentence in split_sentences(response):
+                yield sentence
+            
+            self._finish_turn(user_input, response)
+            return
+        
+        sentences = []
+        async for sentence in self.llm_service.generate_response_stream(
             prompt=user_input,
             conversation_history=history,
-            system_prompt=system_prompt
+            system_prompt=system_prompt,
+            context=context,
+            cancel_token=cancel_token
+        ):
+            sentences.append(sentence)
+            yield sentence
+        
+        response = " ".join(sentences)
+        response_cache.set(cache_key, response)
+        self._finish_turn(user_input, response)
+    
+    def start_speech_stream(self, user_input: str) -> SpeechStream:
+        """
+        Start generating a response in the background so it can be spoken as it arrives
+        """
+        self.cancel_turn("new speech")
+        
+        self.turn_number += 1
+        self.speech_stream = SpeechStream(self.stream_user_input(user_input), turn=self.turn_number)
+        return self.speech_stream
+    
+    def get_speech_stream(self, turn: int = None) -> SpeechStream:
+        """
+        The response being spoken, if it answers the given turn (any turn if None)
+        """
+        if self.speech_stream is None or (turn is not None and self.speech_stream.turn != turn):
+            return None
+        return self.speech_stream
+    
+    def begin_turn(self) -> CancelToken:
+        """
+        Cancel the turn in progress, if any, and return the token for a new one
+        """
+        if self.cancel_token is not None:
+            self.cancel_token.cancel("new speech")
+        self.cancel_token = CancelToken()
+        self.call_action = None
+        return self.cancel_token
+    
+    def cancel_turn(self, reason: str = "cancelled"):
+        """
+        Stop generating and speaking the current response
+        """
+        if self.cancel_token is not None:
+            self.cancel_token.cancel(reason)
+        if self.speech_stream is not None:
+            self.speech_stream.cancel()
+    
+    def close(self):
+        """
+        Stop any background work once the call has ended
+        """
+        self.cancel_turn("call ended")
+        self.history.close()
+        
+        if self.knowledge_base_id:
+            index_manager.release(self.knowledge_base_id)
+    
+    async def _prepare_turn(self, user_input: str, cancel_token: CancelToken):
+        """
+        Record the user message and gather the history, system prompt and
+        knowledge-base context for a turn.
+        
+        Retrieval and history loading are independent, so they run concurrently;
+        retrieval falls back to no context if it is slow or fails.
+        """
+        # Persisted in the background; the turn never waits on the database
+        message_writer.write(self.call_sid, "user", user_input)
+        
+        pipeline = TurnPipeline([
+            Stage(
+                "retrieval",
+                lambda: cancel_token.run(self._retrieve_context(user_input)),
+                timeout=settings.RETRIEVAL_TIMEOUT_SECONDS,
+                default=[]
+            ),
+            Stage("history", self._get_conversation_history),
+            Stage("context", lambda retrieval: self.context_packer.pack(retrieval), depends_on=["retrieval"]),
+        ])
+        
+        # Raises TurnCancelled if the turn is cancelled while retrieving
+        results = await pipeline.run()
+        cancel_token.raise_if_cancelled()
+        
+        self.turn_timings = dict(pipeline.timings)
+        self.logger.debug(
+            "Prepared turn",
+            stage_timings=self.turn_timings,
+            degraded_stages=pipeline.degraded
         )
         
-        # Save assistant message
-        save_message(
-            call_sid=self.call_sid,
-            role="assistant",
-            content=response
+        return results["history"], self._build_system_prompt(), results["context"]
+    
+    def _answer_intent(self, user_input: str) -> str:
+        """
+        Canned answer (and call action) for a trivial utterance, or None if
+        the turn needs retrieval and the LLM
+        """
+        if not settings.INTENT_ROUTER_ENABLED:
+            return None
+        
+        start_time = time.perf_counter()
+        intent = intents.intent_router.classify(user_input)
+        if intent is None:
+            return None
+        
+        last_response = next(
+            (message["content"] for message in reversed(self.history.messages) if message["role"] == "assistant"),
+            None
+        )
+        # A bare yes/no answers the "anything else?" prompt that follows an
+        # answer, unless the answer itself asked a question. Without that
+        # prompt it is left to the LLM.
+        answered_question = (
+            self.asks_follow_up and last_response is not None and not last_response.rstrip().endswith("?")
         )
         
+        response, action = None, None
+        if intent.name == intents.REPEAT:
+            response = last_response
+        elif intent.name == intents.AFFIRM and answered_question:
+            response = intents.ANYTHING_ELSE_RESPONSE
+        elif (intent.name == intents.DENY and answered_question) or intent.name == intents.GOODBYE:
+            response, action = intents.GOODBYE_RESPONSE, "hangup"
+        elif intent.name == intents.HUMAN:
+            if self.tenant is not None and self.tenant.transfer_number:
+                response, action = intents.TRANSFER_RESPONSE, "transfer"
+            else:
+                response = intents.NO_TRANSFER_RESPONSE
+        
+        if response is None:
+            return None
+        
+        self.call_action = action
+        self.turn_timings = {"intent": time.perf_counter() - start_time}
+        self.logger.debug("Answered intent locally", intent=intent.name, confidence=intent.confidence)
+        
+        message_writer.write(self.call_sid, "user", user_input)
+        self._finish_turn(user_input, response)
         return response
     
+    async def _retrieve_context(self, user_input: str) -> list:
+        """
+        Query the knowledge base, if there is one, for results relevant to the input
+        """
+        if not self.knowledge_base_id:
+            return []
+        
+        return await self.knowledge_service.query_knowledge(
+            knowledge_base_id=self.knowledge_base_id,
+            query=user_input,
+            top_k=settings.RETRIEVAL_TOP_K
+        )
+    
+    def _finish_turn(self, user_input: str, response: str):
+        """
+        Record the assistant message and remember the exchange for the next turn
+        """
+        # Save assistant message
+        message_writer.write(self.call_sid, "assistant", response)
+        
+        self.history.append("user", user_input)
+        self.history.append("assistant", response)
+    
     def _get_conversation_history(self) -> List[Dict[str, str]]:
         """
         Get the conversation history for this call
         """
-        # Implementation would fetch from database
-        pass
+        return self.history.for_prompt()
     
-    def _build_system_prompt(self, context: str) -> str:
+    def _build_system_prompt(self) -> str:
         """
-        Build the system prompt with context and instructions
+        Build the system instructions. They are the same on every turn so
+        the prompt prefix can be cached; retrieved context is sent separately.
         """
-        system_prompt = "You are a helpful voice assistant for scheduling appointments."
-        
-        if context:
-            system_prompt += f"\n\nHere is some relevant information from the knowledge base:\n{context}"
-        
-        return system_prompt
+        return "You are a helpful voice assistant for scheduling appointments."
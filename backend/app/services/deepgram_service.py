@@ -1,10 +1,79 @@
-from deepgram import Deepgram
+from typing import Callable, Dict, Any
 from app.core.config import settings
+from app.core.logging import get_logger
+from app.services.client_registry import clients
+
+logger = get_logger("deepgram")
+
+# Live transcription options for Twilio Media Streams audio (8 kHz mu-law, mono)
+TELEPHONY_LIVE_OPTIONS = {
+    'encoding': 'mulaw',
+    'sample_rate': 8000,
+    'channels': 1,
+    'model': 'nova',
+    'punctuate': True,
+    'interim_results': True,
+    'endpointing': 300,
+}
+
+
+DEEPGRAM_API_URL = "https://api.deepgram.com"
+
+# Query parameters for each text-to-speech output format
+TTS_FORMATS = {
+    'mp3': {'encoding': 'mp3'},
+    'mulaw': {'encoding': 'mulaw', 'sample_rate': 8000, 'container': 'none'},
+}
+
+
+class LiveTranscriptionSession:
+    """
+    Wraps a live transcription socket and reports transcripts through a callback.
+
+    The callback is called as on_transcript(text, is_final, speech_final).
+    """
+    def __init__(self, socket, on_transcript: Callable[[str, bool, bool], None]):
+        self.socket = socket
+        self.on_transcript = on_transcript
+        self.closed = False
+        
+        socket.registerHandler(socket.event.TRANSCRIPT_RECEIVED, self._handle_transcript)
+        socket.registerHandler(socket.event.CLOSE, self._handle_close)
+    
+    def send_audio(self, audio_data: bytes):
+        """
+        Forward a chunk of audio to the transcription socket
+        """
+        if not self.closed:
+            self.socket.send(audio_data)
+    
+    async def finish(self):
+        """
+        Flush pending audio and close the socket
+        """
+        if not self.closed:
+            self.closed = True
+            await self.socket.finish()
+    
+    def _handle_transcript(self, result: Dict[str, Any]):
+        alternatives = result.get('channel', {}).get('alternatives') or [{}]
+        text = alternatives[0].get('transcript', '')
+        
+        self.on_transcript(
+            text,
+            bool(result.get('is_final')),
+            bool(result.get('speech_final'))
+        )
+    
+    def _handle_close(self, code):
+        self.closed = True
+        logger.debug(f"Live transcription closed with code {code}")
+
 
 class DeepgramService:
     def __init__(self, api_key=None):
         self.api_key = api_key or settings.DEEPGRAM_API_KEY
-        self.client = Deepgram(self.api_key)
+        self.client = clients.deepgram(self.api_key)
     
     async def transcribe_audio(self, audio_data, mimetype="audio/wav"):
         """
@@ -21,9 +90,29 @@ class DeepgramService:
         )
         return response
     
-    async def text_to_speech(self, text, voice="nova"):
+    async def start_live_transcription(self, on_transcript, options=None) -> LiveTranscriptionSession:
+        """
+        Open a live transcription socket for streaming call audio
         """
-        Convert text to speech using Deepgram
+        socket = await self.client.transcription.live(options or TELEPHONY_LIVE_OPTIONS)
+        return LiveTranscriptionSession(socket, on_transcript)
+    
+    async def text_to_speech(self, text, voice=None, audio_format="mp3") -> bytes:
         """
-        # Implementation would depend on Deepgram's TTS API
-        pass
+        Convert text to speech using Deepgram (Aura voices).
+        
+        audio_format is "mp3" (for TwiML <Play>) or "mulaw" (raw 8 kHz
+        mu-law, for Media Streams).
+        """
+        params = dict(TTS_FORMATS[audio_format])
+        params["model"] = voice or settings.TTS_VOICE
+        
+        http = clients.http(
+            "deepgram",
+            self.api_key,
+            base_url=DEEPGRAM_API_URL,
+            headers={"Authorization": f"Token {self.api_key}"}
+        )
+        response = await http.post("/v1/speak", params=params, json={"text": text})
+        response.raise_for_status()
+        return response.content
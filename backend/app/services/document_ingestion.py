@@ -0,0 +1,291 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.services.text_chunker import TokenChunker
+from app.services.vector_store import content_hash
+
+logger = get_logger("app")
+
+# Pages extracted by one worker task
+PDF_PAGES_PER_TASK = 16
+
+# Target size of a plain-text section, in characters
+TEXT_SECTION_CHARS = 20000
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_extraction_pool() -> ProcessPoolExecutor:
+    """
+    Process pool used for text extraction, created on first use
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.INGEST_EXTRACT_WORKERS or None)
+    return _pool
+
+
+def shutdown_extraction_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+# Extraction runs in worker processes, so these must be module-level functions
+
+def _pdf_page_count(file_path: str) -> int:
+    from PyPDF2 import PdfReader
+
+    return len(PdfReader(file_path).pages)
+
+
+def _extract_pdf_pages(file_path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(file_path)
+    return [(number + 1, reader.pages[number].extract_text() or "") for number in range(start, stop)]
+
+
+def _extract_docx_sections(file_path: str) -> List[Tuple[int, str]]:
+    """
+    Split a DOCX document into sections at each heading
+    """
+    from docx import Document
+
+    sections = []
+    paragraphs: List[str] = []
+    for paragraph in Document(file_path).paragraphs:
+        if paragraph.style is not None and paragraph.style.name.startswith("Heading") and paragraphs:
+            sections.append((len(sections) + 1, "\n".join(paragraphs)))
+            paragraphs = []
+        if paragraph.text.strip():
+            paragraphs.append(paragraph.text)
+
+    if paragraphs:
+        sections.append((len(sections) + 1, "\n".join(paragraphs)))
+    return sections
+
+
+def _iter_text_sections(file_path: str) -> Iterator[Tuple[int, str]]:
+    """
+    Read a plain-text file in sections of about TEXT_SECTION_CHARS,
+    breaking on blank lines where possible
+    """
+    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+        number = 0
+        lines: List[str] = []
+        size = 0
+        for line in f:
+            lines.append(line)
+            size += len(line)
+            if size >= TEXT_SECTION_CHARS and not line.strip():
+                number += 1
+                yield number, "".join(lines)
+                lines, size = [], 0
+        if lines:
+            yield number + 1, "".join(lines)
+
+
+async def iter_sections(file_path: str) -> AsyncIterator[Tuple[int, int, str]]:
+    """
+    Yield (section_number, total_sections, text) for a PDF, DOCX or TXT file
+    without blocking the event loop. PDF pages are extracted in parallel
+    worker processes, a few tasks ahead of the consumer; total_sections is 0
+    when it is not known up front.
+    """
+    loop = asyncio.get_running_loop()
+    extension = os.path.splitext(file_path)[1].lower()
+
+    if extension == ".pdf":
+        pool = get_extraction_pool()
+        page_count = await loop.run_in_executor(pool, _pdf_page_count, file_path)
+        ranges = [(start, min(start + PDF_PAGES_PER_TASK, page_count))
+                  for start in range(0, page_count, PDF_PAGES_PER_TASK)]
+
+        lookahead = max(1, pool._max_workers)
+        pending = [loop.run_in_executor(pool, _extract_pdf_pages, file_path, start, stop)
+                   for start, stop in ranges[:lookahead]]
+        submitted = len(pending)
+        try:
+            while pending:
+                pages = await pending.pop(0)
+                if submitted < len(ranges):
+                    start, stop = ranges[submitted]
+                    pending.append(loop.run_in_executor(pool, _extract_pdf_pages, file_path, start, stop))
+                    submitted += 1
+                for number, text in pages:
+                    yield number, page_count, text
+        finally:
+            for future in pending:
+                future.cancel()
+
+    elif extension == ".docx":
+        sections = await loop.run_in_executor(get_extraction_pool(), _extract_docx_sections, file_path)
+        for number, text in sections:
+            yield number, len(sections), text
+
+    elif extension in (".txt", ".md", ".text", ""):
+        sections = _iter_text_sections(file_path)
+        while True:
+            section = await asyncio.to_thread(next, sections, None)
+            if section is None:
+                break
+            yield section[0], 0, section[1]
+
+    else:
+        raise ValueError(f"Unsupported document type: {extension}")
+
+
+@dataclass
+class IngestionProgress:
+    doc_id: str
+    knowledge_base_id: str
+    sections_done: int = 0
+    sections_total: int = 0
+    chunks_total: int = 0
+    chunks_embedded: int = 0
+    chunks_unchanged: int = 0
+    chunks_removed: int = 0
+    finished: bool = False
+    error: Optional[str] = None
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+
+class DocumentIngestor:
+    """
+    Streaming ingestion of one document into a knowledge base.
+
+    Chunks are identified by content hash: chunks already in the knowledge
+    base (from an earlier upload of the same document or from any other
+    document) are not embedded again, and once the document is complete
+    its chunks that are no longer present are deleted.
+
+    Sections are extracted in worker processes, split into token-sized
+    chunks (see text_chunker) in a worker thread as they arrive, and embedded
+    in fixed-size batches with at most max_concurrency batches in flight.
+    Extraction waits on embedding once that limit is reached, so memory
+    stays bounded for large documents.
+    """
+    def __init__(self, vector_store, batch_size: int = None, max_concurrency: int = None,
+                 max_tokens: int = None, overlap_tokens: int = None):
+        self.vector_store = vector_store
+        self.batch_size = batch_size or settings.INGEST_EMBED_BATCH_SIZE
+        self.max_concurrency = max_concurrency or settings.INGEST_EMBED_CONCURRENCY
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+
+    async def ingest(self, knowledge_base_id: str, doc_id: str, file_path: str, metadata: Dict[str, Any],
+                     progress_callback: Callable[[IngestionProgress], Any] = None,
+                     document_key: str = None) -> IngestionProgress:
+        progress = IngestionProgress(doc_id=doc_id, knowledge_base_id=knowledge_base_id)
+        # Pin the index for the whole upload: if it were evicted midway, a
+        # second copy would be loaded and both would append to the same files
+        indexes = self.vector_store.indexes
+        indexes.acquire(knowledge_base_id)
+        try:
+            return await self._ingest(knowledge_base_id, doc_id, file_path, metadata, progress,
+                                      progress_callback, document_key)
+        finally:
+            indexes.release(knowledge_base_id)
+
+    async def _ingest(self, knowledge_base_id: str, doc_id: str, file_path: str, metadata: Dict[str, Any],
+                      progress: IngestionProgress, progress_callback: Optional[Callable[[IngestionProgress], Any]],
+                      document_key: Optional[str]) -> IngestionProgress:
+        index = await self.vector_store.aget_index(knowledge_base_id)
+        hashes: List[str] = []
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks: List[asyncio.Task] = []
+
+        async def report():
+            if progress_callback is not None:
+                result = progress_callback(progress)
+                if asyncio.iscoroutine(result):
+                    await result
+
+        async def embed(batch: List[Tuple[int, int, str, str]]):
+            try:
+                await self.vector_store.aadd_texts(
+                    texts=[text for _, _, text, _ in batch],
+                    metadatas=[{"doc_id": doc_id, "chunk": i, "section": section, "content_hash": digest, **metadata}
+                               for i, section, text, digest in batch],
+                    knowledge_base_id=knowledge_base_id,
+                    index=index
+                )
+                progress.chunks_embedded += len(batch)
+                await report()
+            finally:
+                semaphore.release()
+
+        async def submit(batch):
+            await semaphore.acquire()
+            tasks.append(asyncio.create_task(embed(batch)))
+            # Surface a failed batch as soon as possible
+            for task in tasks:
+                if task.done() and not task.cancelled() and task.exception():
+                    raise task.exception()
+
+        try:
+            # Tokenization is CPU-bound (and the first use loads the encoding),
+            # so the chunker runs in a worker thread, one section at a time
+            chunker = await asyncio.to_thread(TokenChunker, self.max_tokens, self.overlap_tokens)
+            batch: List[Tuple[int, int, str, str]] = []
+            pending = set()
+
+            async def add(chunks):
+                nonlocal batch
+                for section, chunk in chunks:
+                    digest = content_hash(chunk)
+                    hashes.append(digest)
+                    progress.chunks_total += 1
+                    if digest in index.hash_rows or digest in pending:
+                        progress.chunks_unchanged += 1
+                        continue
+
+                    pending.add(digest)
+                    batch.append((progress.chunks_total - 1, section, chunk, digest))
+                    if len(batch) >= self.batch_size:
+                        await submit(batch)
+                        batch = []
+
+            async for number, total, text in iter_sections(file_path):
+                progress.sections_done = number
+                progress.sections_total = total
+                await add(await asyncio.to_thread(lambda: list(chunker.feed(number, text))))
+                await report()
+
+            await add(await asyncio.to_thread(lambda: list(chunker.flush())))
+            if batch:
+                await submit(batch)
+            await asyncio.gather(*tasks)
+
+            progress.chunks_removed = await self.vector_store.aset_document(
+                knowledge_base_id, document_key or doc_id, doc_id, hashes, index=index
+            )
+
+        except Exception as e:
+            for task in tasks:
+                task.cancel()
+            progress.error = str(e)
+            logger.error(f"Error ingesting document {doc_id} into {knowledge_base_id}: {str(e)}", exc_info=True)
+            await report()
+            raise
+
+        progress.finished = True
+        logger.info(
+            f"Ingested document {doc_id} into {knowledge_base_id} in {progress.elapsed:.1f}s: "
+            f"{progress.sections_done} sections, {progress.chunks_embedded} chunks embedded, "
+            f"{progress.chunks_unchanged} unchanged, {progress.chunks_removed} removed"
+        )
+        await report()
+        return progress
@@ -0,0 +1,129 @@
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger("llm")
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces query embeddings from concurrent callers into batched requests.
+
+    Texts submitted within max_wait_ms of each other (up to max_batch_size)
+    are embedded with one call and each caller gets its own vector back.
+    Recent embeddings are kept in an LRU cache, and identical texts that are
+    already in flight share the pending result.
+    """
+    def __init__(self, embeddings, max_batch_size: int = None, max_wait_ms: float = None, cache_size: int = None):
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size or settings.EMBEDDING_BATCH_MAX_SIZE
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else settings.EMBEDDING_BATCH_MAX_WAIT_MS) / 1000
+        self.cache_size = cache_size if cache_size is not None else settings.EMBEDDING_CACHE_SIZE
+
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._batch: List[str] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # Batch requests in flight, held until done so they are not collected
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.requests = 0
+        self.cache_hits = 0
+        self.batches = 0
+        self.batched_texts = 0
+
+    async def embed(self, text: str) -> List[float]:
+        """
+        Embed one query text, sharing a request with other concurrent callers
+        """
+        self.requests += 1
+        key = text.strip()
+
+        vector = self._cache.get(key)
+        if vector is not None:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            return vector
+
+        future = self._pending.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[key] = future
+            self._batch.append(key)
+
+            if len(self._batch) >= self.max_batch_size:
+                self._flush_now()
+            elif self._flush_handle is None:
+                self._flush_handle = asyncio.get_running_loop().call_later(self.max_wait, self._flush_now)
+
+        return await asyncio.shield(future)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "batches": self.batches,
+            "average_batch_size": self.batched_texts / self.batches if self.batches else 0.0,
+            "cached": len(self._cache),
+        }
+
+    async def close(self):
+        """
+        Cancel batches in flight and fail anyone still waiting on them
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._batch = []
+
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        for future in self._pending.values():
+            if not future.done():
+                future.cancel()
+        self._pending.clear()
+
+    def _flush_now(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._batch = self._batch, []
+        if batch:
+            task = asyncio.ensure_future(self._embed_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _embed_batch(self, texts: List[str]):
+        self.batches += 1
+        self.batched_texts += len(texts)
+
+        try:
+            vectors = await self.embeddings.aembed_documents(texts)
+        except Exception as e:
+            logger.error(f"Error embedding batch of {len(texts)} queries: {str(e)}", exc_info=True)
+            for text in texts:
+                future = self._pending.pop(text, None)
+                if future is not None and not future.done():
+                    future.set_exception(e)
+            return
+
+        for text, vector in zip(texts, vectors):
+            self._remember(text, vector)
+            future = self._pending.pop(text, None)
+            if future is not None and not future.done():
+                future.set_result(vector)
+
+    def _remember(self, text: str, vector: List[float]):
+        if not self.cache_size:
+            return
+        self._cache[text] = vector
+        self._cache.move_to_end(text)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
@@ -0,0 +1,176 @@
+import asyncio
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger("app")
+
+
+class IndexManager:
+    """
+    Process-wide owner of loaded knowledge-base indexes.
+
+    Indexes are loaded lazily (off the event loop) on first use and kept in
+    LRU order under a memory budget. Knowledge bases with calls in progress
+    are acquired for the duration of the call: acquiring pre-warms the index
+    and keeps it from being evicted until the last call releases it.
+    """
+    def __init__(self, storage_dir: str = None, storage_mode: str = None, memory_budget_bytes: int = None):
+        self.storage_dir = Path(storage_dir or settings.VECTOR_STORE_DIR)
+        self.storage_mode = storage_mode or settings.VECTOR_STORAGE_MODE
+        self.memory_budget_bytes = memory_budget_bytes or settings.INDEX_MEMORY_BUDGET_MB * 1024 * 1024
+
+        self._indexes: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._loading: Dict[str, asyncio.Task] = {}
+        self._active: Counter = Counter()
+
+        self.hits = 0
+        self.cold_loads = 0
+        self.evictions = 0
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def get(self, knowledge_base_id: str):
+        """
+        Get an index, loading it synchronously if it is not resident
+        """
+        index = self._touch(knowledge_base_id)
+        if index is None:
+            index = self._insert(knowledge_base_id, self._load(knowledge_base_id))
+        return index
+
+    async def aget(self, knowledge_base_id: str):
+        """
+        Get an index, loading it in a worker thread if it is not resident.
+        Concurrent callers share a single load.
+        """
+        index = self._touch(knowledge_base_id)
+        if index is not None:
+            return index
+
+        task = self._loading.get(knowledge_base_id) or self._start_load(knowledge_base_id)
+        return await asyncio.shield(task)
+
+    def prewarm(self, knowledge_base_id: str):
+        """
+        Start loading an index in the background if it is not already resident
+        """
+        if knowledge_base_id in self._indexes or knowledge_base_id in self._loading:
+            return
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._start_load(knowledge_base_id)
+
+    def acquire(self, knowledge_base_id: str):
+        """
+        Mark a knowledge base as in use by a live call and pre-warm its index
+        """
+        self._active[knowledge_base_id] += 1
+        self.prewarm(knowledge_base_id)
+
+    def release(self, knowledge_base_id: str):
+        """
+        Release a knowledge base once the call using it has ended
+        """
+        self._active[knowledge_base_id] -= 1
+        if self._active[knowledge_base_id] <= 0:
+            del self._active[knowledge_base_id]
+            self._evict()
+
+    def refresh(self, knowledge_base_id: str):
+        """
+        Re-measure an index after it has grown
+        """
+        index = self._indexes.get(knowledge_base_id)
+        if index is not None:
+            self._sizes[knowledge_base_id] = self._measure(index)
+            self._evict()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "resident_indexes": len(self._indexes),
+            "resident_bytes": self.resident_bytes,
+            "memory_budget_bytes": self.memory_budget_bytes,
+            "active_knowledge_bases": len(self._active),
+            "hits": self.hits,
+            "cold_loads": self.cold_loads,
+            "evictions": self.evictions,
+        }
+
+    def _touch(self, knowledge_base_id: str):
+        index = self._indexes.get(knowledge_base_id)
+        if index is not None:
+            self._indexes.move_to_end(knowledge_base_id)
+            self.hits += 1
+        return index
+
+    def _load(self, knowledge_base_id: str):
+        from app.services.vector_store import KnowledgeBaseIndex
+
+        self.cold_loads += 1
+        return KnowledgeBaseIndex.load(self.storage_dir / knowledge_base_id, self.storage_mode)
+
+    def _start_load(self, knowledge_base_id: str) -> asyncio.Task:
+        """
+        Load an index in the background. The task is held in _loading until
+        it finishes, and its outcome is always retrieved, even when nobody
+        awaits it (a pre-warm).
+        """
+        task = asyncio.ensure_future(self._load_async(knowledge_base_id))
+        self._loading[knowledge_base_id] = task
+        task.add_done_callback(lambda done: self._load_done(knowledge_base_id, done))
+        return task
+
+    def _load_done(self, knowledge_base_id: str, task: asyncio.Task):
+        if self._loading.get(knowledge_base_id) is task:
+            del self._loading[knowledge_base_id]
+        if task.cancelled():
+            return
+        e = task.exception()
+        if e is not None:
+            logger.error(f"Error loading index for {knowledge_base_id}: {str(e)}", exc_info=e)
+
+    async def _load_async(self, knowledge_base_id: str):
+        index = await asyncio.to_thread(self._load, knowledge_base_id)
+        # Another caller may have loaded it synchronously in the meantime
+        return self._touch(knowledge_base_id) or self._insert(knowledge_base_id, index)
+
+    def _insert(self, knowledge_base_id: str, index):
+        self._indexes[knowledge_base_id] = index
+        self._sizes[knowledge_base_id] = self._measure(index)
+        self._evict(keep=knowledge_base_id)
+        return index
+
+    def _evict(self, keep: Optional[str] = None):
+        """
+        Drop least recently used, inactive indexes until within budget
+        """
+        for knowledge_base_id in list(self._indexes):
+            if self.resident_bytes <= self.memory_budget_bytes:
+                break
+            if knowledge_base_id == keep or knowledge_base_id in self._active:
+                continue
+
+            del self._indexes[knowledge_base_id]
+            del self._sizes[knowledge_base_id]
+            self.evictions += 1
+            logger.info(f"Evicted index for knowledge base {knowledge_base_id}")
+
+    @staticmethod
+    def _measure(index) -> int:
+        text_bytes = sum(len(text) for text in index.texts)
+        report = index.memory_report()
+        return report["resident_vector_bytes"] + report["lexical_bytes"] + text_bytes
+
+
+# Process-wide manager shared by every KnowledgeService
+index_manager = IndexManager()
@@ -0,0 +1,132 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+# Intents answered without retrieval or the LLM
+AFFIRM = "affirm"
+DENY = "deny"
+REPEAT = "repeat"
+GOODBYE = "goodbye"
+HUMAN = "human"
+
+# Phrases for each intent, matched as whole words
+INTENT_PHRASES: Dict[str, Tuple[str, ...]] = {
+    AFFIRM: (
+        "yes", "yeah", "yep", "yup", "sure", "ok", "okay", "correct", "right", "that's right",
+        "yes please", "sounds good", "go ahead", "i do", "absolutely", "of course",
+    ),
+    DENY: ("no", "nope", "nah", "no thanks", "no thank you", "not really", "i don't", "no i don't"),
+    REPEAT: (
+        "repeat", "repeat that", "say that again", "come again", "pardon", "sorry what",
+        "what did you say", "can you repeat that", "could you repeat that", "one more time",
+        "i didn't catch that", "i didn't hear that",
+    ),
+    GOODBYE: (
+        "bye", "goodbye", "good bye", "bye bye", "that's all", "that is all", "that's it",
+        "nothing else", "i'm done", "i'm good", "hang up", "have a nice day", "have a good day",
+        "thanks bye", "thank you bye", "thank you goodbye", "okay bye", "ok bye", "alright bye",
+        "okay goodbye", "no that's all", "no that's it", "no i'm good",
+    ),
+    HUMAN: (
+        "human", "a human", "real person", "a real person", "a person", "agent", "an agent",
+        "operator", "representative", "a representative", "someone", "somebody",
+        "talk to a human", "speak to a human", "talk to someone", "speak to someone",
+        "talk to a person", "speak to a person", "talk to an agent", "speak to an agent",
+        "customer service", "transfer me",
+    ),
+}
+
+# Words that carry no intent and are ignored when scoring an utterance
+FILLER_WORDS = frozenset(
+    "um uh er hmm oh well please just can could i i'd like want to you me with talk speak thanks thank".split()
+)
+
+# Canned responses, pre-rendered with the fixed prompts
+ANYTHING_ELSE_RESPONSE = "Sure, what else can I help you with?"
+GOODBYE_RESPONSE = "Thanks for calling. Goodbye!"
+TRANSFER_RESPONSE = "Okay, let me connect you to someone now."
+NO_TRANSFER_RESPONSE = "Sorry, there's no one available to take your call right now, but I'm happy to help."
+CANNED_RESPONSES = (ANYTHING_ELSE_RESPONSE, GOODBYE_RESPONSE, TRANSFER_RESPONSE, NO_TRANSFER_RESPONSE)
+
+WORD_PATTERN = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+_END = ""
+
+
+@dataclass
+class Intent:
+    name: str
+    confidence: float
+
+
+class IntentRouter:
+    """
+    Recognizes short, formulaic utterances ("yes", "say that again", "bye",
+    "talk to a person") so they can be answered without retrieval or the LLM.
+
+    The phrases are compiled into a word trie. An utterance is scanned with
+    longest-match lookups; its confidence is the share of its non-filler
+    words covered by phrases of a single intent. Long utterances, mixed
+    intents and low coverage are left to the LLM.
+    """
+    def __init__(self, phrases: Dict[str, Tuple[str, ...]] = None, min_confidence: float = None,
+                 max_words: int = None):
+        self.min_confidence = min_confidence if min_confidence is not None else settings.INTENT_MIN_CONFIDENCE
+        self.max_words = max_words or settings.INTENT_MAX_WORDS
+
+        # word -> child node; the _END key holds the intent of a phrase ending there
+        self._trie: Dict[str, dict] = {}
+        for intent, intent_phrases in (phrases or INTENT_PHRASES).items():
+            for phrase in intent_phrases:
+                node = self._trie
+                for word in WORD_PATTERN.findall(phrase.lower()):
+                    node = node.setdefault(word, {})
+                node[_END] = intent
+
+    def classify(self, utterance: str) -> Optional[Intent]:
+        """
+        The intent of an utterance, or None if it should go to the LLM
+        """
+        words = WORD_PATTERN.findall((utterance or "").lower())
+        if not words or len(words) > self.max_words:
+            return None
+
+        covered: Dict[str, int] = {}
+        unmatched = 0
+        position = 0
+        while position < len(words):
+            intent, length = self._longest_match(words, position)
+            if intent is None:
+                if words[position] not in FILLER_WORDS:
+                    unmatched += 1
+                position += 1
+                continue
+            covered[intent] = covered.get(intent, 0) + length
+            position += length
+
+        if len(covered) != 1:
+            # Nothing matched, or e.g. "yes ... no" - let the LLM decide
+            return None
+
+        name, matched = next(iter(covered.items()))
+        confidence = matched / (matched + unmatched)
+        if confidence < self.min_confidence:
+            return None
+        return Intent(name, confidence)
+
+    def _longest_match(self, words: List[str], start: int) -> Tuple[Optional[str], int]:
+        node = self._trie
+        intent, length = None, 0
+        for offset, word in enumerate(words[start:], start=1):
+            node = node.get(word)
+            if node is None:
+                break
+            if _END in node:
+                intent, length = node[_END], offset
+        return intent, length
+
+
+# Process-wide router; the phrase table is compiled once
+intent_router = IntentRouter()
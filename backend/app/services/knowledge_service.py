@@ -1,8 +1,9 @@
 import os
 import uuid
-from typing import List, Dict, Any
+from typing import Dict, Any, Callable
 from app.db.crud import save_document, get_document, get_knowledge_base
 from app.services.vector_store import VectorStore
+from app.services.document_ingestion import DocumentIngestor, IngestionProgress
 
 class KnowledgeService:
     def __init__(self):
@@ -16,53 +17,38 @@ class KnowledgeService:
         # Save to database
         return kb_id
     
-    async def add_document(self, knowledge_base_id: str, file_path: str, metadata: Dict[str, Any]):
+    async def add_document(self, knowledge_base_id: str, file_path: str, metadata: Dict[str, Any],
+                           progress_callback: Callable[[IngestionProgress], Any] = None):
         """
-        Process a document and add it to a knowledge base
+        Process a document and add it to a knowledge base.
+        Extraction, chunking and embedding are streamed section by section;
+        progress_callback (sync or async) is called as the document advances.
+        
+        Documents are identified by metadata["source"] (the file name by
+        default); re-uploading one keeps its doc_id and only embeds the
+        chunks that changed.
         """
-        # Extract text from document
-        text = self._extract_text(file_path)
+        document_key = metadata.get("source") or os.path.basename(file_path)
+        index = await self.vector_store.aget_index(knowledge_base_id)
         
         # Create document record
-        doc_id = str(uuid.uuid4())
+        doc_id = index.document_id(document_key) or str(uuid.uuid4())
         save_document(doc_id, knowledge_base_id, file_path, metadata)
         
         # Process and embed document
-        chunks = self._chunk_text(text)
-        self.vector_store.add_texts(
-            texts=chunks,
-            metadatas=[{"doc_id": doc_id, "chunk": i, **metadata} for i in range(len(chunks))],
-            knowledge_base_id=knowledge_base_id
+        await DocumentIngestor(self.vector_store).ingest(
+            knowledge_base_id, doc_id, file_path, metadata, progress_callback, document_key=document_key
         )
         
         return doc_id
     
     async def query_knowledge(self, knowledge_base_id: str, query: str, top_k: int = 5):
         """
-        Query the knowledge base for relevant information
+        Query the knowledge base for relevant information (hybrid vector and keyword search)
         """
-        results = self.vector_store.similarity_search(
+        results = await self.vector_store.ahybrid_search(
             query=query,
             knowledge_base_id=knowledge_base_id,
             top_k=top_k
         )
         return results
-    
-    def _extract_text(self, file_path: str) -> str:
-        """
-        Extract text from various file formats
-        """
-        # Implementation would handle different file types
-        # (PDF, DOCX, TXT, etc.)
-        pass
-    
-    def _chunk_text(self, text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
-        """
-        Split text into overlapping chunks
-        """
-        chunks = []
-        for i in range(0, len(text), chunk_size - overlap):
-            chunk = text[i:i + chunk_size]
-            chunks.append(chunk)
-        return chunks
-
@@ -0,0 +1,247 @@
+import math
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-./][a-z0-9]+)*")
+
+# Anything mixing letters and digits, or a run of six or more digits, is
+# treated as an identifier (product codes, order numbers, postcodes). Shorter
+# numbers are years, prices and quantities, and ordinals and times ("21st",
+# "10am", "1990s") are words, not codes.
+IDENTIFIER_PATTERN = re.compile(
+    r"^(?!\d+(?:st|nd|rd|th|am|pm|s)$)(?=[a-z]*\d)(?=\d*[a-z])[a-z0-9]{3,}$|^\d{6,}$"
+)
+
+STOP_WORDS = frozenset(
+    "a an and are as at be but by do does for from has have how i if in is it its "
+    "me my of on or our so that the their there this to was we what when where "
+    "which who why will with you your".split()
+)
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased word tokens. Hyphenated or dotted compounds ("AB-1234",
+    "v2.1") yield their parts plus the joined form, and runs of three or
+    more single characters ("A B 1 2 3 4", as a transcriber writes a
+    spelled-out code) also yield the joined form, so an identifier matches
+    however it was written or transcribed.
+    """
+    tokens = []
+    spelled: List[str] = []
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        word = match.group()
+        if len(word) == 1:
+            spelled.append(word)
+        else:
+            if len(spelled) >= 3:
+                tokens.append("".join(spelled))
+            spelled = []
+
+        parts = re.split(r"[-./]", word)
+        if len(parts) > 1:
+            tokens.append("".join(parts))
+        tokens.extend(part for part in parts if part not in STOP_WORDS)
+
+    if len(spelled) >= 3:
+        tokens.append("".join(spelled))
+    return tokens
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """
+    Fuse ranked lists of rows: each row scores sum(1 / (k + rank)). Returns
+    (row, score) pairs, best first.
+    """
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking, start=1):
+            scores[row] = scores.get(row, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index over a knowledge base's chunks, using the same row
+    numbers as its vector index.
+
+    Postings are held in CSR form: term_offsets[t]:term_offsets[t + 1]
+    slices postings_rows / postings_tf for term t. Appended rows are buffered
+    and merged into the arrays the next time the index is searched or saved.
+    """
+    FILE = "lexical.npz"
+
+    def __init__(self):
+        self.vocabulary: Dict[str, int] = {}
+        self.doc_lengths = np.zeros(0, dtype=np.int32)
+        self.term_offsets = np.zeros(1, dtype=np.int64)
+        self.postings_rows = np.zeros(0, dtype=np.int32)
+        self.postings_tf = np.zeros(0, dtype=np.uint16)
+        # Buffered postings for appended rows: (term ids, rows, term frequencies)
+        self._pending: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    @property
+    def nbytes(self) -> int:
+        return (self.doc_lengths.nbytes + self.term_offsets.nbytes
+                + self.postings_rows.nbytes + self.postings_tf.nbytes)
+
+    @classmethod
+    def build(cls, texts: Sequence[str]) -> "LexicalIndex":
+        index = cls()
+        index.add(texts)
+        index._merge()
+        return index
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["LexicalIndex"]:
+        file_path = Path(path) / cls.FILE
+        if not file_path.exists():
+            return None
+
+        data = np.load(file_path)
+        index = cls()
+        index.vocabulary = {term: i for i, term in enumerate(data["terms"].tolist())}
+        index.doc_lengths = data["doc_lengths"]
+        index.term_offsets = data["term_offsets"]
+        index.postings_rows = data["postings_rows"]
+        index.postings_tf = data["postings_tf"]
+        return index
+
+    def save(self, path: Path):
+        self._merge()
+        terms = np.array(list(self.vocabulary), dtype=str) if self.vocabulary else np.zeros(0, dtype="<U1")
+        tmp_path = Path(path) / ("tmp-" + self.FILE)
+        np.savez(
+            tmp_path,
+            terms=terms,
+            doc_lengths=self.doc_lengths,
+            term_offsets=self.term_offsets,
+            postings_rows=self.postings_rows,
+            postings_tf=self.postings_tf,
+        )
+        tmp_path.replace(Path(path) / self.FILE)
+
+    def add(self, texts: Sequence[str]):
+        """
+        Index texts as the next rows
+        """
+        start_row = len(self.doc_lengths)
+        term_ids, rows, tfs, lengths = [], [], [], []
+
+        for row, text in enumerate(texts, start=start_row):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                term_ids.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                rows.append(row)
+                tfs.append(min(tf, 65535))
+
+        self.doc_lengths = np.concatenate((self.doc_lengths, np.asarray(lengths, dtype=np.int32)))
+        if term_ids:
+            self._pending.append((
+                np.asarray(term_ids, dtype=np.int64),
+                np.asarray(rows, dtype=np.int32),
+                np.asarray(tfs, dtype=np.uint16),
+            ))
+
+    def remove_rows(self, keep: np.ndarray, new_rows: np.ndarray):
+        """
+        Drop rows after the knowledge base was compacted. keep marks the
+        surviving rows and new_rows maps old row numbers to new ones.
+        """
+        self._merge()
+        term_ids = np.repeat(np.arange(len(self.term_offsets) - 1), np.diff(self.term_offsets))
+        live = keep[self.postings_rows]
+
+        counts = np.bincount(term_ids[live], minlength=len(self.term_offsets) - 1)
+        self.term_offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        self.postings_rows = new_rows[self.postings_rows[live]].astype(np.int32)
+        self.postings_tf = self.postings_tf[live]
+        self.doc_lengths = self.doc_lengths[keep]
+
+    def identifier_terms(self, query: str) -> List[str]:
+        """
+        Identifier-like query terms that occur in the index
+        """
+        return [term for term in tokenize(query) if IDENTIFIER_PATTERN.match(term) and term in self.vocabulary]
+
+    def is_identifier_query(self, query: str) -> bool:
+        """
+        Whether a query names a rare identifier in the index, in which case
+        lexical matches alone are the best answer and embedding can be skipped.
+        Merges pending rows, so like search() it must hold the owning
+        index's lock.
+        """
+        self._merge()
+        for term in self.identifier_terms(query):
+            term_id = self.vocabulary[term]
+            document_frequency = self.term_offsets[term_id + 1] - self.term_offsets[term_id]
+            if 0 < document_frequency <= settings.LEXICAL_IDENTIFIER_MAX_DF:
+                return True
+        return False
+
+    def search(self, query: str, top_k: int, deleted: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        BM25 top-k rows for a query; returns (rows, scores), best first
+        """
+        self._merge()
+        count = len(self.doc_lengths)
+        term_ids = {self.vocabulary[term] for term in tokenize(query) if term in self.vocabulary}
+        if not term_ids or count == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        average_length = max(float(self.doc_lengths.mean()), 1.0)
+        rows_parts, weights_parts = [], []
+        for term_id in term_ids:
+            start, stop = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+            rows = self.postings_rows[start:stop]
+            tf = self.postings_tf[start:stop].astype(np.float32)
+            idf = math.log(1 + (count - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[rows] / average_length)
+            rows_parts.append(rows)
+            weights_parts.append(idf * tf * (BM25_K1 + 1) / (tf + norm))
+
+        scores = np.bincount(np.concatenate(rows_parts), np.concatenate(weights_parts), minlength=count)
+        if deleted is not None:
+            scores[deleted] = 0.0
+
+        matched = np.flatnonzero(scores)
+        k = min(top_k, len(matched))
+        if k == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        best = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return best, scores[best].astype(np.float32)
+
+    def _merge(self):
+        """
+        Fold buffered postings into the CSR arrays
+        """
+        if not self._pending:
+            return
+
+        term_count = len(self.vocabulary)
+        old_terms = np.repeat(np.arange(len(self.term_offsets) - 1), np.diff(self.term_offsets))
+        term_ids = np.concatenate([old_terms] + [part[0] for part in self._pending])
+        rows = np.concatenate([self.postings_rows] + [part[1] for part in self._pending])
+        tfs = np.concatenate([self.postings_tf] + [part[2] for part in self._pending])
+        self._pending = []
+
+        # Stable, so each term's postings stay in row order
+        order = np.argsort(term_ids, kind="stable")
+        self.postings_rows = rows[order]
+        self.postings_tf = tfs[order]
+        self.term_offsets = np.concatenate(([0], np.cumsum(np.bincount(term_ids, minlength=term_count)))).astype(np.int64)
+
@@ -1,13 +1,76 @@
-import openai
+import re
 from app.core.config import settings
 from app.models.integration import LLMConfig
 from app.db.crud import get_user_integration
+from app.services.client_registry import clients
+from app.services.cancellation import CancelToken
+
+# A sentence ends at terminal punctuation (plus closing quotes/brackets) followed by whitespace
+SENTENCE_BOUNDARY = re.compile(r'[.!?]+["\')\]]*\s+')
+
+# Abbreviations that end in a period but do not end a sentence
+ABBREVIATIONS = {"mr.", "mrs.", "ms.", "dr.", "st.", "jr.", "sr.", "vs.", "etc.", "e.g.", "i.e.", "a.m.", "p.m."}
+
+
+class SentenceBuffer:
+    """
+    Accumulates streamed text and releases it one complete sentence at a time
+    """
+    def __init__(self, min_chars: int = 12):
+        self.min_chars = min_chars
+        self._buffer = ""
+    
+    def feed(self, text: str):
+        """
+        Add a chunk of text and return any sentences it completed
+        """
+        self._buffer += text
+        sentences = []
+        start = 0
+        
+        for match in SENTENCE_BOUNDARY.finditer(self._buffer):
+            candidate = self._buffer[start:match.end()].strip()
+            last_word = candidate.rsplit(None, 1)[-1].lower()
+            
+            # Keep short fragments and abbreviations attached to what follows
+            if len(candidate) < self.min_chars or last_word in ABBREVIATIONS:
+                continue
+            
+            sentences.append(candidate)
+            start = match.end()
+        
+        self._buffer = self._buffer[start:]
+        return sentences
+    
+    def flush(self):
+        """
+        Return whatever text remains once the stream has ended
+        """
+        remainder = self._buffer.strip()
+        self._buffer = ""
+        return remainder
+
+
+def split_sentences(text: str):
+    """
+    Split a complete response into the sentences a stream would have yielded
+    """
+    buffer = SentenceBuffer()
+    sentences = buffer.feed(text)
+    remainder = buffer.flush()
+    if remainder:
+        sentences.append(remainder)
+    return sentences
 
 class LLMService:
-    def __init__(self, provider="openai", user_id=None, integration_id=None):
+    def __init__(self, provider="openai", user_id=None, integration_id=None, config=None):
         self.provider = provider
         
-        if user_id and integration_id:
+        if config is not None:
+            # Config already resolved for this call's tenant
+            self.api_key = config.api_key
+            self.model = config.model
+        elif user_id and integration_id:
             # Get user-specific LLM config
             llm_config = get_user_integration(user_id, provider, integration_id)
             if not llm_config:
@@ -20,34 +83,94 @@ class LLMService:
             if provider == "openai":
                 self.api_key = settings.OPENAI_API_KEY
                 self.model = settings.OPENAI_MODEL
+    
+    @property
+    def client(self):
+        """
+        Pooled client for this API key, shared with other services using it.
+        Looked up per request rather than kept: the registry closes clients
+        it evicts, and a service can outlive that (it lasts the whole call).
+        """
+        if self.provider != "openai":
+            raise ValueError(f"Unsupported LLM provider: {self.provider}")
+        return clients.openai(self.api_key)
+    
+    def _build_messages(self, prompt, conversation_history=None, system_prompt=None, context=None):
+        """
+        Order messages from most to least stable: the system instructions and
+        the append-only history form a prefix the provider can cache across
+        turns, while the per-turn retrieved context goes just before the prompt.
+        """
+        messages = []
+        
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        
+        if conversation_history:
+            messages.extend(conversation_history)
         
-        # Configure client
-        if provider == "openai":
-            openai.api_key = self.api_key
+        if context:
+            messages.append({"role": "system", "content": f"Relevant information from the knowledge base:\n{context}"})
+        
+        messages.append({"role": "user", "content": prompt})
+        return messages
     
-    async def generate_response(self, prompt, conversation_history=None, system_prompt=None):
+    async def generate_response(self, prompt, conversation_history=None, system_prompt=None, context=None,
+                                cancel_token: CancelToken = None):
         """
-        Generate a response from the LLM
+        Generate a response from the LLM. Cancelling cancel_token aborts the
+        request and raises TurnCancelled.
         """
         if self.provider == "openai":
-            messages = []
-            
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
-            
-            if conversation_history:
-                messages.extend(conversation_history)
-            
-            messages.append({"role": "user", "content": prompt})
+            messages = self._build_messages(prompt, conversation_history, system_prompt, context)
             
-            response = await openai.ChatCompletion.acreate(
+            request = self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 temperature=0.7,
                 max_tokens=500
             )
+            response = await (cancel_token.run(request) if cancel_token else request)
             
             return response.choices[0].message.content
         else:
             raise NotImplementedError(f"Provider {self.provider} not implemented")
-
+    
+    async def generate_response_stream(self, prompt, conversation_history=None, system_prompt=None, context=None,
+                                       cancel_token: CancelToken = None):
+        """
+        Stream a response from the LLM, yielding each sentence as soon as it is
+        complete. Cancelling cancel_token (or closing the generator) closes
+        the upstream response so no further tokens are generated.
+        """
+        if self.provider != "openai":
+            raise NotImplementedError(f"Provider {self.provider} not implemented")
+        
+        messages = self._build_messages(prompt, conversation_history, system_prompt, context)
+        
+        request = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=0.7,
+            max_tokens=500,
+            stream=True
+        )
+        response = await (cancel_token.run(request) if cancel_token else request)
+        
+        sentences = SentenceBuffer()
+        try:
+            async for chunk in (cancel_token.iterate(response) if cancel_token else response):
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                
+                for sentence in sentences.feed(delta):
+                    yield sentence
+            
+            # The last sentence often has no trailing whitespace to end it
+            remainder = sentences.flush()
+            if remainder:
+                yield remainder
+        finally:
+            # Closing the HTTP response stops generation if we stopped early
+            await response.response.aclose()
@@ -0,0 +1,253 @@
+import asyncio
+import base64
+import json
+from typing import Callable, List, Optional
+
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from app.core.config import settings
+from app.core.logging import get_call_logger
+from app.services import twiml
+from app.services.audio_processing import EnergyVAD
+from app.services.deepgram_service import DeepgramService, LiveTranscriptionSession
+from app.services.tts_cache import tts_cache
+from app.services.twilio_service import TwilioService
+from app.services.cancellation import TurnCancelled
+
+# Longest wait for the goodbye to finish playing before hanging up or transferring
+PLAYBACK_WAIT_SECONDS = 15.0
+
+
+class MediaStreamHandler:
+    """
+    Bridges a Twilio Media Streams WebSocket to live transcription and the
+    conversation manager.
+
+    Inbound caller audio is forwarded to the transcription session. Interim
+    transcripts interrupt the assistant while it is speaking (barge-in),
+    final transcripts are collected into an utterance and the end of speech
+    starts a new turn whose sentences are synthesized and streamed back.
+
+    A local energy VAD watches the same audio so the turn can end as soon as
+    the caller goes quiet, without waiting for the remote endpointer.
+
+    A turn that ends the call (goodbye, transfer to a person) is carried out
+    once its audio has played, by giving the call new TwiML over the REST API.
+    """
+    def __init__(self, websocket: WebSocket, deepgram_service: DeepgramService,
+                 conversation_factory: Callable[[str], object]):
+        self.websocket = websocket
+        self.deepgram_service = deepgram_service
+        self.conversation_factory = conversation_factory
+
+        self.stream_sid: Optional[str] = None
+        self.call_sid: Optional[str] = None
+        self.conversation_manager = None
+        self.transcription: Optional[LiveTranscriptionSession] = None
+        self.logger = None
+
+        self._transcripts: asyncio.Queue = asyncio.Queue()
+        self._transcript_task: Optional[asyncio.Task] = None
+        self._turn_task: Optional[asyncio.Task] = None
+        self._utterance: List[str] = []
+        self._interim_text = ""
+        self._skip_next_final = False
+        self.vad = EnergyVAD()
+        self._pending_marks = set()
+        self._mark_counter = 0
+        # Set whenever Twilio has played everything sent so far
+        self._playback_done = asyncio.Event()
+        self._playback_done.set()
+
+    @property
+    def assistant_speaking(self) -> bool:
+        return bool(self._pending_marks) or (
+            self._turn_task is not None and not self._turn_task.done()
+        )
+
+    async def run(self):
+        """
+        Process Twilio stream events until the stream stops or the socket closes
+        """
+        try:
+            while True:
+                message = await self.websocket.receive_text()
+                event = json.loads(message)
+                if not await self._handle_event(event):
+                    break
+        except WebSocketDisconnect:
+            pass
+        finally:
+            await self._close()
+
+    async def _handle_event(self, event: dict) -> bool:
+        event_type = event.get("event")
+
+        if event_type == "media":
+            if self.transcription is not None:
+                audio = base64.b64decode(event["media"]["payload"])
+                self.transcription.send_audio(audio)
+                self._on_vad_event(self.vad.process_mulaw(audio))
+        elif event_type == "start":
+            await self._start(event["start"])
+        elif event_type == "mark":
+            self._pending_marks.discard(event.get("mark", {}).get("name"))
+            if not self._pending_marks:
+                self._playback_done.set()
+        elif event_type == "stop":
+            return False
+
+        return True
+
+    async def _start(self, start: dict):
+        self.stream_sid = start.get("streamSid")
+        self.call_sid = start.get("callSid")
+        self.logger = get_call_logger(self.call_sid)
+
+        self.conversation_manager = self.conversation_factory(self.call_sid)
+        # The answer is spoken without an "anything else?" prompt after it
+        self.conversation_manager.asks_follow_up = False
+        self.transcription = await self.deepgram_service.start_live_transcription(
+            self._on_transcript
+        )
+        self._transcript_task = asyncio.create_task(self._consume_transcripts())
+
+        self.logger.info(f"Media stream {self.stream_sid} started")
+
+    def _on_transcript(self, text: str, is_final: bool, speech_final: bool):
+        # Called from the transcription socket; hand off to the consumer task
+        self._transcripts.put_nowait((text, is_final, speech_final))
+
+    async def _consume_transcripts(self):
+        while True:
+            text, is_final, speech_final = await self._transcripts.get()
+
+            if is_final and self._skip_next_final:
+                # Already answered from the interim text when the VAD endpointed
+                self._skip_next_final = False
+                continue
+
+            # The caller started talking over the assistant
+            if text and self.vad.in_speech and self.assistant_speaking:
+                await self._barge_in()
+
+            self._interim_text = "" if is_final else text
+
+            if is_final and text:
+                self._utterance.append(text)
+
+            if speech_final and self._utterance:
+                utterance = " ".join(self._utterance)
+                self._utterance = []
+                self._start_turn(utterance)
+
+    def _on_vad_event(self, vad_event):
+        if vad_event == EnergyVAD.SPEECH_START:
+            self._skip_next_final = False
+        elif vad_event == EnergyVAD.SPEECH_END:
+            # End the turn locally with whatever has been transcribed so far
+            parts = self._utterance + ([self._interim_text] if self._interim_text else [])
+            if not parts:
+                return
+
+            self._skip_next_final = bool(self._interim_text)
+            self._utterance = []
+            self._interim_text = ""
+            self._start_turn(" ".join(parts))
+
+    def _start_turn(self, utterance: str):
+        if self._turn_task is not None and not self._turn_task.done():
+            self._turn_task.cancel()
+        self._turn_task = asyncio.create_task(self._respond(utterance))
+
+    async def _respond(self, utterance: str):
+        try:
+            async for sentence in self.conversation_manager.stream_user_input(utterance):
+                # Synthesis stops with the rest of the turn if the call ends
+                cancel_token = self.conversation_manager.cancel_token
+                if settings.TTS_CACHE_ENABLED:
+                    audio = await cancel_token.run(tts_cache.read(sentence, audio_format="mulaw"))
+                else:
+                    audio = await cancel_token.run(
+                        self.deepgram_service.text_to_speech(sentence, audio_format="mulaw")
+                    )
+                if audio:
+                    await self._send_audio(audio)
+            
+            if self.conversation_manager.call_action:
+                await self._end_call(self.conversation_manager.call_action)
+        except asyncio.CancelledError:
+            raise
+        except TurnCancelled:
+            # The caller spoke again or hung up
+            pass
+        except Exception as e:
+            self.logger.error(f"Error responding on media stream: {str(e)}", exc_info=True)
+
+    async def _end_call(self, action: str):
+        """
+        Hang up or transfer once the goodbye has played. The call is held
+        by the <Connect><Stream>, so that takes a REST update with new TwiML.
+        """
+        tenant = getattr(self.conversation_manager, "tenant", None)
+        ending = twiml.call_ending(action, tenant.transfer_number if tenant else None)
+        if ending is None:
+            return
+        
+        try:
+            await asyncio.wait_for(self._playback_done.wait(), PLAYBACK_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        
+        twilio_service = TwilioService(config=tenant.integration("twilio") if tenant else None)
+        await asyncio.to_thread(twilio_service.update_call, self.call_sid, twiml.response(ending))
+        self.logger.info(f"Call {action} requested after the final response")
+
+    async def _send_audio(self, audio: bytes):
+        """
+        Send mu-law audio to the caller followed by a mark to track playback
+        """
+        self._mark_counter += 1
+        mark_name = f"turn-{self._mark_counter}"
+        self._pending_marks.add(mark_name)
+        self._playback_done.clear()
+
+        await self.websocket.send_text(json.dumps({
+            "event": "media",
+            "streamSid": self.stream_sid,
+            "media": {"payload": base64.b64encode(audio).decode("ascii")},
+        }))
+        await self.websocket.send_text(json.dumps({
+            "event": "mark",
+            "streamSid": self.stream_sid,
+            "mark": {"name": mark_name},
+        }))
+
+    async def _barge_in(self):
+        """
+        Stop the current response and drop any audio Twilio has buffered
+        """
+        if self._turn_task is not None and not self._turn_task.done():
+            self._turn_task.cancel()
+
+        self._pending_marks.clear()
+        self._playback_done.set()
+        await self.websocket.send_text(json.dumps({
+            "event": "clear",
+            "streamSid": self.stream_sid,
+        }))
+
+    async def _close(self):
+        for task in (self._turn_task, self._transcript_task):
+            if task is not None and not task.done():
+                task.cancel()
+
+        if self.transcription is not None:
+            try:
+                await self.transcription.finish()
+            except Exception as e:
+                if self.logger:
+                    self.logger.warning(f"Error closing live transcription: {str(e)}")
+
+        if self.logger:
+            self.logger.info(f"Media stream {self.stream_sid} closed")
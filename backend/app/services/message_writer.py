@@ -0,0 +1,148 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.db.crud import save_messages
+
+logger = get_logger("db")
+
+# Queued by stop() to tell the flusher to write its batch and exit
+_STOP = object()
+
+
+class MessageWriter:
+    """
+    Write-behind queue for conversation messages.
+
+    Webhooks enqueue messages without waiting; a background task writes them
+    with bulk inserts whenever a batch fills up or the flush interval passes,
+    and everything still buffered is flushed on shutdown. The buffer is
+    bounded: when it is full new messages are dropped and counted rather than
+    stalling a live call.
+    """
+    def __init__(self, max_buffer: int = None, batch_size: int = None, flush_interval: float = None):
+        self.max_buffer = max_buffer or settings.MESSAGE_WRITER_MAX_BUFFER
+        self.batch_size = batch_size or settings.MESSAGE_WRITER_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.MESSAGE_WRITER_FLUSH_SECONDS
+
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_buffer)
+        self._flusher: Optional[asyncio.Task] = None
+
+        # Backpressure and throughput metrics
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.flush_errors = 0
+        self.high_water_mark = 0
+        self.last_flush_seconds = 0.0
+
+    def write(self, call_sid: str, role: str, content: str) -> bool:
+        """
+        Queue a message for persistence without waiting; returns False if it was dropped
+        """
+        message = {
+            "call_sid": call_sid,
+            "role": role,
+            "content": content,
+            "created_at": datetime.utcnow(),
+        }
+
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.error(
+                "Message buffer full; dropping message",
+                extra={"call_sid": call_sid, "buffer_size": self.max_buffer}
+            )
+            return False
+
+        self.enqueued += 1
+        self.high_water_mark = max(self.high_water_mark, self._queue.qsize())
+        return True
+
+    async def start(self):
+        """
+        Start the background flusher
+        """
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_forever())
+
+    async def stop(self):
+        """
+        Stop the flusher and write everything still buffered
+        """
+        if self._flusher is not None:
+            if not self._flusher.done():
+                # Not cancelled: the batch it is collecting would be lost
+                await self._queue.put(_STOP)
+                await self._flusher
+            self._flusher = None
+
+        while not self._queue.empty():
+            await self._write_batch(self._drain(self.batch_size))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "buffered": self._queue.qsize(),
+            "max_buffer": self.max_buffer,
+            "high_water_mark": self.high_water_mark,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "flush_errors": self.flush_errors,
+            "last_flush_seconds": self.last_flush_seconds,
+        }
+
+    async def _flush_forever(self):
+        stopping = False
+        while not stopping:
+            # Wait for the first message, then give the batch until the interval to fill
+            batch = []
+            message = await self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+
+            while True:
+                if message is _STOP:
+                    stopping = True
+                    break
+                batch.append(message)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.batch_size or remaining <= 0:
+                    break
+                try:
+                    message = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            await self._write_batch(batch)
+
+    def _drain(self, limit: int) -> List[Dict[str, Any]]:
+        batch = []
+        while len(batch) < limit and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _write_batch(self, batch: List[Dict[str, Any]]):
+        if not batch:
+            return
+
+        start_time = time.perf_counter()
+        try:
+            await asyncio.to_thread(save_messages, batch)
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            self.flush_errors += 1
+            logger.error(f"Error writing {len(batch)} messages: {str(e)}", exc_info=True)
+        finally:
+            self.last_flush_seconds = time.perf_counter() - start_time
+
+
+# Process-wide writer, started and stopped with the app
+message_writer = MessageWriter()
@@ -0,0 +1,134 @@
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+STORAGE_MODES = ("float32", "float16", "int8")
+
+_CODE_DTYPES = {"float16": np.float16, "int8": np.int8}
+
+# Rows decoded to float32 at a time while scoring
+DECODE_BLOCK_ROWS = 2048
+
+
+def quantize(vectors: np.ndarray, mode: str):
+    """
+    Encode float32 rows as (codes, scales). scales is None except for int8,
+    where each row gets its own scale so that its largest component maps to 127.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if mode == "float16":
+        return vectors.astype(np.float16), None
+    if mode == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales = np.maximum(scales, 1e-12).astype(np.float32)
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales
+    raise ValueError(f"Unknown quantized storage mode: {mode}")
+
+
+def dequantize(codes: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+    vectors = codes.astype(np.float32)
+    if scales is not None:
+        vectors *= scales[:, None]
+    return vectors
+
+
+class QuantizedVectors:
+    """
+    Compact in-memory copy of a knowledge base's vectors (float16, or int8
+    with a per-row scale), persisted next to the float32 matrix. It is used
+    for the coarse pass of a search; the float32 rows stay memory-mapped on
+    disk and are only touched to re-rank the few best candidates.
+    """
+    SCALES_FILE = "scales.f32"
+
+    def __init__(self, mode: str, dim: int, codes: np.ndarray = None, scales: np.ndarray = None):
+        if mode not in _CODE_DTYPES:
+            raise ValueError(f"Unknown quantized storage mode: {mode}")
+
+        self.mode = mode
+        self.dim = dim
+        self.codes = codes if codes is not None else np.zeros((0, dim), dtype=_CODE_DTYPES[mode])
+        self.scales = scales
+        if mode == "int8" and self.scales is None:
+            self.scales = np.zeros(0, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    @staticmethod
+    def codes_file(mode: str) -> str:
+        return f"codes.{'f16' if mode == 'float16' else 'i8'}"
+
+    @classmethod
+    def load(cls, path: Path, mode: str, dim: int, count: int) -> Optional["QuantizedVectors"]:
+        codes_path = Path(path) / cls.codes_file(mode)
+        if not codes_path.exists():
+            return None
+
+        codes = np.fromfile(codes_path, dtype=_CODE_DTYPES[mode], count=count * dim)
+        if len(codes) != count * dim:
+            return None
+        scales = None
+        if mode == "int8":
+            scales = np.fromfile(Path(path) / cls.SCALES_FILE, dtype=np.float32, count=count)
+            if len(scales) != count:
+                return None
+
+        return cls(mode, dim, codes.reshape(count, dim), scales)
+
+    @classmethod
+    def from_vectors(cls, vectors: np.ndarray, mode: str) -> "QuantizedVectors":
+        """
+        Quantize an existing matrix, block by block
+        """
+        quantized = cls(mode, vectors.shape[1])
+        for start in range(0, len(vectors), 65536):
+            quantized.append(vectors[start:start + 65536])
+        return quantized
+
+    def append(self, vectors: np.ndarray):
+        codes, scales = quantize(vectors, self.mode)
+        self.codes = np.concatenate((self.codes, codes))
+        if scales is not None:
+            self.scales = np.concatenate((self.scales, scales))
+
+    def save(self, path: Path, start_row: int = 0):
+        """
+        Write rows from start_row onward, discarding anything already past it
+        """
+        self._write(Path(path) / self.codes_file(self.mode), self.codes, start_row)
+        if self.scales is not None:
+            self._write(Path(path) / self.SCALES_FILE, self.scales, start_row)
+
+    def score_block(self, start: int, stop: int, query_vectors: np.ndarray) -> np.ndarray:
+        """
+        Approximate scores of rows [start, stop) against queries: (rows, queries)
+        """
+        scores = np.empty((stop - start, len(query_vectors)), dtype=np.float32)
+        buffer = np.empty((DECODE_BLOCK_ROWS, self.dim), dtype=np.float32)
+
+        # Decode a cache-sized slice at a time instead of materializing the whole block
+        for offset in range(start, stop, DECODE_BLOCK_ROWS):
+            end = min(offset + DECODE_BLOCK_ROWS, stop)
+            decoded = buffer[:end - offset]
+            decoded[...] = self.codes[offset:end]
+            np.matmul(decoded, query_vectors.T, out=scores[offset - start:end - start])
+
+        if self.scales is not None:
+            scores *= self.scales[start:stop, None]
+        return scores
+
+    @staticmethod
+    def _write(file_path: Path, array: np.ndarray, start_row: int):
+        row_bytes = array.itemsize * (array.shape[1] if array.ndim > 1 else 1)
+        mode = "r+b" if start_row and file_path.exists() else "wb"
+        with open(file_path, mode) as f:
+            f.seek(start_row * row_bytes)
+            f.write(np.ascontiguousarray(array[start_row:]).tobytes())
+            f.truncate()
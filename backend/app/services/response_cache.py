@@ -0,0 +1,116 @@
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_utterance(text: str) -> str:
+    """
+    Normalize an utterance so trivially different phrasings share a cache entry
+    """
+    text = _NON_WORD.sub(" ", (text or "").lower())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache of LLM responses with a per-entry TTL.
+
+    Keys combine the tenant, the normalized utterance, a fingerprint of the
+    system prompt (which carries the retrieved knowledge context) and the
+    tail of the conversation history, so an answer is only reused when the
+    model would have seen the same input.
+    """
+    def __init__(self, max_entries: int = None, ttl_seconds: int = None, history_messages: int = None):
+        self.max_entries = max_entries or settings.RESPONSE_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds or settings.RESPONSE_CACHE_TTL_SECONDS
+        self.history_messages = history_messages if history_messages is not None else settings.RESPONSE_CACHE_HISTORY_MESSAGES
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def make_key(self, tenant_id: str, prompt: str, system_prompt: str = None,
+                 history: List[Dict[str, str]] = None, context: str = None) -> str:
+        """
+        Build the cache key for a turn
+        """
+        digest = hashlib.sha256()
+        digest.update((tenant_id or "").encode("utf-8"))
+        digest.update(b"\x00")
+        digest.update(normalize_utterance(prompt).encode("utf-8"))
+        digest.update(b"\x00")
+        digest.update(hashlib.sha256((system_prompt or "").encode("utf-8")).digest())
+        digest.update(hashlib.sha256((context or "").encode("utf-8")).digest())
+
+        tail = (history or [])[-self.history_messages:] if self.history_messages else []
+        for message in tail:
+            digest.update(b"\x00")
+            digest.update(message["role"].encode("utf-8"))
+            digest.update(b":")
+            digest.update(normalize_utterance(message["content"]).encode("utf-8"))
+
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Return a cached response, or None on a miss or expiry
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: str):
+        """
+        Store a response, evicting the least recently used entry if full
+        """
+        if not value:
+            return
+
+        self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Hit/miss counters for monitoring
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Process-wide cache shared by all calls
+response_cache = ResponseCache()
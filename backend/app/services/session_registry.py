@@ -0,0 +1,175 @@
+import asyncio
+import inspect
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger("twilio")
+
+
+class _SessionEntry:
+    __slots__ = ("value", "created_at", "last_access")
+
+    def __init__(self, value: Any):
+        now = time.monotonic()
+        self.value = value
+        self.created_at = now
+        self.last_access = now
+
+
+class CallSessionRegistry:
+    """
+    In-process registry of live call sessions keyed by CallSid.
+
+    Entries are evicted after an absolute TTL or after being idle for too long,
+    and completion hooks fire whenever a session leaves the registry.
+    """
+    def __init__(self, ttl_seconds: int = None, idle_seconds: int = None,
+                 sweep_interval: int = None):
+        self.ttl_seconds = ttl_seconds or settings.CALL_SESSION_TTL_SECONDS
+        self.idle_seconds = idle_seconds or settings.CALL_SESSION_IDLE_SECONDS
+        self.sweep_interval = sweep_interval or settings.CALL_SESSION_SWEEP_SECONDS
+
+        self._sessions: Dict[str, _SessionEntry] = {}
+        self._completion_hooks: List[Callable] = []
+        self._sweeper: Optional[asyncio.Task] = None
+        # Completion hooks of sessions found expired on lookup, still running
+        self._pending_hooks: Set[asyncio.Task] = set()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, call_sid: str):
+        return call_sid in self._sessions
+
+    def get(self, call_sid: str):
+        """
+        Return the live session for a call, or None. A session found expired
+        is ended (its completion hooks are scheduled) rather than returned.
+        """
+        entry = self._sessions.get(call_sid)
+        if entry is None:
+            return None
+        if self._is_expired(entry, time.monotonic()):
+            self._expire(call_sid, entry)
+            return None
+
+        entry.last_access = time.monotonic()
+        return entry.value
+
+    def get_or_create(self, call_sid: str, factory: Callable[[], Any]):
+        """
+        Return the live session for a call, creating it with factory() on first use
+        """
+        session = self.get(call_sid)
+        if session is not None:
+            return session
+
+        # Creation has no awaits, so concurrent webhooks cannot race here
+        session = factory()
+        self._sessions[call_sid] = _SessionEntry(session)
+        logger.debug(f"Created call session {call_sid}", extra={"call_sid": call_sid})
+        return session
+
+    def add_completion_hook(self, hook: Callable[[str, Any, str], Any]):
+        """
+        Register a hook called as hook(call_sid, session, reason) when a session ends.
+        Hooks may be plain functions or coroutines.
+        """
+        self._completion_hooks.append(hook)
+
+    async def complete(self, call_sid: str, reason: str = "completed"):
+        """
+        Remove a call's session and fire the completion hooks
+        """
+        entry = self._sessions.pop(call_sid, None)
+        if entry is None:
+            return None
+
+        await self._fire_hooks(call_sid, entry.value, reason)
+        return entry.value
+
+    async def evict_expired(self) -> int:
+        """
+        Remove sessions past their TTL or idle timeout
+        """
+        now = time.monotonic()
+        expired = [
+            call_sid for call_sid, entry in self._sessions.items()
+            if self._is_expired(entry, now)
+        ]
+
+        for call_sid in expired:
+            await self.complete(call_sid, reason="expired")
+
+        return len(expired)
+
+    async def start(self):
+        """
+        Start the background eviction sweeper
+        """
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep_forever())
+
+    async def stop(self):
+        """
+        Stop the sweeper and end every remaining session
+        """
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+        for call_sid in list(self._sessions):
+            await self.complete(call_sid, reason="shutdown")
+
+        if self._pending_hooks:
+            await asyncio.gather(*self._pending_hooks, return_exceptions=True)
+
+    def _expire(self, call_sid: str, entry: _SessionEntry):
+        """
+        Remove an expired session found on lookup and fire its completion
+        hooks in the background, so a replacement can be created right away
+        """
+        del self._sessions[call_sid]
+        task = asyncio.get_running_loop().create_task(self._fire_hooks(call_sid, entry.value, "expired"))
+        self._pending_hooks.add(task)
+        task.add_done_callback(self._pending_hooks.discard)
+
+    def _is_expired(self, entry: _SessionEntry, now: float) -> bool:
+        return (
+            now - entry.created_at > self.ttl_seconds
+            or now - entry.last_access > self.idle_seconds
+        )
+
+    async def _sweep_forever(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                evicted = await self.evict_expired()
+                if evicted:
+                    logger.info(f"Evicted {evicted} expired call sessions")
+            except Exception as e:
+                logger.error(f"Error evicting call sessions: {str(e)}", exc_info=True)
+
+    async def _fire_hooks(self, call_sid: str, session: Any, reason: str):
+        for hook in self._completion_hooks:
+            try:
+                result = hook(call_sid, session, reason)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(
+                    f"Call completion hook failed: {str(e)}",
+                    exc_info=True,
+                    extra={"call_sid": call_sid}
+                )
+
+
+# Process-wide registry shared by the Twilio webhooks
+call_sessions = CallSessionRegistry()
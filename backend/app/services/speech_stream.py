@@ -0,0 +1,75 @@
+import asyncio
+from typing import AsyncIterator, List, Tuple
+
+from app.core.logging import get_logger
+from app.services.cancellation import TurnCancelled
+
+logger = get_logger("llm")
+
+_END = object()
+
+
+class SpeechStream:
+    """
+    Runs a sentence generator in the background and hands its output to the
+    voice layer in batches, so the first sentence can be spoken while the
+    rest of the response is still being generated.
+
+    turn is the caller turn the stream answers; webhooks for a call pass it
+    back so they only ever read the response to the turn they belong to.
+    """
+    def __init__(self, sentences: AsyncIterator[str], turn: int = 0):
+        self.turn = turn
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self.finished = False
+        self.error = None
+        self._task = asyncio.create_task(self._pump(sentences))
+
+    async def _pump(self, sentences: AsyncIterator[str]):
+        try:
+            async for sentence in sentences:
+                self._queue.put_nowait(sentence)
+        except asyncio.CancelledError:
+            raise
+        except TurnCancelled:
+            # Superseded by a newer turn or the call ended
+            pass
+        except Exception as e:
+            self.error = e
+            logger.error(f"Error streaming response: {str(e)}", exc_info=True)
+        finally:
+            self._queue.put_nowait(_END)
+
+    async def next_batch(self, timeout: float = None) -> Tuple[List[str], bool]:
+        """
+        Wait for at least one sentence, then return everything already available.
+
+        Returns (sentences, finished). On timeout the batch is empty and
+        finished is False, so the caller should come back for more.
+        """
+        if self.finished:
+            return [], True
+
+        try:
+            item = await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return [], False
+
+        batch = []
+        while True:
+            if item is _END:
+                self.finished = True
+                break
+            batch.append(item)
+            if self._queue.empty():
+                break
+            item = self._queue.get_nowait()
+
+        return batch, self.finished
+
+    def cancel(self):
+        """
+        Stop generating; anything not yet spoken is discarded
+        """
+        self.finished = True
+        self._task.cancel()
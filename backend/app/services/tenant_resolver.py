@@ -0,0 +1,157 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.db.crud import get_tenant_by_phone_number
+
+logger = get_logger("app")
+
+
+@dataclass
+class TenantConfig:
+    """
+    Everything a call needs to know about the tenant that owns the dialed number
+    """
+    user_id: str
+    phone_number: str
+    knowledge_base_id: Optional[str] = None
+    # Integration config by provider ("openai", "twilio", "deepgram", ...)
+    integrations: Dict[str, Any] = field(default_factory=dict)
+    schedule_config: Optional[Any] = None
+    greeting: Optional[str] = None
+    # Where callers asking for a person are transferred, if anywhere
+    transfer_number: Optional[str] = None
+
+    def integration(self, provider: str):
+        return self.integrations.get(provider)
+
+
+def normalize_phone_number(number: str) -> str:
+    """
+    Reduce a number to + and digits so formatting differences share a cache entry
+    """
+    number = (number or "").strip()
+    digits = "".join(ch for ch in number if ch.isdigit())
+    return ("+" + digits) if number.startswith("+") else digits
+
+
+class TenantResolver:
+    """
+    TTL-bounded in-memory cache from dialed number to TenantConfig.
+
+    The first call to a number reads the tenant, its integrations, knowledge
+    base and scheduling config from the database in a worker thread;
+    concurrent calls to the same number share that read. Numbers with no
+    tenant are cached for a shorter time. Entries must be invalidated when
+    a tenant's integrations or numbers change.
+    """
+    def __init__(self, ttl_seconds: int = None, negative_ttl_seconds: int = None, max_entries: int = None):
+        self.ttl_seconds = ttl_seconds or settings.TENANT_CACHE_TTL_SECONDS
+        self.negative_ttl_seconds = negative_ttl_seconds or settings.TENANT_CACHE_NEGATIVE_TTL_SECONDS
+        self.max_entries = max_entries or settings.TENANT_CACHE_MAX_ENTRIES
+
+        # number -> (expires_at, tenant or None)
+        self._entries: "OrderedDict[str, Tuple[float, Optional[TenantConfig]]]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Task] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    async def resolve(self, phone_number: str) -> Optional[TenantConfig]:
+        """
+        Tenant that owns a number, or None if no tenant does
+        """
+        number = normalize_phone_number(phone_number)
+        if not number:
+            return None
+
+        entry = self._entries.get(number)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(number)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        task = self._loading.get(number)
+        if task is None:
+            task = asyncio.ensure_future(self._load(number))
+            self._loading[number] = task
+        return await asyncio.shield(task)
+
+    def invalidate_number(self, phone_number: str):
+        self._entries.pop(normalize_phone_number(phone_number), None)
+
+    def invalidate_user(self, user_id: str):
+        """
+        Drop every cached number owned by a user, e.g. after one of their
+        integrations was created, edited or deleted
+        """
+        for number, (_, tenant) in list(self._entries.items()):
+            if tenant is not None and tenant.user_id == user_id:
+                del self._entries[number]
+        # A read already in flight may return the old config; don't keep it
+        for number, task in list(self._loading.items()):
+            task.add_done_callback(lambda _, number=number: self._drop_if_owned(number, user_id))
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    async def _load(self, number: str) -> Optional[TenantConfig]:
+        try:
+            record = await asyncio.to_thread(get_tenant_by_phone_number, number)
+            tenant = self._to_config(number, record) if record else None
+
+            ttl = self.ttl_seconds if tenant is not None else self.negative_ttl_seconds
+            self._entries[number] = (time.monotonic() + ttl, tenant)
+            self._entries.move_to_end(number)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return tenant
+        except Exception as e:
+            logger.error(f"Error resolving tenant for {number}: {str(e)}", exc_info=True)
+            raise
+        finally:
+            self._loading.pop(number, None)
+
+    def _drop_if_owned(self, number: str, user_id: str):
+        entry = self._entries.get(number)
+        if entry is not None and entry[1] is not None and entry[1].user_id == user_id:
+            del self._entries[number]
+
+    @staticmethod
+    def _to_config(number: str, record) -> TenantConfig:
+        def get(name, default=None):
+            if isinstance(record, dict):
+                return record.get(name, default)
+            return getattr(record, name, default)
+
+        integrations = get("integrations") or {}
+        if not isinstance(integrations, dict):
+            integrations = {integration.provider: integration for integration in integrations}
+
+        return TenantConfig(
+            user_id=get("user_id"),
+            phone_number=number,
+            knowledge_base_id=get("knowledge_base_id"),
+            integrations=integrations,
+            schedule_config=get("schedule_config"),
+            greeting=get("greeting"),
+            transfer_number=get("transfer_number")
+        )
+
+
+# Process-wide resolver; integration routes call invalidate_user after edits
+tenant_resolver = TenantResolver()
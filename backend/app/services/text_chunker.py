@@ -0,0 +1,149 @@
+import re
+from typing import Iterator, List, Tuple
+
+from app.core.config import settings
+from app.services.conversation_history import get_encoding
+
+# End of a sentence (terminal punctuation, optional closing quotes/brackets,
+# then whitespace) or a paragraph break
+SEGMENT_BOUNDARY = re.compile(r"(?<=[.!?])[\"')\]]*\s+|\n[ \t]*\n\s*")
+
+PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n")
+
+# Text held back waiting for a sentence boundary is cut at whitespace past
+# this many characters per token of chunk size, so a boundary-free input
+# cannot grow the buffer without limit
+MAX_PENDING_CHARS_PER_TOKEN = 16
+
+
+class TokenChunker:
+    """
+    Splits text into chunks of at most max_tokens tokens that end on
+    sentence boundaries, preferring paragraph boundaries once a chunk is
+    reasonably full. Consecutive chunks share up to overlap_tokens of whole
+    trailing sentences.
+
+    Text can be fed incrementally (e.g. one page at a time); only the
+    unfinished last sentence is held back between calls, and every segment
+    is tokenized once, so a whole document is chunked in one linear pass.
+    Chunks are tagged with the section they start in.
+    """
+    def __init__(self, max_tokens: int = None, overlap_tokens: int = None, model: str = None):
+        self.max_tokens = max_tokens or settings.CHUNK_MAX_TOKENS
+        self.overlap_tokens = overlap_tokens if overlap_tokens is not None else settings.CHUNK_OVERLAP_TOKENS
+        self.overlap_tokens = min(self.overlap_tokens, self.max_tokens // 2)
+        # Close a chunk at a paragraph break once it is this full
+        self.paragraph_tokens = self.max_tokens * 3 // 4
+        self.encoding = get_encoding(model or settings.EMBEDDING_MODEL)
+
+        self._pending = ""
+        self._pending_section = 0
+        # Segments of the chunk being built: (section, text, tokens)
+        self._segments: List[Tuple[int, str, int]] = []
+        self._tokens = 0
+        # Number of leading segments carried over from the previous chunk
+        self._carried = 0
+
+    def feed(self, section: int, text: str) -> Iterator[Tuple[int, str]]:
+        if not text:
+            return
+        if not self._pending:
+            self._pending_section = section
+        text = self._pending + text
+
+        segments = []
+        start = 0
+        for match in SEGMENT_BOUNDARY.finditer(text):
+            segments.append(text[start:match.end()])
+            start = match.end()
+        self._pending = text[start:]
+
+        limit = self.max_tokens * MAX_PENDING_CHARS_PER_TOKEN
+        if len(self._pending) > limit:
+            cut = self._pending.rfind(" ", 0, limit) + 1 or limit
+            segments.append(self._pending[:cut])
+            self._pending = self._pending[cut:]
+
+        if segments:
+            # Only the first segment can start in the section held back from the previous call
+            sections = [self._pending_section] + [section] * (len(segments) - 1)
+            yield from self._add_segments(segments, sections)
+            self._pending_section = section
+
+    def flush(self) -> Iterator[Tuple[int, str]]:
+        if self._pending.strip():
+            yield from self._add_segments([self._pending], [self._pending_section])
+        self._pending = ""
+
+        if self._tokens and len(self._segments) > self._carried:
+            yield self._emit(carry=False)
+        self._segments = []
+        self._tokens = 0
+        self._carried = 0
+
+    def chunk(self, text: str) -> List[str]:
+        """
+        Chunk a complete text
+        """
+        chunks = [chunk for _, chunk in self.feed(0, text)]
+        chunks.extend(chunk for _, chunk in self.flush())
+        return chunks
+
+    def _add_segments(self, segments: List[str], sections: List[int]) -> Iterator[Tuple[int, str]]:
+        token_counts = [len(tokens) for tokens in self.encoding.encode_ordinary_batch(segments)]
+
+        for section, segment, tokens in zip(sections, segments, token_counts):
+            if tokens > self.max_tokens:
+                # A single sentence longer than a chunk: close the current
+                # chunk and split the sentence by tokens
+                if len(self._segments) > self._carried:
+                    yield self._emit(carry=False)
+                self._segments, self._tokens, self._carried = [], 0, 0
+                yield from self._split_long(segment, section)
+                continue
+
+            if self._tokens + tokens > self.max_tokens:
+                if len(self._segments) > self._carried:
+                    yield self._emit()
+                # Drop overlap that does not leave room for this segment
+                while self._segments and self._tokens + tokens > self.max_tokens:
+                    self._tokens -= self._segments.pop(0)[2]
+                    self._carried -= 1
+
+            self._segments.append((section, segment, tokens))
+            self._tokens += tokens
+
+            if self._tokens >= self.paragraph_tokens and PARAGRAPH_BREAK.search(segment):
+                yield self._emit()
+
+    def _emit(self, carry: bool = True) -> Tuple[int, str]:
+        chunk = (self._segments[0][0], "".join(text for _, text, _ in self._segments).strip())
+
+        # Start the next chunk with whole trailing sentences, up to overlap_tokens
+        carried: List[Tuple[int, str, int]] = []
+        carried_tokens = 0
+        if carry and self.overlap_tokens:
+            for segment in reversed(self._segments[1:]):
+                if carried_tokens + segment[2] > self.overlap_tokens:
+                    break
+                carried.insert(0, segment)
+                carried_tokens += segment[2]
+
+        self._segments = carried
+        self._tokens = carried_tokens
+        self._carried = len(carried)
+        return chunk
+
+    def _split_long(self, segment: str, section: int) -> Iterator[Tuple[int, str]]:
+        tokens = self.encoding.encode_ordinary(segment)
+        step = self.max_tokens - self.overlap_tokens
+        for start in range(0, len(tokens), step):
+            piece = self.encoding.decode(tokens[start:start + self.max_tokens]).strip()
+            if piece:
+                yield section, piece
+            if start + self.max_tokens >= len(tokens):
+                break
+
+
+def chunk_text(text: str, max_tokens: int = None, overlap_tokens: int = None) -> List[str]:
+    return TokenChunker(max_tokens, overlap_tokens).chunk(text)
@@ -0,0 +1,248 @@
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger("deepgram")
+
+# File extension and media type for each audio format
+AUDIO_FORMATS = {
+    "mp3": ("mp3", "audio/mpeg"),
+    "mulaw": ("ulaw", "audio/basic"),
+}
+
+
+def normalize_text(text: str) -> str:
+    return " ".join((text or "").split())
+
+
+class TTSCache:
+    """
+    Content-addressed disk cache of synthesized speech.
+
+    Each (voice, format, text) renders to one file named by its hash, so a
+    phrase is synthesized once and then served from disk to every call,
+    including after restarts. Files are kept in least-recently-used order
+    and the oldest are deleted once the cache exceeds max_bytes. Concurrent
+    requests for the same phrase share one synthesis.
+
+    Phrases spoken some other way (e.g. with <Say>) can be warmed: one that
+    comes up a second time, such as a cached answer, is rendered in the
+    background so later calls play it. One-off sentences are never
+    synthesized, and at most warm_concurrency background renders run at once.
+    """
+    def __init__(self, directory: str = None, max_bytes: int = None, voice: str = None,
+                 warm_concurrency: int = None, tracked_phrases: int = None):
+        self.directory = Path(directory or settings.TTS_CACHE_DIR)
+        self.max_bytes = max_bytes or settings.TTS_CACHE_MAX_MB * 1024 * 1024
+        self.voice = voice or settings.TTS_VOICE
+        self.tracked_phrases = tracked_phrases or settings.TTS_WARM_TRACKED_PHRASES
+
+        # file name -> size, least recently used first
+        self._files: "OrderedDict[str, int]" = OrderedDict()
+        self._rendering: Dict[str, asyncio.Task] = {}
+        # Background renders nobody is waiting for, held until they finish
+        self._warming: Set[asyncio.Task] = set()
+        self._warm_slots = asyncio.Semaphore(warm_concurrency or settings.TTS_WARM_CONCURRENCY)
+        # Phrases warmed once but not rendered, least recent first
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._loaded = False
+        self._deepgram = None
+        self._prerender_task: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.renders = 0
+        self.evictions = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(self._files.values())
+
+    def key(self, text: str, voice: str = None, audio_format: str = "mp3") -> str:
+        digest = hashlib.sha256(f"{voice or self.voice}\0{audio_format}\0{normalize_text(text)}".encode("utf-8"))
+        return f"{digest.hexdigest()}.{AUDIO_FORMATS[audio_format][0]}"
+
+    def path(self, name: str) -> Optional[Path]:
+        """
+        Path of a cached file by name, or None if it is not cached
+        """
+        if name not in self._files:
+            return None
+        self._files.move_to_end(name)
+        return self.directory / name
+
+    @staticmethod
+    def media_type(name: str) -> str:
+        extension = name.rsplit(".", 1)[-1]
+        for file_extension, media_type in AUDIO_FORMATS.values():
+            if file_extension == extension:
+                return media_type
+        return "application/octet-stream"
+
+    def cached(self, text: str, voice: str = None, audio_format: str = "mp3") -> Optional[str]:
+        """
+        Name of the cached file for a phrase, without rendering it
+        """
+        name = self.key(text, voice, audio_format)
+        return name if name in self._files else None
+
+    async def get(self, text: str, voice: str = None, audio_format: str = "mp3") -> str:
+        """
+        Name of the file for a phrase, rendering it if it is not cached
+        """
+        await self.load()
+        name = self.key(text, voice, audio_format)
+        if name in self._files:
+            self._files.move_to_end(name)
+            self.hits += 1
+            return name
+
+        task = self._rendering.get(name)
+        if task is None:
+            task = asyncio.ensure_future(self._render(name, text, voice, audio_format))
+            self._rendering[name] = task
+        return await asyncio.shield(task)
+
+    def warm(self, text: str, voice: str = None, audio_format: str = "mp3"):
+        """
+        Note that a phrase was spoken without cached audio. The second time
+        it comes up it is rendered in the background, without waiting.
+        """
+        name = self.key(text, voice, audio_format)
+        if name in self._files or name in self._rendering:
+            return
+        if name not in self._seen:
+            self._seen[name] = None
+            if len(self._seen) > self.tracked_phrases:
+                self._seen.popitem(last=False)
+            return
+
+        del self._seen[name]
+        task = asyncio.ensure_future(self._warm(text, voice, audio_format))
+        self._warming.add(task)
+        task.add_done_callback(self._warmed)
+
+    async def _warm(self, text: str, voice: Optional[str], audio_format: str):
+        async with self._warm_slots:
+            return await self.get(text, voice, audio_format)
+
+    def _warmed(self, task: asyncio.Task):
+        self._warming.discard(task)
+        if not task.cancelled():
+            # Already logged by _render
+            task.exception()
+
+    async def read(self, text: str, voice: str = None, audio_format: str = "mulaw") -> bytes:
+        """
+        Audio bytes for a phrase, rendering it if it is not cached
+        """
+        name = await self.get(text, voice, audio_format)
+        return await asyncio.to_thread((self.directory / name).read_bytes)
+
+    async def start(self, prompts: Iterable[str] = ()):
+        """
+        Index the cache and render the fixed prompts in the background
+        """
+        await self.load()
+        self._prerender_task = asyncio.create_task(self.prerender(list(prompts)))
+
+    async def stop(self):
+        if self._prerender_task is not None and not self._prerender_task.done():
+            self._prerender_task.cancel()
+        for task in list(self._rendering.values()) + list(self._warming):
+            task.cancel()
+
+    async def prerender(self, texts: Iterable[str], voice: str = None, audio_format: str = "mp3"):
+        """
+        Make sure phrases are cached, e.g. fixed prompts at startup
+        """
+        results = await asyncio.gather(
+            *(self.get(text, voice, audio_format) for text in texts),
+            return_exceptions=True
+        )
+        failed = [result for result in results if isinstance(result, Exception)]
+        if failed:
+            logger.warning(f"Failed to pre-render {len(failed)} of {len(results)} prompts: {failed[0]}")
+
+    async def load(self):
+        """
+        Index files already on disk, oldest access first
+        """
+        if self._loaded:
+            return
+        self._loaded = True
+        self._files = OrderedDict(await asyncio.to_thread(self._scan))
+        self._evict()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "files": len(self._files),
+            "size_bytes": self.size_bytes,
+            "hits": self.hits,
+            "renders": self.renders,
+            "evictions": self.evictions,
+        }
+
+    def _scan(self) -> List[Tuple[str, int]]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                entries.append((stat.st_atime, entry.name, stat.st_size))
+        entries.sort()
+        return [(name, size) for _, name, size in entries]
+
+    async def _render(self, name: str, text: str, voice: Optional[str], audio_format: str) -> str:
+        try:
+            audio = await self._get_deepgram().text_to_speech(
+                normalize_text(text), voice=voice or self.voice, audio_format=audio_format
+            )
+            if not audio:
+                raise ValueError("Text-to-speech returned no audio")
+
+            await asyncio.to_thread(self._write, name, audio)
+            self._files[name] = len(audio)
+            self.renders += 1
+            self._evict(keep=name)
+            return name
+        except Exception as e:
+            logger.error(f"Error rendering speech: {str(e)}", exc_info=True)
+            raise
+        finally:
+            self._rendering.pop(name, None)
+
+    def _write(self, name: str, audio: bytes):
+        tmp_path = self.directory / (name + ".tmp")
+        tmp_path.write_bytes(audio)
+        os.replace(tmp_path, self.directory / name)
+
+    def _evict(self, keep: Optional[str] = None):
+        total = self.size_bytes
+        for name in list(self._files):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            total -= self._files.pop(name)
+            self.evictions += 1
+            try:
+                (self.directory / name).unlink()
+            except FileNotFoundError:
+                pass
+
+    def _get_deepgram(self):
+        if self._deepgram is None:
+            from app.services.deepgram_service import DeepgramService
+
+            self._deepgram = DeepgramService()
+        return self._deepgram
+
+
+# Process-wide cache shared by the webhooks and media streams
+tts_cache = TTSCache()
@@ -0,0 +1,96 @@
+import asyncio
+import inspect
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from app.core.logging import get_logger
+from app.services.cancellation import TurnCancelled
+
+logger = get_logger("app")
+
+_REQUIRED = object()
+
+
+class Stage:
+    """
+    One step of a turn.
+
+    func is called with the results of the stages it depends on as keyword
+    arguments and may be sync or async. A stage with a default degrades to
+    that value when it times out or fails; a stage without one fails the turn.
+    Cancellation is never degraded: it always stops the turn.
+    """
+    def __init__(self, name: str, func: Callable[..., Any], depends_on: Iterable[str] = (),
+                 timeout: Optional[float] = None, default: Any = _REQUIRED):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        self.timeout = timeout
+        self.default = default
+
+    @property
+    def optional(self) -> bool:
+        return self.default is not _REQUIRED
+
+
+class TurnPipeline:
+    """
+    Runs a graph of stages, starting each one as soon as its dependencies
+    have finished so independent I/O overlaps.
+    """
+    def __init__(self, stages: List[Stage]):
+        self.stages = {stage.name: stage for stage in stages}
+        self.timings: Dict[str, float] = {}
+        self.degraded: List[str] = []
+
+        for stage in stages:
+            missing = [name for name in stage.depends_on if name not in self.stages]
+            if missing:
+                raise ValueError(f"Stage {stage.name} depends on unknown stages: {missing}")
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Run every stage and return their results by name
+        """
+        tasks: Dict[str, asyncio.Task] = {}
+        for name, stage in self.stages.items():
+            tasks[name] = asyncio.ensure_future(self._run_stage(stage, tasks))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+
+        return {name: task.result() for name, task in tasks.items()}
+
+    async def _run_stage(self, stage: Stage, tasks: Dict[str, asyncio.Task]):
+        if stage.depends_on:
+            await asyncio.gather(*(tasks[name] for name in stage.depends_on))
+        inputs = {name: tasks[name].result() for name in stage.depends_on}
+
+        start_time = time.perf_counter()
+        try:
+            result = stage.func(**inputs)
+            if inspect.isawaitable(result):
+                result = await asyncio.wait_for(result, stage.timeout)
+            return result
+        except (asyncio.CancelledError, TurnCancelled):
+            # Barge-in or hang-up; the whole turn stops, nothing went wrong
+            logger.debug(f"Stage {stage.name} cancelled")
+            raise
+        except asyncio.TimeoutError:
+            if not stage.optional:
+                raise
+            logger.warning(f"Stage {stage.name} timed out after {stage.timeout}s; continuing without it")
+            self.degraded.append(stage.name)
+            return stage.default
+        except Exception as e:
+            if not stage.optional:
+                raise
+            logger.error(f"Stage {stage.name} failed: {str(e)}; continuing without it", exc_info=True)
+            self.degraded.append(stage.name)
+            return stage.default
+        finally:
+            self.timings[stage.name] = time.perf_counter() - start_time
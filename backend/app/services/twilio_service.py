@@ -1,12 +1,17 @@
 import os
-from twilio.rest import Client
 from app.core.config import settings
 from app.models.integration import TwilioConfig
 from app.db.crud import get_user_integration
+from app.services.client_registry import clients
+from app.services.twiml import compile_templates
 
 class TwilioService:
-    def __init__(self, user_id=None, integration_id=None):
-        if user_id and integration_id:
+    def __init__(self, user_id=None, integration_id=None, config=None):
+        if config is not None:
+            # Config already resolved for this call's tenant
+            self.account_sid = config.account_sid
+            self.auth_token = config.auth_token
+        elif user_id and integration_id:
             # Get user-specific Twilio config
             twilio_config = get_user_integration(user_id, "twilio", integration_id)
             if not twilio_config:
@@ -18,25 +23,37 @@ class TwilioService:
             # Use default platform Twilio config
             self.account_sid = settings.TWILIO_ACCOUNT_SID
             self.auth_token = settings.TWILIO_AUTH_TOKEN
-        
-        self.client = Client(self.account_sid, self.auth_token)
     
-    def handle_incoming_call(self, call_sid, from_number, to_number):
-        """
-        Process an incoming call and return TwiML instructions
-        """
-        # Create a call record in the database
-        # Return TwiML to gather speech
-        gather_twiml = """
-        <?xml version="1.0" encoding="UTF-8"?>
-        <Response>
-            <Say>Hello, welcome to the automated appointment system. How can I help you today?</Say>
-            <Gather input="speech" action="/webhook/twilio/speech" method="POST" speechTimeout="auto" speechModel="phone_call">
-                <Say>Please speak after the tone.</Say>
-            </Gather>
-        </Response>
-        """
-        return gather_twiml
+    @property
+    def client(self):
+        """
+        Shared, connection-pooled client for this account, looked up per
+        request so an evicted (and closed) client is never reused
+        """
+        return clients.twilio(self.account_sid, self.auth_token)
+    
+    def handle_incoming_call(self, call_sid, from_number, to_number, stream_url=None, templates=None, speak=None):
+        """
+        Process an incoming call and return TwiML instructions (as bytes).
+        
+        templates are the tenant's compiled TwiML templates; speak maps a
+        phrase to the verb that speaks it (e.g. <Play> of pre-rendered audio).
+        """
+        templates = templates or compile_templates()
+        
+        # Hand the call audio to our media stream endpoint when given one,
+        # otherwise gather speech
+        return templates.incoming(stream_url=stream_url, speak=speak)
+        
+    def update_call(self, call_sid, content):
+        """
+        Replace a live call's instructions with a TwiML document, e.g. to
+        hang up or transfer a call whose audio is on a media stream.
+        Blocking; run it in a worker thread from async code.
+        """
+        if isinstance(content, bytes):
+            content = content.decode("utf-8")
+        self.client.calls(call_sid).update(twiml=content)
         
     def process_speech(self, call_sid, speech_result):
         """
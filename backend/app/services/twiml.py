@@ -0,0 +1,170 @@
+import re
+from functools import lru_cache
+from typing import Callable, Iterable, Optional
+
+SPEECH_ACTION = "/webhook/twilio/speech"
+CONTINUE_ACTION = "/webhook/twilio/speech/continue"
+
+DEFAULT_GREETING = "Hello, welcome to the automated appointment system. How can I help you today?"
+LISTEN_PROMPT = "Please speak after the tone."
+FOLLOW_UP_PROMPT = "Anything else I can help you with?"
+ERROR_PROMPT = "Sorry, I'm having trouble answering right now."
+# Spoken while a slow answer is still being prepared
+FILLER_PROMPT = "One moment, please."
+
+# Phrases spoken on every call, pre-rendered when the TTS cache is enabled
+FIXED_PROMPTS = (DEFAULT_GREETING, LISTEN_PROMPT, FOLLOW_UP_PROMPT, ERROR_PROMPT, FILLER_PROMPT)
+
+RESPONSE_OPEN = '<?xml version="1.0" encoding="UTF-8"?><Response>'
+RESPONSE_CLOSE = "</Response>"
+
+# Characters XML 1.0 does not allow at all, even escaped
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+
+
+def escape(text: str) -> str:
+    """
+    Escape text for an XML element, dropping characters XML cannot carry
+    """
+    if not text.isprintable():
+        # Rare: newlines, tabs, control or unassigned characters
+        text = _INVALID_XML_CHARS.sub("", text)
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def quote(value: str) -> str:
+    """
+    Escape text for a double-quoted XML attribute
+    """
+    return escape(value).replace('"', "&quot;")
+
+
+# Verb builders return escaped markup; documents are encoded once, at the end
+
+def say(text: str) -> str:
+    return "<Say>" + escape(text) + "</Say>"
+
+
+def play(url: str) -> str:
+    return "<Play>" + escape(url) + "</Play>"
+
+
+def pause(length: int = 1) -> str:
+    return f'<Pause length="{int(length)}"/>'
+
+
+def redirect(url: str, method: str = "POST") -> str:
+    return f'<Redirect method="{quote(method)}">{escape(url)}</Redirect>'
+
+
+def gather(*children: str, action: str = SPEECH_ACTION, method: str = "POST") -> str:
+    """
+    Gather the caller's speech while the children play
+    """
+    return (
+        f'<Gather input="speech" action="{quote(action)}" method="{quote(method)}" '
+        f'speechTimeout="auto" speechModel="phone_call">{"".join(children)}</Gather>'
+    )
+
+
+def dial(number: str) -> str:
+    return "<Dial>" + escape(number) + "</Dial>"
+
+
+def hangup() -> str:
+    return "<Hangup/>"
+
+
+def call_ending(action: Optional[str], transfer_number: Optional[str] = None) -> Optional[str]:
+    """
+    The verb that carries out a call action: <Hangup/> for "hangup", a
+    <Dial> to transfer_number for "transfer", otherwise None
+    """
+    if action == "hangup":
+        return hangup()
+    if action == "transfer" and transfer_number:
+        return dial(transfer_number)
+    return None
+
+
+def connect_stream(url: str) -> str:
+    return f'<Connect><Stream url="{quote(url)}"/></Connect>'
+
+
+def response(*verbs: str) -> bytes:
+    """
+    A complete TwiML document, encoded and ready to send
+    """
+    return "".join((RESPONSE_OPEN, *verbs, RESPONSE_CLOSE)).encode("utf-8")
+
+
+class TwiMLTemplates:
+    """
+    The responses a call can receive, with everything that does not change
+    between turns (the greeting and fixed prompts, the Gather and Redirect
+    verbs) rendered once. Rendering a turn only escapes the new sentences,
+    joins strings and encodes the result.
+
+    speak maps a phrase to the verb that speaks it; callers pass one that
+    plays cached audio, and phrases without one fall back to these <Say>s.
+    """
+    def __init__(self, greeting: str = None, speech_action: str = SPEECH_ACTION,
+                 continue_action: str = CONTINUE_ACTION):
+        self.greeting = greeting or DEFAULT_GREETING
+        self.prompts = {text: say(text) for text in (self.greeting,) + FIXED_PROMPTS}
+
+        gather_verb = gather(action=speech_action)
+        self._gather_open = gather_verb[:-len("</Gather>")]
+        self._follow_up = gather(self.prompts[FOLLOW_UP_PROMPT], action=speech_action)
+        self._pause = pause(1)
+        self._redirect = redirect(continue_action)
+        self._redirect_open = f'<Redirect method="POST">{escape(continue_action)}'
+
+    def say(self, text: str) -> str:
+        verb = self.prompts.get(text)
+        return verb if verb is not None else say(text)
+
+    def incoming(self, stream_url: str = None, speak: Callable[[str], Optional[str]] = None) -> bytes:
+        """
+        First response of a call: the greeting, then either a media stream
+        or a Gather for the caller's first utterance
+        """
+        greeting = self._speak(self.greeting, speak)
+        if stream_url:
+            return response(greeting, connect_stream(stream_url))
+        return response(greeting, self._gather_open, self._speak(LISTEN_PROMPT, speak), "</Gather>")
+
+    def turn(self, verbs: Iterable[str], finished: bool, speak: Callable[[str], Optional[str]] = None,
+             turn_number: int = None, ending: str = None) -> bytes:
+        """
+        Speak a turn's verbs, then either gather the caller's next utterance
+        or redirect back for the rest of the response. The redirect carries
+        turn_number so a request for a superseded turn can be recognized.
+        A finished turn with an ending verb (<Hangup/>, <Dial>) ends the call
+        with it instead of gathering.
+        """
+        verbs = "".join(verbs)
+        if finished and ending:
+            follow_up = ending
+        elif finished:
+            verb = speak(FOLLOW_UP_PROMPT) if speak is not None else None
+            follow_up = self._follow_up if verb is None else self._gather_open + verb + "</Gather>"
+        else:
+            follow_up = self._redirect if turn_number is None else f"{self._redirect_open}?turn={int(turn_number)}</Redirect>"
+            if not verbs:
+                # Nothing ready yet; wait a moment before asking again
+                follow_up = self._pause + follow_up
+        return (RESPONSE_OPEN + verbs + follow_up + RESPONSE_CLOSE).encode("utf-8")
+
+    def _speak(self, text: str, speak: Optional[Callable[[str], Optional[str]]]) -> str:
+        verb = speak(text) if speak is not None else None
+        return verb if verb is not None else self.say(text)
+
+
+@lru_cache(maxsize=1024)
+def compile_templates(greeting: Optional[str] = None) -> TwiMLTemplates:
+    """
+    Templates for a tenant, compiled once and shared by tenants with the
+    same greeting
+    """
+    return TwiMLTemplates(greeting)
@@ -0,0 +1,778 @@
+import asyncio
+import copy
+import functools
+import hashlib
+import json
+import os
+import shutil
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from langchain.embeddings import OpenAIEmbeddings
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.services.ann_index import IVFIndex
+from app.services.index_manager import IndexManager, index_manager
+from app.services.lexical_index import LexicalIndex, reciprocal_rank_fusion
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.quantization import STORAGE_MODES, QuantizedVectors
+
+logger = get_logger("app")
+
+# Rows scored per block, so very large indexes never materialize a full score matrix
+SEARCH_BLOCK_ROWS = 65536
+
+# Fraction of deleted rows at which an index is compacted
+COMPACT_DELETED_FRACTION = 0.25
+
+
+@dataclass
+class SearchResult:
+    text: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    score: float = 0.0
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """
+    Scale rows to unit length so a dot product is the cosine similarity
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def content_hash(text: str) -> str:
+    """
+    Hash of a chunk's text, insensitive to whitespace differences from re-extraction
+    """
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores in each column, best first
+    """
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty((0,) + scores.shape[1:], dtype=np.int64)
+
+    candidates = np.argpartition(-scores, k - 1, axis=0)[:k]
+    candidate_scores = np.take_along_axis(scores, candidates, axis=0)
+    order = np.argsort(-candidate_scores, axis=0, kind="stable")
+    return np.take_along_axis(candidates, order, axis=0)
+
+
+class KnowledgeBaseIndex:
+    """
+    Vector index for one knowledge base.
+
+    Vectors are stored as one contiguous float32 matrix in a file that is
+    memory-mapped on load, next to a JSON-lines file with each row's text and
+    metadata. Writes are append-only; the row count and the committed length
+    of the chunks file in meta.json are updated last, so a partially written
+    append is ignored on the next load and overwritten by the next append.
+
+    Chunks are deduplicated by content hash: a row whose text is already
+    present is never stored twice. Rows are removed by tombstoning them in
+    meta.json; once enough rows are deleted the index is compacted. A
+    compacted file set is written to a staging directory and committed by
+    renaming it; meta.json is moved into place last, and a load finishes a
+    commit that was interrupted. Each
+    document's chunk hashes are kept in documents.json so that re-ingesting
+    a document only touches chunks that changed.
+
+    A BM25 lexical index over the same rows (see lexical_index) is kept
+    alongside for hybrid search; it is saved whenever a document is
+    recorded and rebuilt from the chunk texts if it is missing or stale.
+
+    An optional IVF index (see ann_index) can be built for approximate search
+    on large knowledge bases. In float16/int8 storage mode a quantized copy of
+    the vectors is kept in memory for the coarse pass of exact search and only
+    the best candidates are re-ranked against the memory-mapped float32 rows.
+
+    Searches and writes run in worker threads; lock serializes them per index.
+    """
+    VECTORS_FILE = "vectors.f32"
+    CHUNKS_FILE = "chunks.jsonl"
+    META_FILE = "meta.json"
+    DOCUMENTS_FILE = "documents.json"
+    COMPACT_STAGING_DIR = "compacting"
+    COMPACT_COMMIT_DIR = "compacted"
+
+    def __init__(self, path: Path, storage_mode: str = "float32"):
+        if storage_mode not in STORAGE_MODES:
+            raise ValueError(f"Unknown storage mode: {storage_mode}")
+
+        self.path = Path(path)
+        self.storage_mode = storage_mode
+        self.dim: Optional[int] = None
+        self.count = 0
+        # Bytes of chunks.jsonl holding the committed rows
+        self.chunks_bytes = 0
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.texts: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.ann: Optional[IVFIndex] = None
+        self.quantized: Optional[QuantizedVectors] = None
+        self.lexical = LexicalIndex()
+        self.deleted = np.zeros(0, dtype=bool)
+        self.hash_rows: Dict[str, int] = {}
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def deleted_count(self) -> int:
+        return int(self.deleted.sum())
+
+    @property
+    def live_count(self) -> int:
+        return self.count - self.deleted_count
+
+    @classmethod
+    def load(cls, path: Path, storage_mode: str = None) -> "KnowledgeBaseIndex":
+        """
+        Load an index from disk, converting it if a different storage mode is requested
+        """
+        cls._recover_compaction(Path(path))
+
+        meta_path = Path(path) / cls.META_FILE
+        if not meta_path.exists():
+            return cls(path, storage_mode or "float32")
+
+        meta = json.loads(meta_path.read_text())
+        index = cls(path, meta.get("storage_mode", "float32"))
+        index.dim = meta["dim"]
+        index.count = meta["count"]
+
+        with open(index.path / cls.CHUNKS_FILE, "rb") as f:
+            for _, line in zip(range(index.count), f):
+                record = json.loads(line)
+                index.texts.append(record["text"])
+                index.metadatas.append(record["metadata"])
+                # Indexes written before chunks_bytes was recorded: measure it
+                index.chunks_bytes += len(line)
+        index.chunks_bytes = meta.get("chunks_bytes", index.chunks_bytes)
+
+        index.deleted = np.zeros(index.count, dtype=bool)
+        deleted_rows = [row for row in meta.get("deleted", []) if row < index.count]
+        index.deleted[deleted_rows] = True
+        index._index_hashes()
+
+        documents_path = index.path / cls.DOCUMENTS_FILE
+        if documents_path.exists():
+            index.documents = json.loads(documents_path.read_text())
+
+        index._map_vectors()
+        index.ann = IVFIndex.load(index.path)
+
+        index.lexical = LexicalIndex.load(index.path)
+        if index.lexical is None or len(index.lexical) != index.count:
+            index.lexical = LexicalIndex.build(index.texts)
+            index.lexical.save(index.path)
+
+        if index.storage_mode != "float32":
+            index.quantized = QuantizedVectors.load(index.path, index.storage_mode, index.dim, index.count)
+            if index.quantized is None:
+                # Codes missing or out of step with the float32 rows; rebuild them
+                index.quantized = QuantizedVectors.from_vectors(index.vectors, index.storage_mode)
+                index.quantized.save(index.path)
+
+        if storage_mode and storage_mode != index.storage_mode:
+            index.set_storage_mode(storage_mode)
+
+        return index
+
+    def add(self, vectors: np.ndarray, texts: Sequence[str], metadatas: Sequence[Dict[str, Any]]):
+        """
+        Append normalized vectors with their texts and metadata. Rows whose
+        content_hash (in metadata) is already present are skipped.
+        """
+        vectors = normalize_rows(vectors)
+        keep = []
+        seen = set()
+        for i, metadata in enumerate(metadatas):
+            digest = metadata.get("content_hash")
+            if digest is None or (digest not in self.hash_rows and digest not in seen):
+                keep.append(i)
+                seen.add(digest)
+        if len(keep) < len(vectors):
+            vectors = vectors[keep]
+            texts = [texts[i] for i in keep]
+            metadatas = [metadatas[i] for i in keep]
+        if len(vectors) == 0:
+            return
+
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-dimensional vectors, got {vectors.shape[1]}")
+
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        with open(self.path / self.VECTORS_FILE, "r+b" if self.count else "wb") as f:
+            # Overwrite anything past the committed rows left by an interrupted append
+            f.seek(self.count * self.dim * 4)
+            f.write(np.ascontiguousarray(vectors).tobytes())
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+
+        chunks = "".join(
+            json.dumps({"text": text, "metadata": metadata}) + "\n" for text, metadata in zip(texts, metadatas)
+        ).encode("utf-8")
+        with open(self.path / self.CHUNKS_FILE, "r+b" if self.chunks_bytes else "wb") as f:
+            # Likewise for chunk lines past the committed length
+            f.seek(self.chunks_bytes)
+            f.write(chunks)
+            f.truncate()
+
+        if self.storage_mode != "float32":
+            if self.quantized is None:
+                self.quantized = QuantizedVectors(self.storage_mode, self.dim)
+            self.quantized.append(vectors)
+            self.quantized.save(self.path, start_row=self.count)
+
+        for row, metadata in enumerate(metadatas, start=self.count):
+            if metadata.get("content_hash") is not None:
+                self.hash_rows[metadata["content_hash"]] = row
+
+        self.lexical.add(texts)
+        self.count += len(vectors)
+        self.chunks_bytes += len(chunks)
+        self.texts.extend(texts)
+        self.metadatas.extend(metadatas)
+        self.deleted = np.concatenate((self.deleted, np.zeros(len(vectors), dtype=bool)))
+        self._write_meta()
+        self._map_vectors()
+
+    def delete(self, rows: Iterable[int]):
+        """
+        Tombstone rows so they are no longer returned by searches
+        """
+        rows = [row for row in rows if 0 <= row < self.count and not self.deleted[row]]
+        if not rows:
+            return
+
+        self.deleted[rows] = True
+        for row in rows:
+            digest = self.metadatas[row].get("content_hash")
+            if digest is not None and self.hash_rows.get(digest) == row:
+                del self.hash_rows[digest]
+        self._write_meta()
+
+    def set_document(self, document_key: str, doc_id: str, hashes: Sequence[str]) -> int:
+        """
+        Record the chunk hashes that make up a document and delete rows for
+        its previous chunks that neither it nor any other document still uses.
+        Returns the number of rows deleted.
+        """
+        previous = set(self.documents.get(document_key, {}).get("hashes", []))
+        self.documents[document_key] = {"doc_id": doc_id, "hashes": list(dict.fromkeys(hashes))}
+
+        stale = previous.difference(hashes)
+        if stale:
+            for key, document in self.documents.items():
+                if key != document_key:
+                    stale.difference_update(document["hashes"])
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._write_documents()
+        self.lexical.save(self.path)
+
+        rows = [self.hash_rows[digest] for digest in stale if digest in self.hash_rows]
+        self.delete(rows)
+        return len(rows)
+
+    def document_id(self, document_key: str) -> Optional[str]:
+        return self.documents.get(document_key, {}).get("doc_id")
+
+    def compact(self, min_deleted_fraction: float = COMPACT_DELETED_FRACTION) -> bool:
+        """
+        Rewrite the index without its deleted rows once they make up at least
+        min_deleted_fraction of it. The approximate index is remapped rather
+        than rebuilt. Returns whether the index was compacted.
+        """
+        deleted = self.deleted_count
+        if deleted == 0 or deleted < min_deleted_fraction * self.count:
+            return False
+
+        keep = ~self.deleted
+        new_rows = np.cumsum(keep) - 1
+
+        # Write the whole compacted file set aside; the live files are untouched until it is complete
+        staging = self.path / self.COMPACT_STAGING_DIR
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir()
+
+        with open(staging / self.VECTORS_FILE, "wb") as f:
+            for start in range(0, self.count, SEARCH_BLOCK_ROWS):
+                block = self.vectors[start:start + SEARCH_BLOCK_ROWS][keep[start:start + SEARCH_BLOCK_ROWS]]
+                f.write(np.ascontiguousarray(block, dtype=np.float32).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        texts = [text for text, live in zip(self.texts, keep) if live]
+        metadatas = [metadata for metadata, live in zip(self.metadatas, keep) if live]
+        chunks = "".join(
+            json.dumps({"text": text, "metadata": metadata}) + "\n" for text, metadata in zip(texts, metadatas)
+        ).encode("utf-8")
+        (staging / self.CHUNKS_FILE).write_bytes(chunks)
+
+        # The in-memory index keeps serving until the commit: compact copies of its parts
+        quantized = None
+        if self.quantized is not None:
+            quantized = QuantizedVectors(
+                self.quantized.mode, self.quantized.dim, self.quantized.codes[keep],
+                self.quantized.scales[keep] if self.quantized.scales is not None else None
+            )
+            quantized.save(staging)
+
+        ann = None
+        if self.ann is not None:
+            ann = copy.copy(self.ann)
+            ann.remove_rows(keep, new_rows)
+            ann.save(staging)
+
+        self.lexical._merge()
+        lexical = copy.copy(self.lexical)
+        lexical.remove_rows(keep, new_rows)
+        lexical.save(staging)
+
+        self._write_meta(staging, count=len(texts), chunks_bytes=len(chunks), deleted=[])
+
+        # Commit point: from here on a load completes the swap
+        os.replace(staging, self.path / self.COMPACT_COMMIT_DIR)
+        self._recover_compaction(self.path)
+
+        self.quantized = quantized
+        self.ann = ann
+        self.lexical = lexical
+        self.count = len(texts)
+        self.chunks_bytes = len(chunks)
+        self.texts = texts
+        self.metadatas = metadatas
+        self.deleted = np.zeros(self.count, dtype=bool)
+        self._index_hashes()
+        self._map_vectors()
+        return True
+
+    @classmethod
+    def _recover_compaction(cls, path: Path):
+        """
+        Move a committed compaction into place, meta.json last, and discard
+        one that was interrupted before it was committed. Safe to repeat.
+        """
+        shutil.rmtree(path / cls.COMPACT_STAGING_DIR, ignore_errors=True)
+
+        committed = path / cls.COMPACT_COMMIT_DIR
+        if not committed.is_dir():
+            return
+        for file_path in sorted(committed.iterdir(), key=lambda file_path: file_path.name == cls.META_FILE):
+            os.replace(file_path, path / file_path.name)
+        committed.rmdir()
+
+    def set_storage_mode(self, storage_mode: str):
+        """
+        Switch between float32-only and quantized (float16/int8) search
+        """
+        if storage_mode not in STORAGE_MODES:
+            raise ValueError(f"Unknown storage mode: {storage_mode}")
+
+        self.storage_mode = storage_mode
+        self.quantized = None
+        if storage_mode != "float32" and self.count:
+            self.quantized = QuantizedVectors.from_vectors(self.vectors, storage_mode)
+            self.quantized.save(self.path)
+        if self.count:
+            self._write_meta()
+
+    def memory_report(self) -> Dict[str, Any]:
+        """
+        Bytes held in memory versus left in the memory-mapped float32 file
+        """
+        float32_bytes = self.count * (self.dim or 0) * 4
+        quantized_bytes = self.quantized.nbytes if self.quantized is not None else 0
+        ann_bytes = 0
+        if self.ann is not None:
+            ann_bytes = self.ann.centroids.nbytes + self.ann.list_rows.nbytes
+            if self.ann.codes is not None:
+                ann_bytes += self.ann.codes.nbytes + self.ann.pq.codebooks.nbytes
+
+        # Exact float32 search scans every page of the mapped file, so it all stays resident
+        resident = quantized_bytes if self.quantized is not None else float32_bytes
+        return {
+            "storage_mode": self.storage_mode,
+            "rows": self.count,
+            "dim": self.dim,
+            "float32_bytes": float32_bytes,
+            "quantized_bytes": quantized_bytes,
+            "ann_bytes": ann_bytes,
+            "lexical_bytes": self.lexical.nbytes,
+            "resident_vector_bytes": resident + ann_bytes,
+            "compression": float32_bytes / resident if resident else 1.0,
+        }
+
+    def build_ann(self, nlist: int = None, pq_subvectors: int = 0):
+        """
+        Build (or rebuild) and persist the approximate index over all current rows
+        """
+        self.ann = IVFIndex.build(self.vectors, nlist=nlist, pq_subvectors=pq_subvectors)
+        self.ann.save(self.path)
+
+    def search(self, query_vectors: np.ndarray, top_k: int, approximate: bool = False, nprobe: int = None):
+        """
+        Top-k search for a batch of normalized query vectors.
+
+        Returns (indices, scores), each shaped (len(query_vectors), k). The
+        approximate index is used only when requested and it has been built.
+        Slots that could not be filled with a live row have index -1.
+        """
+        if approximate and self.ann is not None:
+            indices, scores = self._search_approximate(query_vectors, top_k, nprobe)
+        else:
+            indices, scores = self.search_exact(query_vectors, top_k)
+
+        if self.deleted_count:
+            indices[self.deleted[np.maximum(indices, 0)]] = -1
+        return indices, scores
+
+    def search_exact(self, query_vectors: np.ndarray, top_k: int):
+        """
+        Exact top-k search by a blocked matrix product.
+
+        With quantized storage the blocked pass runs over the compact codes and
+        its best rerank_factor * top_k candidates are re-scored in float32.
+        """
+        query_vectors = np.atleast_2d(query_vectors).astype(np.float32, copy=False)
+        k = min(top_k, self.count)
+        if k == 0:
+            empty = np.empty((len(query_vectors), 0))
+            return empty.astype(np.int64), empty.astype(np.float32)
+
+        if self.quantized is None:
+            return self._blocked_top_k(self._score_block, query_vectors, k)
+
+        candidate_count = min(self.count, k * settings.QUANTIZED_RERANK_FACTOR)
+        candidates, _ = self._blocked_top_k(self.quantized.score_block, query_vectors, candidate_count)
+
+        indices = np.empty((len(query_vectors), k), dtype=np.int64)
+        scores = np.empty((len(query_vectors), k), dtype=np.float32)
+        for i, query in enumerate(query_vectors):
+            rows = np.sort(candidates[i])
+            exact = np.asarray(self.vectors[rows], dtype=np.float32) @ query
+            exact[self.deleted[rows]] = -np.inf
+            best = top_k_indices(exact, k)
+            indices[i] = rows[best]
+            scores[i] = exact[best]
+
+        return indices, scores
+
+    def _score_block(self, start: int, stop: int, query_vectors: np.ndarray) -> np.ndarray:
+        return self.vectors[start:stop] @ query_vectors.T
+
+    def _blocked_top_k(self, score_block, query_vectors: np.ndarray, k: int):
+        best_indices = None
+        best_scores = None
+
+        for start in range(0, self.count, SEARCH_BLOCK_ROWS):
+            stop = min(start + SEARCH_BLOCK_ROWS, self.count)
+            scores = score_block(start, stop, query_vectors)
+            scores[self.deleted[start:stop]] = -np.inf
+            indices = top_k_indices(scores, k)
+            block_scores = np.take_along_axis(scores, indices, axis=0)
+            indices = indices + start
+
+            if best_indices is None:
+                best_indices, best_scores = indices, block_scores
+            else:
+                # Merge this block's winners with the running best
+                merged_indices = np.concatenate((best_indices, indices))
+                merged_scores = np.concatenate((best_scores, block_scores))
+                order = top_k_indices(merged_scores, k)
+                best_indices = np.take_along_axis(merged_indices, order, axis=0)
+                best_scores = np.take_along_axis(merged_scores, order, axis=0)
+
+        return best_indices.T, best_scores.T
+
+    def _search_approximate(self, query_vectors: np.ndarray, top_k: int, nprobe: int = None):
+        query_vectors = np.atleast_2d(query_vectors).astype(np.float32, copy=False)
+        k = min(top_k, self.count)
+        indices = np.full((len(query_vectors), k), -1, dtype=np.int64)
+        scores = np.full((len(query_vectors), k), -np.inf, dtype=np.float32)
+
+        # Ask for extra candidates to make up for deleted rows
+        search_k = min(self.count, k + min(self.deleted_count, k))
+        for i, query in enumerate(query_vectors):
+            rows, row_scores = self.ann.search(self.vectors, query, search_k, nprobe=nprobe)
+            live = ~self.deleted[rows]
+            rows, row_scores = rows[live][:k], row_scores[live][:k]
+            indices[i, :len(rows)] = rows
+            scores[i, :len(rows)] = row_scores
+
+        return indices, scores
+
+    def lexical_search(self, query: str, top_k: int):
+        """
+        BM25 top-k over live rows; returns (rows, scores), best first
+        """
+        return self.lexical.search(query, top_k, self.deleted if self.deleted_count else None)
+
+    def result(self, row: int, score: float) -> SearchResult:
+        return SearchResult(text=self.texts[row], metadata=self.metadatas[row], score=float(score))
+
+    def _map_vectors(self):
+        if self.count == 0:
+            self.vectors = np.zeros((0, self.dim or 0), dtype=np.float32)
+            return
+
+        self.vectors = np.memmap(
+            self.path / self.VECTORS_FILE,
+            dtype=np.float32,
+            mode="r",
+            shape=(self.count, self.dim)
+        )
+
+    def _index_hashes(self):
+        self.hash_rows = {
+            metadata["content_hash"]: row
+            for row, metadata in enumerate(self.metadatas)
+            if "content_hash" in metadata and not self.deleted[row]
+        }
+
+    def _write_meta(self, directory: Path = None, **overrides):
+        directory = directory or self.path
+        meta = {
+            "dim": self.dim,
+            "count": self.count,
+            "chunks_bytes": self.chunks_bytes,
+            "storage_mode": self.storage_mode,
+            "deleted": np.flatnonzero(self.deleted).tolist(),
+        }
+        meta.update(overrides)
+        tmp_path = directory / (self.META_FILE + ".tmp")
+        tmp_path.write_text(json.dumps(meta))
+        os.replace(tmp_path, directory / self.META_FILE)
+
+    def _write_documents(self):
+        tmp_path = self.path / (self.DOCUMENTS_FILE + ".tmp")
+        tmp_path.write_text(json.dumps(self.documents))
+        os.replace(tmp_path, self.path / self.DOCUMENTS_FILE)
+
+
+@functools.lru_cache(maxsize=None)
+def default_embeddings() -> OpenAIEmbeddings:
+    return OpenAIEmbeddings(
+        openai_api_key=settings.OPENAI_API_KEY,
+        model=settings.EMBEDDING_MODEL
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def default_query_batcher() -> EmbeddingBatcher:
+    """
+    Query batcher shared by every store using the default embeddings, so
+    concurrent calls are batched together
+    """
+    return EmbeddingBatcher(default_embeddings())
+
+
+async def close_default_query_batcher():
+    """
+    Close the shared query batcher on shutdown, if one was ever created
+    """
+    if default_query_batcher.cache_info().currsize:
+        await default_query_batcher().close()
+
+
+class VectorStore:
+    """
+    Embedded vector store with one memory-mapped index per knowledge base.
+
+    Loaded indexes are owned by an IndexManager (the process-wide one unless
+    a custom storage location is given), so every store shares them.
+    """
+    def __init__(self, embeddings=None, storage_dir: str = None, search_mode: str = None,
+                 storage_mode: str = None, indexes: IndexManager = None):
+        if embeddings is None:
+            self.embeddings = default_embeddings()
+            self.query_batcher = default_query_batcher()
+        else:
+            self.embeddings = embeddings
+            self.query_batcher = EmbeddingBatcher(embeddings)
+        self.search_mode = search_mode or settings.VECTOR_SEARCH_MODE
+
+        if indexes is None:
+            if storage_dir is None and storage_mode is None:
+                indexes = index_manager
+            else:
+                indexes = IndexManager(storage_dir=storage_dir, storage_mode=storage_mode)
+        self.indexes = indexes
+
+    def get_index(self, knowledge_base_id: str) -> KnowledgeBaseIndex:
+        """
+        Get the index for a knowledge base, loading it from disk on first use
+        """
+        return self.indexes.get(knowledge_base_id)
+
+    async def aget_index(self, knowledge_base_id: str) -> KnowledgeBaseIndex:
+        return await self.indexes.aget(knowledge_base_id)
+
+    def add_texts(self, texts: List[str], metadatas: List[Dict[str, Any]], knowledge_base_id: str):
+        """
+        Embed texts and append them to a knowledge base's index
+        """
+        if not texts:
+            return
+        vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+        index = self.get_index(knowledge_base_id)
+        self._locked(index, index.add, vectors, texts, metadatas)
+        self.indexes.refresh(knowledge_base_id)
+
+    async def aadd_texts(self, texts: List[str], metadatas: List[Dict[str, Any]], knowledge_base_id: str,
+                         index: KnowledgeBaseIndex = None):
+        """
+        Embed texts and append them to a knowledge base's index. Callers
+        making many appends pass the index they hold (see DocumentIngestor).
+        """
+        if not texts:
+            return
+        vectors = np.asarray(await self.embeddings.aembed_documents(texts), dtype=np.float32)
+        index = index or await self.aget_index(knowledge_base_id)
+        # Appending fsyncs the vectors file, so it runs in a worker thread
+        await self._run_locked(index, index.add, vectors, texts, metadatas)
+        self.indexes.refresh(knowledge_base_id)
+
+    def similarity_search(self, query: str, knowledge_base_id: str, top_k: int = 5,
+                          mode: str = None) -> List[SearchResult]:
+        """
+        Return the top_k chunks most similar to the query.
+
+        mode is "exact" or "approximate" and defaults to the store's search_mode;
+        approximate search falls back to exact until an index has been built.
+        """
+        query_vector = self.embeddings.embed_query(query)
+        return self.similarity_search_by_vector(query_vector, knowledge_base_id, top_k, mode)
+
+    async def asimilarity_search(self, query: str, knowledge_base_id: str, top_k: int = 5,
+                                 mode: str = None) -> List[SearchResult]:
+        # Embed the query while the index loads, if it is not resident yet
+        query_vector, index = await asyncio.gather(
+            self.query_batcher.embed(query),
+            self.aget_index(knowledge_base_id)
+        )
+        return await self._run_locked(index, self._search_index, index, query_vector, top_k, mode)
+
+    async def ahybrid_search(self, query: str, knowledge_base_id: str, top_k: int = 5,
+                             mode: str = None) -> List[SearchResult]:
+        """
+        Vector and BM25 search fused by reciprocal rank.
+
+        Queries naming a rare identifier that is in the index (a product
+        code, order number, ...) are answered from the lexical index alone,
+        without embedding the query. Result scores are fusion scores.
+        """
+        index = await self.aget_index(knowledge_base_id)
+
+        # Row numbers are only meaningful under the lock (a compaction can
+        # renumber them), so the searches, fusion and mapping back to chunks
+        # happen in one locked section, after the query is embedded
+        query_vector = None
+        if not await self._run_locked(index, index.lexical.is_identifier_query, query):
+            query_vector = await self.query_batcher.embed(query)
+
+        results = await self._run_locked(index, self._hybrid_search, index, query, query_vector, top_k, mode)
+        if results is None:
+            # The identifier's rows have all been deleted; fall back to vector search too
+            query_vector = await self.query_batcher.embed(query)
+            results = await self._run_locked(index, self._hybrid_search, index, query, query_vector, top_k, mode)
+        return results
+
+    def _hybrid_search(self, index: KnowledgeBaseIndex, query: str, query_vector, top_k: int,
+                       mode: str = None) -> Optional[List[SearchResult]]:
+        """
+        Fused results; None if there is no query vector and no lexical match
+        """
+        if index.live_count == 0:
+            return []
+
+        candidates = top_k * settings.HYBRID_CANDIDATE_FACTOR
+        lexical_rows, _ = index.lexical_search(query, candidates)
+        rankings = [lexical_rows.tolist()]
+
+        if query_vector is not None:
+            vector_rows, _ = self._search_rows(index, query_vector, candidates, mode)
+            rankings.append(vector_rows.tolist())
+        elif not len(lexical_rows):
+            return None
+
+        fused = reciprocal_rank_fusion(rankings, k=settings.HYBRID_RRF_K)
+        return [index.result(row, score) for row, score in fused[:top_k]]
+
+    def similarity_search_by_vector(self, query_vector, knowledge_base_id: str, top_k: int = 5,
+                                    mode: str = None) -> List[SearchResult]:
+        index = self.get_index(knowledge_base_id)
+        return self._locked(index, self._search_index, index, query_vector, top_k, mode)
+
+    def _search_index(self, index: KnowledgeBaseIndex, query_vector, top_k: int,
+                      mode: str = None) -> List[SearchResult]:
+        if index.live_count == 0:
+            return []
+
+        rows, scores = self._search_rows(index, query_vector, top_k, mode)
+        return [index.result(row, score) for row, score in zip(rows, scores)]
+
+    def _search_rows(self, index: KnowledgeBaseIndex, query_vector, top_k: int, mode: str = None):
+        approximate = (mode or self.search_mode) == "approximate" and len(index) >= settings.ANN_MIN_ROWS
+        indices, scores = index.search(normalize_rows(query_vector), top_k, approximate=approximate)
+        live = indices[0] >= 0
+        return indices[0][live], scores[0][live]
+
+    async def aset_document(self, knowledge_base_id: str, document_key: str, doc_id: str,
+                            hashes: Sequence[str], index: KnowledgeBaseIndex = None) -> int:
+        """
+        Record a document's chunk hashes after (re-)ingestion, delete its
+        stale chunks and compact the index if enough rows are deleted.
+        Returns the number of rows deleted.
+        """
+        index = index or await self.aget_index(knowledge_base_id)
+
+        def update():
+            removed = index.set_document(document_key, doc_id, hashes)
+            return removed, index.compact()
+
+        removed, compacted = await self._run_locked(index, update)
+        if compacted:
+            logger.info(f"Compacted index for knowledge base {knowledge_base_id} to {len(index)} rows")
+        self.indexes.refresh(knowledge_base_id)
+        return removed
+
+    def build_ann_index(self, knowledge_base_id: str, nlist: int = None, pq_subvectors: int = None):
+        """
+        Build or rebuild the approximate index for a knowledge base
+        """
+        if pq_subvectors is None:
+            pq_subvectors = settings.ANN_PQ_SUBVECTORS
+        index = self.get_index(knowledge_base_id)
+        with index.lock:
+            index.build_ann(nlist=nlist, pq_subvectors=pq_subvectors)
+        self.indexes.refresh(knowledge_base_id)
+
+    @staticmethod
+    def _locked(index: KnowledgeBaseIndex, func, *args):
+        with index.lock:
+            return func(*args)
+
+    async def _run_locked(self, index: KnowledgeBaseIndex, func, *args):
+        """
+        Run index work (scoring, appends, compaction) in a worker thread so
+        the event loop keeps serving live calls
+        """
+        return await asyncio.to_thread(self._locked, index, func, *args)
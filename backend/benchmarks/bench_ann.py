@@ -0,0 +1,81 @@
+# Recall-vs-latency benchmark of approximate (IVF / IVF+PQ) search against exact search.
+#
+# Usage (from backend/):
+#     python benchmarks/bench_ann.py [--rows 100000] [--dim 256] [--queries 200]
+#
+# Vectors are synthetic and clustered (like chunk embeddings of a real corpus).
+# Recall@k is the fraction of the exact top-k that the approximate search returns.
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.vector_store import KnowledgeBaseIndex, normalize_rows  # noqa: E402
+
+
+def make_vectors(rows, dim, clusters, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, rows)
+    vectors = centers[labels] + 0.6 * rng.standard_normal((rows, dim)).astype(np.float32)
+    return normalize_rows(vectors)
+
+
+def run(index, queries, top_k, **search_kwargs):
+    latencies = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        rows, _ = index.search(query, top_k, **search_kwargs)
+        latencies.append(time.perf_counter() - start)
+        results.append(rows[0])
+    latencies = np.array(latencies) * 1000
+    return results, np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def recall(approx, exact):
+    hits = sum(len(np.intersect1d(a, e)) for a, e in zip(approx, exact))
+    return hits / sum(len(e) for e in exact)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark approximate vs exact vector search")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--pq", type=int, default=32, help="PQ subvectors for the IVF+PQ run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        vectors = make_vectors(args.rows, args.dim, clusters=max(10, args.rows // 500))
+        index = KnowledgeBaseIndex(Path(tmp))
+        index.add(vectors, [""] * args.rows, [{}] * args.rows)
+
+        queries = make_vectors(args.queries, args.dim, clusters=10, seed=1)
+        # Queries near real rows, as retrieval queries usually are
+        queries = normalize_rows(vectors[:args.queries] + 0.3 * (queries - vectors[:args.queries]))
+
+        exact, p50, p99 = run(index, queries, args.top_k)
+        print(f"{args.rows} rows x {args.dim} dims, top-{args.top_k}, {args.queries} queries\n")
+        print(f"{'mode':<22} {'nprobe':>6} {'recall':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        print(f"{'exact':<22} {'-':>6} {1.0:>8.3f} {p50:>8.2f} {p99:>8.2f}")
+
+        for label, pq in (("ivf", 0), (f"ivf+pq{args.pq}", args.pq)):
+            start = time.perf_counter()
+            index.build_ann(pq_subvectors=pq)
+            build_seconds = time.perf_counter() - start
+
+            for nprobe in (1, 4, 8, 16, 32):
+                approx, p50, p99 = run(index, queries, args.top_k, approximate=True, nprobe=nprobe)
+                print(f"{label:<22} {nprobe:>6} {recall(approx, exact):>8.3f} {p50:>8.2f} {p99:>8.2f}")
+            print(f"  ({index.ann.nlist} lists, built in {build_seconds:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# Benchmark for the telephony audio stage (mu-law decode, resampling, VAD).
+#
+# Usage (from backend/):
+#     python benchmarks/bench_audio.py [--frames 50000]
+#
+# Everything runs on one thread, so frames/second is a per-core figure. One
+# call produces 50 frames/second, so divide by 50 for calls per core.
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.audio_processing import (  # noqa: E402
+    TELEPHONY_SAMPLE_RATE,
+    EnergyVAD,
+    Resampler,
+    decode_mulaw,
+    decode_mulaw_float,
+    encode_mulaw,
+)
+
+FRAME_BYTES = 160  # 20 ms of 8 kHz mu-law
+
+
+def make_frames(count):
+    """
+    Synthetic call audio: alternating bursts of speech-like noise and near silence
+    """
+    rng = np.random.default_rng(0)
+    seconds = np.arange(count) // 50
+    amplitude = np.where(seconds % 4 < 2, 6000, 40)[:, None]
+    pcm = (rng.standard_normal((count, FRAME_BYTES)) * amplitude).clip(-32768, 32767).astype(np.int16)
+    data = encode_mulaw(pcm.ravel())
+    view = memoryview(data)
+    return [view[i * FRAME_BYTES:(i + 1) * FRAME_BYTES] for i in range(count)]
+
+
+def bench(name, frames, fn):
+    start = time.perf_counter()
+    for frame in frames:
+        fn(frame)
+    elapsed = time.perf_counter() - start
+    rate = len(frames) / elapsed
+    print(f"{name:<28} {rate:>12,.0f} frames/s   {elapsed / len(frames) * 1e6:8.2f} us/frame   ~{rate / 50:,.0f} calls/core")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the telephony audio stage")
+    parser.add_argument("--frames", type=int, default=50000)
+    args = parser.parse_args()
+
+    frames = make_frames(args.frames)
+    resampler = Resampler(TELEPHONY_SAMPLE_RATE, 16000)
+    vad = EnergyVAD()
+
+    print(f"{args.frames} frames of {FRAME_BYTES} bytes (20 ms, 8 kHz mu-law)\n")
+    bench("decode_mulaw", frames, decode_mulaw)
+    bench("decode + resample 8k->16k", frames, lambda f: resampler.resample(decode_mulaw(f)))
+    bench("decode + VAD", frames, vad.process_mulaw)
+
+    vad.reset()
+
+    def full_pipeline(frame):
+        samples = decode_mulaw_float(frame)
+        resampler.resample(samples)
+        vad.process(samples)
+
+    bench("full pipeline", frames, full_pipeline)
+
+    # Bulk decode for comparison: one call over the whole buffer
+    buffer = b"".join(bytes(f) for f in frames)
+    start = time.perf_counter()
+    decode_mulaw(buffer)
+    elapsed = time.perf_counter() - start
+    print(f"{'decode_mulaw (bulk)':<28} {args.frames / elapsed:>12,.0f} frames/s")
+
+
+if __name__ == "__main__":
+    main()
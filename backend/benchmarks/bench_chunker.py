@@ -0,0 +1,87 @@
+# Throughput and chunk-shape report for the token-aware chunker versus the
+# previous fixed 1000/200-character windows.
+#
+# Usage (from backend/):
+#     python benchmarks/bench_chunker.py [--mb 8] [--max-tokens 256] [--overlap-tokens 32] [--file manual.txt]
+#
+# Without --file a synthetic document of short paragraphs is generated.
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.conversation_history import get_encoding  # noqa: E402
+from app.services.text_chunker import TokenChunker  # noqa: E402
+
+WORDS = (
+    "the caller account billing refund order shipping address warranty device reset "
+    "password router signal battery replacement schedule appointment technician support "
+    "invoice payment plan upgrade cancel service outage network settings manual step"
+).split()
+
+
+def make_text(megabytes, seed=0):
+    rng = np.random.default_rng(seed)
+    paragraphs = []
+    size = 0
+    while size < megabytes * 1e6:
+        sentences = []
+        for _ in range(rng.integers(2, 8)):
+            words = rng.choice(WORDS, rng.integers(6, 30))
+            sentences.append(" ".join(words).capitalize() + rng.choice([".", ".", ".", "?", "!"]))
+        paragraph = " ".join(sentences)
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return "\n\n".join(paragraphs)
+
+
+def char_windows(text, chunk_size=1000, overlap=200):
+    return [text[i:i + chunk_size] for i in range(0, len(text), chunk_size - overlap)]
+
+
+def report(name, chunks, seconds, text, encoding):
+    tokens = [len(t) for t in encoding.encode_ordinary_batch(chunks)]
+    clean_ends = np.mean([chunk.rstrip()[-1:] in ".!?" for chunk in chunks])
+    print(
+        f"{name:<18} {len(text) / 1e6 / seconds:>8.1f} {len(chunks):>8} {np.mean(tokens):>8.0f} "
+        f"{max(tokens):>8} {sum(tokens):>12} {clean_ends * 100:>9.1f}%"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark document chunking")
+    parser.add_argument("--mb", type=float, default=8)
+    parser.add_argument("--max-tokens", type=int, default=256)
+    parser.add_argument("--overlap-tokens", type=int, default=32)
+    parser.add_argument("--file", default=None)
+    args = parser.parse_args()
+
+    text = Path(args.file).read_text(encoding="utf-8", errors="replace") if args.file else make_text(args.mb)
+    encoding = get_encoding()
+    print(f"{len(text) / 1e6:.1f} MB of text\n")
+    print(f"{'chunker':<18} {'MB/s':>8} {'chunks':>8} {'avg tok':>8} {'max tok':>8} {'total tok':>12} {'sentence end':>10}")
+
+    start = time.perf_counter()
+    chunks = char_windows(text)
+    report("1000/200 chars", chunks, time.perf_counter() - start, text, encoding)
+
+    start = time.perf_counter()
+    chunks = TokenChunker(args.max_tokens, args.overlap_tokens).chunk(text)
+    report("token (one pass)", chunks, time.perf_counter() - start, text, encoding)
+
+    # Streamed in 4 KB pieces, as pages arrive during ingestion
+    start = time.perf_counter()
+    chunker = TokenChunker(args.max_tokens, args.overlap_tokens)
+    streamed = []
+    for offset in range(0, len(text), 4096):
+        streamed.extend(chunk for _, chunk in chunker.feed(offset, text[offset:offset + 4096]))
+    streamed.extend(chunk for _, chunk in chunker.flush())
+    report("token (streamed)", streamed, time.perf_counter() - start, text, encoding)
+
+
+if __name__ == "__main__":
+    main()
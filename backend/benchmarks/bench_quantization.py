@@ -0,0 +1,66 @@
+# Memory and recall report for the float32 / float16 / int8 vector storage modes.
+#
+# Usage (from backend/):
+#     python benchmarks/bench_quantization.py [--rows 100000] [--dim 1536] [--queries 200]
+#
+# Recall@k is measured against exact float32 search over the same rows.
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.vector_store import KnowledgeBaseIndex, normalize_rows  # noqa: E402
+
+
+def make_vectors(rows, dim, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(10, rows // 500), dim)).astype(np.float32)
+    labels = rng.integers(0, len(centers), rows)
+    return normalize_rows(centers[labels] + 0.6 * rng.standard_normal((rows, dim)).astype(np.float32))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark quantized vector storage modes")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    vectors = make_vectors(args.rows, args.dim)
+    rng = np.random.default_rng(1)
+    queries = normalize_rows(vectors[:args.queries] + 0.5 * rng.standard_normal((args.queries, args.dim)).astype(np.float32))
+
+    print(f"{args.rows} rows x {args.dim} dims, top-{args.top_k}, {args.queries} queries\n")
+    print(f"{'mode':<9} {'resident MB':>12} {'compression':>12} {'recall':>8} {'p50 ms':>8} {'p99 ms':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = KnowledgeBaseIndex(Path(tmp))
+        index.add(vectors, [""] * args.rows, [{}] * args.rows)
+        exact, _ = index.search_exact(queries, args.top_k)
+
+        for mode in ("float32", "float16", "int8"):
+            index.set_storage_mode(mode)
+            latencies = []
+            found = []
+            for query in queries:
+                start = time.perf_counter()
+                rows, _ = index.search_exact(query, args.top_k)
+                latencies.append((time.perf_counter() - start) * 1000)
+                found.append(rows[0])
+
+            recall = np.mean([len(np.intersect1d(f, e)) / len(e) for f, e in zip(found, exact)])
+            report = index.memory_report()
+            print(
+                f"{mode:<9} {report['resident_vector_bytes'] / 1e6:>12.1f} {report['compression']:>11.1f}x "
+                f"{recall:>8.3f} {np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 99):>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# Per-turn TwiML rendering cost: the compiled templates versus building the
+# document with an f-string (with and without escaping) and encoding it.
+#
+# Usage (from backend/):
+#     python benchmarks/bench_twiml.py [--turns 200000] [--sentences 2]
+import argparse
+import sys
+import time
+import xml.dom.minidom
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services import twiml  # noqa: E402
+
+SENTENCES = [
+    "Your appointment is booked for Tuesday at 3 pm.",
+    "The R&D office is on the <second> floor, next to billing.",
+    "Is there anything else about your order AB-1234 I can check?",
+    "Sorry, we're closed on public holidays & weekends.",
+    # Stray control characters (here a form feed) do turn up in model output
+    "Billing questions:\x0cpress one at any time.",
+]
+
+GATHER = (
+    '<Gather input="speech" action="/webhook/twilio/speech" method="POST" speechTimeout="auto" speechModel="phone_call">'
+    '<Say>Anything else I can help you with?</Say>'
+    '</Gather>'
+)
+
+
+def fstring_unescaped(sentences):
+    says = "".join(f"<Say>{sentence}</Say>" for sentence in sentences)
+    return f'<?xml version="1.0" encoding="UTF-8"?><Response>{says}{GATHER}</Response>'.encode("utf-8")
+
+
+def fstring_escaped(sentences):
+    says = "".join(f"<Say>{escape(sentence)}</Say>" for sentence in sentences)
+    return f'<?xml version="1.0" encoding="UTF-8"?><Response>{says}{GATHER}</Response>'.encode("utf-8")
+
+
+def compiled(sentences, templates=twiml.compile_templates()):
+    return templates.turn((templates.say(sentence) for sentence in sentences), True)
+
+
+def well_formed(document):
+    try:
+        xml.dom.minidom.parseString(document)
+    except Exception:
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TwiML rendering")
+    parser.add_argument("--turns", type=int, default=200000)
+    parser.add_argument("--sentences", type=int, default=2)
+    args = parser.parse_args()
+
+    turns = [
+        [SENTENCES[(i + j) % len(SENTENCES)] for j in range(args.sentences)]
+        for i in range(len(SENTENCES))
+    ]
+    print(f"{args.turns} turns of {args.sentences} sentences\n")
+    print(f"{'renderer':<20} {'us/turn':>8} {'turns/s':>12} {'well-formed':>12}")
+
+    for name, render in (
+        ("f-string", fstring_unescaped),
+        ("f-string + escape", fstring_escaped),
+        ("compiled templates", compiled),
+    ):
+        valid = sum(well_formed(render(sentences)) for sentences in turns)
+
+        start = time.perf_counter()
+        for i in range(args.turns):
+            render(turns[i % len(turns)])
+        seconds = time.perf_counter() - start
+
+        print(
+            f"{name:<20} {seconds / args.turns * 1e6:>8.2f} {args.turns / seconds:>12,.0f} "
+            f"{valid:>6}/{len(turns)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
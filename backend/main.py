@@ -5,6 +5,14 @@ from app.api.routes import users, integrations, knowledge, calls, schedules
 from app.core.config import settings
 from app.api.deps import get_current_user
 from app.core.logging import configure_logging_middleware, get_logger
+from app.services.session_registry import call_sessions
+from app.services.client_registry import clients
+from app.services.message_writer import message_writer
+from app.services.document_ingestion import shutdown_extraction_pool
+from app.services.vector_store import close_default_query_batcher
+from app.services.tts_cache import tts_cache
+from app.services.twiml import FIXED_PROMPTS
+from app.services.intent_router import CANNED_RESPONSES
 
 # Initialize main application logger
 logger = get_logger("app")
@@ -49,6 +57,23 @@ app.include_router(
 # Twilio webhook endpoint - no auth required as it's called by Twilio
 app.include_router(calls.twilio_router, prefix="/webhook/twilio", tags=["webhooks"])
 
+@app.on_event("startup")
+async def startup():
+    await clients.start()
+    await call_sessions.start()
+    await message_writer.start()
+    if settings.TTS_CACHE_ENABLED:
+        await tts_cache.start(FIXED_PROMPTS + CANNED_RESPONSES)
+
+@app.on_event("shutdown")
+async def shutdown():
+    await call_sessions.stop()
+    await message_writer.stop()
+    await tts_cache.stop()
+    await close_default_query_batcher()
+    shutdown_extraction_pool()
+    await clients.stop()
+
 @app.get("/health")
 def health_check():
     logger.debug("Health check endpoint called")
@@ -0,0 +1,40 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Make the app package importable however pytest is invoked
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+class WordEncoding:
+    """
+    Offline stand-in for a tiktoken encoding: one token per word
+    """
+    def __init__(self):
+        self._ids = {}
+        self._words = []
+
+    def encode_ordinary(self, text):
+        tokens = []
+        for word in text.split():
+            if word not in self._ids:
+                self._ids[word] = len(self._words)
+                self._words.append(word)
+            tokens.append(self._ids[word])
+        return tokens
+
+    def encode_ordinary_batch(self, texts):
+        return [self.encode_ordinary(text) for text in texts]
+
+    def decode(self, tokens):
+        return " ".join(self._words[token] for token in tokens)
+
+
+@pytest.fixture
+def word_encoding(monkeypatch):
+    from app.services import text_chunker
+
+    encoding = WordEncoding()
+    monkeypatch.setattr(text_chunker, "get_encoding", lambda model=None: encoding)
+    return encoding
@@ -0,0 +1,47 @@
+import numpy as np
+
+from app.services.audio_processing import EnergyVAD, decode_mulaw, encode_mulaw
+
+FRAME = 160  # 20 ms at 8 kHz
+
+
+def noise(seconds: float, rms: float, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal(int(8000 * seconds)) * rms).astype(np.float32)
+
+
+def feed(vad: EnergyVAD, samples: np.ndarray):
+    """Feed samples a media frame at a time and collect the events"""
+    events = []
+    for start in range(0, len(samples), FRAME):
+        event = vad.process(samples[start:start + FRAME])
+        if event is not None:
+            events.append(event)
+    return events
+
+
+def test_constant_noise_bed_is_learned_and_endpoints():
+    vad = EnergyVAD()
+    # Steady -40 dBFS line noise, well above the initial -60 dB floor
+    events = feed(vad, noise(6.0, 0.01))
+
+    assert not vad.in_speech
+    assert events in ([], [EnergyVAD.SPEECH_START, EnergyVAD.SPEECH_END])
+    assert vad.noise_floor_db > -45.0
+
+
+def test_speech_over_noise_bed_starts_and_ends():
+    vad = EnergyVAD()
+    feed(vad, noise(4.0, 0.01, seed=1))
+
+    speech = noise(1.0, 0.01, seed=2) + noise(1.0, 0.2, seed=3)
+    events = feed(vad, np.concatenate((speech, noise(1.0, 0.01, seed=4))))
+
+    assert events == [EnergyVAD.SPEECH_START, EnergyVAD.SPEECH_END]
+
+
+def test_mulaw_round_trip():
+    pcm = np.array([0, 100, -100, 1000, -1000, 30000, -30000], dtype=np.int16)
+    decoded = decode_mulaw(encode_mulaw(pcm)).astype(np.int32)
+
+    assert np.all(np.abs(decoded - pcm) <= np.abs(pcm.astype(np.int32)) // 16 + 8)
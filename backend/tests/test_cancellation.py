@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from app.services.cancellation import CancelToken, TurnCancelled
+
+
+async def numbers(tasks, delay=0.0, count=3):
+    for number in range(count):
+        tasks.add(asyncio.current_task())
+        await asyncio.sleep(delay)
+        yield number
+
+
+def test_iterate_consumes_the_source_in_the_calling_task():
+    token = CancelToken()
+    tasks = set()
+
+    async def scenario():
+        items = [item async for item in token.iterate(numbers(tasks))]
+        return items, asyncio.current_task()
+
+    items, consumer = asyncio.run(scenario())
+    assert items == [0, 1, 2]
+    assert tasks == {consumer}
+
+
+def test_cancelling_while_waiting_raises_turn_cancelled():
+    token = CancelToken()
+
+    async def scenario():
+        asyncio.get_running_loop().call_later(0.05, token.cancel, "barge-in")
+        items = []
+        with pytest.raises(TurnCancelled):
+            async for item in token.iterate(numbers(set(), delay=1.0)):
+                items.append(item)
+        assert asyncio.current_task().cancelling() == 0
+        return items
+
+    assert asyncio.run(scenario()) == []
+
+
+def test_cancelling_between_items_stops_at_the_next_item():
+    token = CancelToken()
+
+    async def scenario():
+        items = []
+        with pytest.raises(TurnCancelled):
+            async for item in token.iterate(numbers(set())):
+                items.append(item)
+                token.cancel("barge-in")
+        return items
+
+    assert asyncio.run(scenario()) == [0]
+
+
+def test_cancelling_the_consumer_from_outside_is_not_a_turn_cancellation():
+    token = CancelToken()
+
+    async def consume():
+        return [item async for item in token.iterate(numbers(set(), delay=1.0))]
+
+    async def scenario():
+        task = asyncio.ensure_future(consume())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+
+from app.services import context_packer
+from app.services.context_packer import ContextPacker
+
+
+def _results(*texts):
+    return [SimpleNamespace(text=text) for text in texts]
+
+
+def test_sentences_from_a_result_over_budget_stay_available(monkeypatch):
+    monkeypatch.setattr(context_packer, "count_tokens", lambda text, model=None: len(text.split()))
+    packer = ContextPacker(token_budget=6, mmr_lambda=1.0)
+
+    context = packer.pack(_results(
+        "Opening hours are nine to five. Parking is free on weekdays for all visitors.",
+        "Opening hours are nine to five.",
+    ))
+
+    # The first result does not fit; its sentences must not be dropped from the second
+    assert context == "Opening hours are nine to five."
+
+
+def test_overlapping_sentences_are_included_once(monkeypatch):
+    monkeypatch.setattr(context_packer, "count_tokens", lambda text, model=None: len(text.split()))
+    packer = ContextPacker(token_budget=100, mmr_lambda=1.0)
+
+    context = packer.pack(_results(
+        "We open at nine. We close at five.",
+        "We close at five. Parking is free.",
+    ))
+
+    assert context == "We open at nine. We close at five.\n\nParking is free."
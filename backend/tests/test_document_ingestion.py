@@ -0,0 +1,40 @@
+import asyncio
+
+from app.services.document_ingestion import DocumentIngestor
+from app.services.index_manager import IndexManager
+from app.services.vector_store import VectorStore
+
+
+class FakeEmbeddings:
+    async def aembed_documents(self, texts):
+        await asyncio.sleep(0)
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+class CountingIndexManager(IndexManager):
+    loads = 0
+
+    def _load(self, knowledge_base_id):
+        self.loads += 1
+        return super()._load(knowledge_base_id)
+
+
+def test_index_stays_pinned_for_the_whole_upload(tmp_path, word_encoding):
+    document = tmp_path / "faq.txt"
+    document.write_text(" ".join(f"Answer number {i} is here." for i in range(12)))
+
+    # A one-byte budget evicts every index that is not in use
+    indexes = CountingIndexManager(storage_dir=str(tmp_path / "indexes"), storage_mode="float32",
+                                   memory_budget_bytes=1)
+    store = VectorStore(embeddings=FakeEmbeddings(), indexes=indexes)
+    ingestor = DocumentIngestor(store, batch_size=1, max_concurrency=2, max_tokens=8, overlap_tokens=0)
+
+    progress = asyncio.run(ingestor.ingest("kb-1", "doc-1", str(document), {}))
+
+    assert progress.finished
+    assert progress.chunks_embedded == progress.chunks_total > 1
+    assert indexes.loads == 1
+    assert indexes._active == {}
+
+    index = indexes.get("kb-1")
+    assert index.live_count == progress.chunks_total
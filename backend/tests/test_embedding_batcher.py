@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from app.services.embedding_batcher import EmbeddingBatcher
+
+
+class FakeEmbeddings:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = []
+
+    async def aembed_documents(self, texts):
+        self.calls.append(list(texts))
+        await asyncio.sleep(self.delay)
+        return [[float(len(text))] for text in texts]
+
+
+def test_concurrent_queries_share_one_batch():
+    embeddings = FakeEmbeddings()
+
+    async def scenario():
+        batcher = EmbeddingBatcher(embeddings, max_batch_size=8, max_wait_ms=5, cache_size=16)
+        vectors = await asyncio.gather(*(batcher.embed(text) for text in ("a", "bb", "a")))
+        return batcher, vectors
+
+    batcher, vectors = asyncio.run(scenario())
+
+    assert vectors == [[1.0], [2.0], [1.0]]
+    assert embeddings.calls == [["a", "bb"]]
+    assert not batcher._tasks
+
+
+def test_close_cancels_batches_in_flight():
+    async def scenario():
+        batcher = EmbeddingBatcher(FakeEmbeddings(delay=10), max_batch_size=1, max_wait_ms=5)
+        waiter = asyncio.ensure_future(batcher.embed("hello"))
+        await asyncio.sleep(0.01)
+        assert len(batcher._tasks) == 1
+
+        await batcher.close()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return batcher
+
+    batcher = asyncio.run(scenario())
+
+    assert not batcher._tasks
+    assert not batcher._pending
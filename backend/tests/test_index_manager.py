@@ -0,0 +1,36 @@
+import asyncio
+import gc
+import logging
+
+import pytest
+
+from app.services.index_manager import IndexManager
+
+
+class FailingIndexManager(IndexManager):
+    def _load(self, knowledge_base_id):
+        raise FileNotFoundError(knowledge_base_id)
+
+
+def test_failed_prewarm_is_logged_and_can_be_retried(tmp_path, caplog):
+    manager = FailingIndexManager(storage_dir=str(tmp_path), storage_mode="memory")
+    unhandled = []
+
+    async def scenario():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: unhandled.append(context))
+        manager.prewarm("kb-1")
+        assert "kb-1" in manager._loading
+        while manager._loading:
+            await asyncio.sleep(0.01)
+        gc.collect()
+
+        # Nothing is left loading, so a later call tries again
+        with pytest.raises(FileNotFoundError):
+            await manager.aget("kb-1")
+
+    with caplog.at_level(logging.ERROR):
+        asyncio.run(scenario())
+
+    assert unhandled == []
+    assert manager._loading == {}
+    assert len([r for r in caplog.records if "Error loading index for kb-1" in r.getMessage()]) == 2
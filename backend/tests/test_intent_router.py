@@ -0,0 +1,124 @@
+import pytest
+
+from app.core.logging import get_call_logger
+from app.services import conversation_manager as conversation_module
+from app.services import intent_router as intents
+from app.services.conversation_manager import ConversationManager
+from app.services.intent_router import IntentRouter
+from app.services.tenant_resolver import TenantConfig
+
+
+@pytest.fixture
+def router():
+    return IntentRouter(min_confidence=0.8, max_words=8)
+
+
+@pytest.mark.parametrize("utterance, intent", [
+    ("bye", intents.GOODBYE),
+    ("Okay, goodbye!", intents.GOODBYE),
+    ("no that's all", intents.GOODBYE),
+    ("I'd like to talk to a real person", intents.HUMAN),
+    ("transfer me", intents.HUMAN),
+    ("yes please", intents.AFFIRM),
+    ("Sure.", intents.AFFIRM),
+    ("no", intents.DENY),
+    ("nope", intents.DENY),
+    ("say that again", intents.REPEAT),
+])
+def test_phrases_match_their_intent(router, utterance, intent):
+    assert router.classify(utterance).name == intent
+
+
+def test_filler_words_are_ignored(router):
+    result = router.classify("um, well, yes please")
+    assert result.name == intents.AFFIRM
+    assert result.confidence == 1.0
+
+    assert router.classify("uh can I just speak to someone").name == intents.HUMAN
+
+
+@pytest.mark.parametrize("utterance", [
+    "no, what are your hours?",
+    "yes, and how much does a cleaning cost",
+    "yes no",
+    "what time do you open on saturday",
+    "",
+    "please please please please please please please please please bye",
+])
+def test_questions_and_mixed_intents_go_to_the_llm(router, utterance):
+    assert router.classify(utterance) is None
+
+
+class FakeHistory:
+    def __init__(self, *responses):
+        self.messages = [{"role": "assistant", "content": response} for response in responses]
+
+    def append(self, role, content):
+        self.messages.append({"role": role, "content": content})
+
+
+class FakeWriter:
+    def __init__(self):
+        self.messages = []
+
+    def write(self, call_sid, role, content):
+        self.messages.append((role, content))
+
+
+def make_manager(monkeypatch, tenant=None, last_response="We open at nine."):
+    monkeypatch.setattr(conversation_module, "message_writer", FakeWriter())
+    manager = ConversationManager.__new__(ConversationManager)
+    manager.call_sid = "CA1"
+    manager.tenant = tenant
+    manager.logger = get_call_logger("CA1")
+    manager.history = FakeHistory(*([last_response] if last_response else []))
+    manager.asks_follow_up = True
+    manager.call_action = None
+    manager.turn_timings = {}
+    return manager
+
+
+def test_goodbye_hangs_up(monkeypatch):
+    manager = make_manager(monkeypatch)
+
+    assert manager._answer_intent("okay bye") == intents.GOODBYE_RESPONSE
+    assert manager.call_action == "hangup"
+    assert conversation_module.message_writer.messages == [
+        ("user", "okay bye"), ("assistant", intents.GOODBYE_RESPONSE)
+    ]
+
+
+def test_deny_after_an_answer_hangs_up(monkeypatch):
+    manager = make_manager(monkeypatch)
+
+    assert manager._answer_intent("no thanks") == intents.GOODBYE_RESPONSE
+    assert manager.call_action == "hangup"
+
+
+def test_deny_to_a_question_goes_to_the_llm(monkeypatch):
+    manager = make_manager(monkeypatch, last_response="Would you like to book a cleaning?")
+
+    assert manager._answer_intent("no") is None
+    assert manager.call_action is None
+
+
+def test_affirm_after_an_answer_keeps_the_call_going(monkeypatch):
+    manager = make_manager(monkeypatch)
+
+    assert manager._answer_intent("yes") == intents.ANYTHING_ELSE_RESPONSE
+    assert manager.call_action is None
+
+
+def test_human_transfers_when_the_tenant_has_a_number(monkeypatch):
+    tenant = TenantConfig(user_id="u1", phone_number="+15550100", transfer_number="+15550199")
+    manager = make_manager(monkeypatch, tenant=tenant)
+
+    assert manager._answer_intent("talk to a human") == intents.TRANSFER_RESPONSE
+    assert manager.call_action == "transfer"
+
+
+def test_human_without_a_transfer_number_stays_on_the_line(monkeypatch):
+    manager = make_manager(monkeypatch)
+
+    assert manager._answer_intent("talk to a human") == intents.NO_TRANSFER_RESPONSE
+    assert manager.call_action is None
@@ -0,0 +1,19 @@
+from app.services.lexical_index import IDENTIFIER_PATTERN, LexicalIndex
+
+
+def test_identifier_pattern():
+    for term in ("ab1234", "1234ab", "x9y", "sku42", "123456", "90210123"):
+        assert IDENTIFIER_PATTERN.match(term), term
+    for term in ("2024", "1999", "12345", "21st", "10am", "1990s", "hello", "42"):
+        assert not IDENTIFIER_PATTERN.match(term), term
+
+
+def test_years_and_prices_are_not_identifier_queries():
+    index = LexicalIndex.build([
+        "Order AB-1234 ships in 2024 for 1999 dollars.",
+        "Opening hours changed in 2023.",
+    ])
+
+    assert index.is_identifier_query("where is order AB-1234")
+    assert not index.is_identifier_query("what changed in 2023")
+    assert not index.is_identifier_query("anything for 1999")
@@ -0,0 +1,72 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import llm_service as llm_service_module
+from app.services.cancellation import CancelToken, TurnCancelled
+from app.services.llm_service import LLMService
+
+
+class FakeHTTPResponse:
+    def __init__(self):
+        self.closed = False
+
+    async def aclose(self):
+        self.closed = True
+
+
+class FakeStream:
+    """Stands in for openai's AsyncStream: async iterable of chunks with the HTTP response on .response"""
+    def __init__(self, deltas, delay=0.0):
+        self.deltas = deltas
+        self.delay = delay
+        self.response = FakeHTTPResponse()
+
+    async def __aiter__(self):
+        for delta in self.deltas:
+            await asyncio.sleep(self.delay)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+
+
+class FakeClients:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def openai(self, api_key):
+        async def create(**kwargs):
+            return self.stream
+        return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def make_service(monkeypatch, stream):
+    monkeypatch.setattr(llm_service_module, "clients", FakeClients(stream))
+    return LLMService(config=SimpleNamespace(api_key="sk-test", model="gpt-test"))
+
+
+def test_stream_yields_the_final_sentence_and_closes_the_response(monkeypatch):
+    stream = FakeStream(["Your appointment is on ", "Tuesday at 3 pm. ", "See you ", "then"])
+    service = make_service(monkeypatch, stream)
+
+    async def scenario():
+        return [sentence async for sentence in service.generate_response_stream("When is it?")]
+
+    assert asyncio.run(scenario()) == ["Your appointment is on Tuesday at 3 pm.", "See you then"]
+    assert stream.response.closed
+
+
+def test_cancelling_the_turn_raises_turn_cancelled_and_closes_the_response(monkeypatch):
+    stream = FakeStream(["Let me check that for you. ", "One ", "moment ", "please."], delay=0.05)
+    service = make_service(monkeypatch, stream)
+    token = CancelToken()
+
+    async def scenario():
+        sentences = []
+        with pytest.raises(TurnCancelled):
+            async for sentence in service.generate_response_stream("Hi", cancel_token=token):
+                sentences.append(sentence)
+                token.cancel("barge-in")
+        return sentences
+
+    assert asyncio.run(scenario()) == ["Let me check that for you."]
+    assert stream.response.closed
@@ -0,0 +1,193 @@
+import asyncio
+import base64
+import json
+from types import SimpleNamespace
+
+from app.services.cancellation import CancelToken
+from app.services.deepgram_service import LiveTranscriptionSession
+from app.services.media_stream import MediaStreamHandler
+
+# One 20 ms Twilio frame of mu-law silence
+SILENCE_FRAME = b"\xff" * 160
+
+
+class FakeDeepgramSocket:
+    """
+    Stands in for the Deepgram SDK's live transcription socket
+    """
+    event = SimpleNamespace(TRANSCRIPT_RECEIVED="transcript", CLOSE="close")
+
+    def __init__(self):
+        self.handlers = {}
+        self.received = bytearray()
+        self.finished = False
+
+    def registerHandler(self, event, handler):
+        self.handlers[event] = handler
+
+    def send(self, audio):
+        self.received.extend(audio)
+
+    async def finish(self):
+        self.finished = True
+        self.handlers[self.event.CLOSE](1000)
+
+    def emit(self, text, is_final=False, speech_final=False):
+        self.handlers[self.event.TRANSCRIPT_RECEIVED]({
+            "channel": {"alternatives": [{"transcript": text}]},
+            "is_final": is_final,
+            "speech_final": speech_final,
+        })
+
+
+class FakeDeepgramService:
+    def __init__(self):
+        self.socket = None
+        self.spoken = []
+
+    async def start_live_transcription(self, on_transcript, options=None):
+        self.socket = FakeDeepgramSocket()
+        return LiveTranscriptionSession(self.socket, on_transcript)
+
+    async def text_to_speech(self, text, voice=None, audio_format="mp3"):
+        self.spoken.append((text, audio_format))
+        return SILENCE_FRAME
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.incoming = asyncio.Queue()
+        self.sent = []
+
+    async def receive_text(self):
+        return await self.incoming.get()
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+    def push(self, event, **fields):
+        self.incoming.put_nowait(json.dumps(dict(event=event, **fields)))
+
+
+class FakeConversation:
+    def __init__(self):
+        self.utterances = []
+        self.cancel_token = CancelToken()
+        self.call_action = None
+
+    async def stream_user_input(self, utterance):
+        self.utterances.append(utterance)
+        yield "We are open nine to five."
+
+
+async def wait_until(predicate, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.005)
+
+
+def test_media_stream_transcribes_and_answers():
+    async def scenario():
+        websocket = FakeWebSocket()
+        deepgram = FakeDeepgramService()
+        conversation = FakeConversation()
+        handler = MediaStreamHandler(websocket, deepgram, lambda call_sid: conversation)
+        run = asyncio.create_task(handler.run())
+
+        websocket.push("connected")
+        websocket.push("start", start={"streamSid": "MZ1", "callSid": "CA1"})
+        for _ in range(5):
+            websocket.push("media", media={"payload": base64.b64encode(SILENCE_FRAME).decode("ascii")})
+        await wait_until(lambda: deepgram.socket is not None and len(deepgram.socket.received) == 5 * 160)
+
+        # Interim results alone do not start a turn
+        deepgram.socket.emit("what are")
+        deepgram.socket.emit("what are your hours", is_final=True, speech_final=True)
+        await wait_until(lambda: any(event["event"] == "mark" for event in websocket.sent))
+
+        websocket.push("stop")
+        await run
+        return websocket, deepgram, conversation
+
+    websocket, deepgram, conversation = asyncio.run(scenario())
+
+    assert conversation.utterances == ["what are your hours"]
+    assert deepgram.spoken == [("We are open nine to five.", "mulaw")]
+    media = [event for event in websocket.sent if event["event"] == "media"]
+    assert media[0]["streamSid"] == "MZ1"
+    assert base64.b64decode(media[0]["media"]["payload"]) == SILENCE_FRAME
+    assert deepgram.socket.finished
+
+
+def test_final_transcripts_are_joined_into_one_utterance():
+    async def scenario():
+        websocket = FakeWebSocket()
+        deepgram = FakeDeepgramService()
+        conversation = FakeConversation()
+        handler = MediaStreamHandler(websocket, deepgram, lambda call_sid: conversation)
+        run = asyncio.create_task(handler.run())
+
+        websocket.push("start", start={"streamSid": "MZ1", "callSid": "CA1"})
+        await wait_until(lambda: deepgram.socket is not None)
+
+        deepgram.socket.emit("I need to move", is_final=True)
+        deepgram.socket.emit("my appointment", is_final=True, speech_final=True)
+        await wait_until(lambda: conversation.utterances)
+
+        websocket.push("stop")
+        await run
+        return conversation
+
+    conversation = asyncio.run(scenario())
+    assert conversation.utterances == ["I need to move my appointment"]
+
+
+def test_goodbye_hangs_up_after_it_has_played(monkeypatch):
+    from app.services import media_stream
+
+    updates = []
+
+    class FakeTwilioService:
+        def __init__(self, config=None):
+            pass
+
+        def update_call(self, call_sid, content):
+            updates.append((call_sid, content))
+
+    monkeypatch.setattr(media_stream, "TwilioService", FakeTwilioService)
+
+    class GoodbyeConversation(FakeConversation):
+        async def stream_user_input(self, utterance):
+            self.utterances.append(utterance)
+            self.call_action = "hangup"
+            yield "Thanks for calling. Goodbye!"
+
+    async def scenario():
+        websocket = FakeWebSocket()
+        deepgram = FakeDeepgramService()
+        conversation = GoodbyeConversation()
+        handler = MediaStreamHandler(websocket, deepgram, lambda call_sid: conversation)
+        run = asyncio.create_task(handler.run())
+
+        websocket.push("start", start={"streamSid": "MZ1", "callSid": "CA1"})
+        await wait_until(lambda: deepgram.socket is not None)
+        deepgram.socket.emit("bye", is_final=True, speech_final=True)
+        await wait_until(lambda: any(event["event"] == "mark" for event in websocket.sent))
+
+        # Still playing: the call is not ended yet
+        await asyncio.sleep(0.05)
+        assert updates == []
+
+        mark = next(event for event in websocket.sent if event["event"] == "mark")
+        websocket.push("mark", mark=mark["mark"])
+        await wait_until(lambda: updates)
+
+        websocket.push("stop")
+        await run
+        return conversation
+
+    conversation = asyncio.run(scenario())
+
+    assert conversation.asks_follow_up is False
+    assert updates == [("CA1", b'<?xml version="1.0" encoding="UTF-8"?><Response><Hangup/></Response>')]
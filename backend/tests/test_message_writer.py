@@ -0,0 +1,42 @@
+import asyncio
+
+from app.services import message_writer as message_writer_module
+from app.services.message_writer import MessageWriter
+
+
+def test_stop_writes_the_batch_being_collected(monkeypatch):
+    saved = []
+    monkeypatch.setattr(message_writer_module, "save_messages", saved.extend)
+
+    async def scenario():
+        # Long interval: the flusher is still collecting when stop() is called
+        writer = MessageWriter(max_buffer=100, batch_size=10, flush_interval=60)
+        await writer.start()
+        for i in range(3):
+            writer.write("CA123", "user", f"message {i}")
+        await asyncio.sleep(0.01)
+        await writer.stop()
+        return writer
+
+    writer = asyncio.run(scenario())
+
+    assert [message["content"] for message in saved] == ["message 0", "message 1", "message 2"]
+    assert writer.written == 3
+
+
+def test_stop_drains_messages_beyond_one_batch(monkeypatch):
+    saved = []
+    monkeypatch.setattr(message_writer_module, "save_messages", saved.extend)
+
+    async def scenario():
+        writer = MessageWriter(max_buffer=5, batch_size=2, flush_interval=60)
+        await writer.start()
+        for i in range(5):
+            writer.write("CA123", "user", f"message {i}")
+        await writer.stop()
+        return writer
+
+    writer = asyncio.run(scenario())
+
+    assert len(saved) == 5
+    assert writer.dropped == 0
@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+from app.services.session_registry import CallSessionRegistry
+
+
+def test_expired_session_is_completed_before_replacement():
+    async def scenario():
+        registry = CallSessionRegistry(ttl_seconds=60, idle_seconds=60, sweep_interval=60)
+        completed = []
+        registry.add_completion_hook(lambda call_sid, session, reason: completed.append((call_sid, session, reason)))
+
+        first = registry.get_or_create("CA1", lambda: "first")
+        # Age the entry past its TTL
+        registry._sessions["CA1"].created_at = time.monotonic() - 120
+
+        second = registry.get_or_create("CA1", lambda: "second")
+        await registry.stop()
+        return first, second, completed
+
+    first, second, completed = asyncio.run(scenario())
+    assert (first, second) == ("first", "second")
+    assert ("CA1", "first", "expired") in completed
+    assert ("CA1", "second", "shutdown") in completed
+
+
+def test_get_ends_expired_session():
+    async def scenario():
+        registry = CallSessionRegistry(ttl_seconds=60, idle_seconds=1, sweep_interval=60)
+        completed = []
+        registry.add_completion_hook(lambda call_sid, session, reason: completed.append(reason))
+
+        registry.get_or_create("CA1", lambda: object())
+        registry._sessions["CA1"].last_access = time.monotonic() - 5
+
+        assert registry.get("CA1") is None
+        assert "CA1" not in registry
+        await registry.stop()
+        return completed
+
+    assert asyncio.run(scenario()) == ["expired"]
+
+
+def test_complete_fires_hooks_once():
+    async def scenario():
+        registry = CallSessionRegistry(ttl_seconds=60, idle_seconds=60, sweep_interval=60)
+        completed = []
+
+        async def hook(call_sid, session, reason):
+            completed.append(reason)
+
+        registry.add_completion_hook(hook)
+        registry.get_or_create("CA1", lambda: object())
+        await registry.complete("CA1")
+        await registry.complete("CA1")
+        return completed
+
+    assert asyncio.run(scenario()) == ["completed"]
@@ -0,0 +1,42 @@
+from app.services.text_chunker import TokenChunker
+
+SENTENCES = [f"Sentence {i} has five words." for i in range(12)]
+TEXT = " ".join(SENTENCES)
+
+
+def test_chunks_stay_within_the_token_cap_and_end_on_sentences(word_encoding):
+    chunks = TokenChunker(max_tokens=12, overlap_tokens=0).chunk(TEXT)
+
+    assert all(len(chunk.split()) <= 12 for chunk in chunks)
+    assert all(chunk.endswith("five words.") for chunk in chunks)
+    # Two whole sentences per chunk, nothing lost or repeated
+    assert chunks == [" ".join(SENTENCES[i:i + 2]) for i in range(0, 12, 2)]
+
+
+def test_consecutive_chunks_share_whole_trailing_sentences(word_encoding):
+    chunks = TokenChunker(max_tokens=15, overlap_tokens=5).chunk(TEXT)
+
+    assert all(len(chunk.split()) <= 15 for chunk in chunks)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        last_sentence = previous[previous.rindex("Sentence"):]
+        assert chunk.startswith(last_sentence)
+    assert chunks[-1].endswith(SENTENCES[-1])
+
+
+def test_a_sentence_longer_than_a_chunk_is_split_by_tokens(word_encoding):
+    words = [f"w{i}" for i in range(25)]
+    chunks = TokenChunker(max_tokens=10, overlap_tokens=2).chunk(" ".join(words))
+
+    assert [chunk.split() for chunk in chunks] == [words[0:10], words[8:18], words[16:25]]
+
+
+def test_feeding_pages_matches_chunking_the_whole_text(word_encoding):
+    chunker = TokenChunker(max_tokens=12, overlap_tokens=5)
+    pages = [TEXT[:40], TEXT[40:130], TEXT[130:]]
+
+    chunks = []
+    for section, page in enumerate(pages):
+        chunks.extend(chunk for _, chunk in chunker.feed(section, page))
+    chunks.extend(chunk for _, chunk in chunker.flush())
+
+    assert chunks == TokenChunker(max_tokens=12, overlap_tokens=5).chunk(TEXT)
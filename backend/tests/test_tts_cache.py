@@ -0,0 +1,90 @@
+import asyncio
+
+from app.services.tts_cache import TTSCache
+
+
+class FakeDeepgram:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.rendered = []
+
+    async def text_to_speech(self, text, voice=None, audio_format="mp3"):
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise RuntimeError("synthesis failed")
+        self.rendered.append(text)
+        return b"audio:" + text.encode("utf-8")
+
+
+def test_warm_renders_in_the_background(tmp_path):
+    cache = TTSCache(directory=str(tmp_path), max_bytes=1024 * 1024, voice="test")
+    cache._deepgram = FakeDeepgram()
+
+    async def scenario():
+        await cache.load()
+        # Spoken once: nothing is rendered
+        cache.warm("Your appointment is on Tuesday.")
+        assert not cache._warming
+
+        # Spoken again: rendered in the background, not waited for
+        cache.warm("Your appointment is on Tuesday.")
+        assert cache.cached("Your appointment is on Tuesday.") is None
+        while cache._warming:
+            await asyncio.sleep(0.01)
+        cache.warm("Your appointment is on Tuesday.")
+        assert not cache._warming
+
+    asyncio.run(scenario())
+
+    name = cache.cached("Your appointment is on Tuesday.")
+    assert name is not None
+    assert (tmp_path / name).read_bytes() == b"audio:Your appointment is on Tuesday."
+    assert cache._deepgram.rendered == ["Your appointment is on Tuesday."]
+
+
+def test_failed_warm_leaves_nothing_unretrieved(tmp_path):
+    cache = TTSCache(directory=str(tmp_path), max_bytes=1024 * 1024, voice="test")
+    cache._deepgram = FakeDeepgram(fail=True)
+    unhandled = []
+
+    async def scenario():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: unhandled.append(context))
+        await cache.load()
+        cache.warm("Hello")
+        cache.warm("Hello")
+        while cache._warming:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+
+    assert unhandled == []
+    assert cache.cached("Hello") is None
+
+
+def test_background_renders_are_limited(tmp_path):
+    cache = TTSCache(directory=str(tmp_path), max_bytes=1024 * 1024, voice="test", warm_concurrency=2)
+    active = []
+    peak = []
+
+    class SlowDeepgram:
+        async def text_to_speech(self, text, voice=None, audio_format="mp3"):
+            active.append(text)
+            peak.append(len(active))
+            await asyncio.sleep(0.02)
+            active.remove(text)
+            return b"audio"
+
+    cache._deepgram = SlowDeepgram()
+
+    async def scenario():
+        await cache.load()
+        for i in range(10):
+            cache.warm(f"Sentence {i}.")
+            cache.warm(f"Sentence {i}.")
+        while cache._warming:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+
+    assert len(peak) == 10
+    assert max(peak) == 2
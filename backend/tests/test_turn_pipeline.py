@@ -0,0 +1,49 @@
+import asyncio
+import logging
+
+import pytest
+
+from app.services.cancellation import CancelToken, TurnCancelled
+from app.services.turn_pipeline import Stage, TurnPipeline
+
+
+def test_cancelled_stage_stops_the_turn_without_an_error_log(caplog):
+    token = CancelToken()
+
+    async def retrieve():
+        await asyncio.sleep(10)
+
+    async def scenario():
+        pipeline = TurnPipeline([
+            Stage("retrieval", lambda: token.run(retrieve()), timeout=5, default=[]),
+            Stage("history", lambda: asyncio.sleep(10)),
+        ])
+        run = asyncio.ensure_future(pipeline.run())
+        await asyncio.sleep(0.01)
+        token.cancel("barge-in")
+        with pytest.raises(TurnCancelled):
+            await run
+        return pipeline
+
+    with caplog.at_level(logging.DEBUG):
+        pipeline = asyncio.run(scenario())
+
+    assert pipeline.degraded == []
+    assert not [record for record in caplog.records if record.levelno >= logging.WARNING]
+
+
+def test_failed_optional_stage_degrades_to_its_default():
+    async def fail():
+        raise RuntimeError("search is down")
+
+    async def scenario():
+        pipeline = TurnPipeline([
+            Stage("retrieval", fail, default=[]),
+            Stage("context", lambda retrieval: len(retrieval), depends_on=["retrieval"]),
+        ])
+        return pipeline, await pipeline.run()
+
+    pipeline, results = asyncio.run(scenario())
+
+    assert results == {"retrieval": [], "context": 0}
+    assert pipeline.degraded == ["retrieval"]
@@ -0,0 +1,61 @@
+from xml.dom import minidom
+
+from app.services import twiml
+from app.services.twiml import TwiMLTemplates
+
+HOSTILE = 'Tom & Jerry <b>"hi"</b> \x00\x07\x1b bell\ud800 lone \udfff surrogates ￾'
+
+
+def parse(document: bytes):
+    return minidom.parseString(document).documentElement
+
+
+def text_of(element) -> str:
+    return "".join(node.data for node in element.childNodes if node.nodeType == node.TEXT_NODE)
+
+
+def test_incoming_with_a_hostile_greeting_is_well_formed():
+    templates = TwiMLTemplates(greeting=HOSTILE)
+
+    root = parse(templates.incoming())
+
+    assert root.tagName == "Response"
+    greeting = text_of(root.getElementsByTagName("Say")[0])
+    assert greeting.startswith('Tom & Jerry <b>"hi"</b>')
+    assert "\x00" not in greeting and "\ud800" not in greeting
+    assert root.getElementsByTagName("Gather")
+
+
+def test_incoming_stream_url_with_an_ampersand_round_trips():
+    url = 'wss://example.com/webhook/twilio/media?tenant=a&b="c"'
+
+    root = parse(TwiMLTemplates().incoming(stream_url=url))
+
+    assert root.getElementsByTagName("Stream")[0].getAttribute("url") == url
+
+
+def test_turn_with_hostile_llm_text_is_well_formed():
+    templates = TwiMLTemplates()
+
+    for finished in (True, False):
+        document = templates.turn([templates.say(HOSTILE), twiml.say("1 < 2 && 3 > 2")], finished, turn_number=4)
+        spoken = [text_of(verb) for verb in parse(document).getElementsByTagName("Say")]
+        assert spoken[1] == "1 < 2 && 3 > 2"
+
+    redirect = parse(templates.turn([], False, turn_number=4)).getElementsByTagName("Redirect")[0]
+    assert text_of(redirect) == twiml.CONTINUE_ACTION + "?turn=4"
+
+
+def test_transfer_ending_is_well_formed():
+    ending = twiml.call_ending("transfer", "+1 555 <0100> & co")
+
+    root = parse(TwiMLTemplates().turn([twiml.say(HOSTILE)], True, ending=ending))
+
+    assert text_of(root.getElementsByTagName("Dial")[0]) == "+1 555 <0100> & co"
+    assert not root.getElementsByTagName("Gather")
+
+
+def test_call_ending():
+    assert twiml.call_ending("hangup") == "<Hangup/>"
+    assert twiml.call_ending("transfer", None) is None
+    assert twiml.call_ending(None, "+15550100") is None
@@ -0,0 +1,131 @@
+import numpy as np
+import pytest
+
+from app.services.lexical_index import LexicalIndex
+from app.services.vector_store import KnowledgeBaseIndex
+
+
+def build_index(path, rows=8):
+    index = KnowledgeBaseIndex(path)
+    vectors = np.eye(rows, dtype=np.float32)
+    texts = [f"chunk {i}" for i in range(rows)]
+    index.add(vectors, texts, [{"content_hash": f"h{i}"} for i in range(rows)])
+    index.delete(range(0, rows, 2))
+    return index
+
+
+def test_compact_keeps_live_rows(tmp_path):
+    index = build_index(tmp_path)
+    assert index.compact()
+
+    loaded = KnowledgeBaseIndex.load(tmp_path)
+    assert loaded.texts == ["chunk 1", "chunk 3", "chunk 5", "chunk 7"]
+    assert loaded.deleted_count == 0
+    assert not (tmp_path / KnowledgeBaseIndex.COMPACT_COMMIT_DIR).exists()
+
+    rows, _ = loaded.search_exact(np.eye(8, dtype=np.float32)[3], 1)
+    assert loaded.texts[rows[0][0]] == "chunk 3"
+
+
+def test_load_finishes_a_committed_compaction(tmp_path, monkeypatch):
+    index = build_index(tmp_path)
+    # Stop right after the commit, before any file is moved into place
+    monkeypatch.setattr(KnowledgeBaseIndex, "_recover_compaction", classmethod(lambda cls, path: None))
+    index.compact()
+    monkeypatch.undo()
+
+    assert (tmp_path / KnowledgeBaseIndex.COMPACT_COMMIT_DIR / KnowledgeBaseIndex.META_FILE).exists()
+    loaded = KnowledgeBaseIndex.load(tmp_path)
+    assert loaded.texts == ["chunk 1", "chunk 3", "chunk 5", "chunk 7"]
+    assert loaded.vectors.shape == (4, 8)
+
+
+def test_load_ignores_an_uncommitted_compaction(tmp_path):
+    build_index(tmp_path)
+    staging = tmp_path / KnowledgeBaseIndex.COMPACT_STAGING_DIR
+    staging.mkdir()
+    (staging / KnowledgeBaseIndex.VECTORS_FILE).write_bytes(b"partial")
+
+    loaded = KnowledgeBaseIndex.load(tmp_path)
+    assert loaded.count == 8
+    assert loaded.deleted_count == 4
+    assert not staging.exists()
+
+
+def test_failed_compaction_leaves_the_index_unchanged(tmp_path, monkeypatch):
+    index = build_index(tmp_path)
+    index.set_storage_mode("int8")
+
+    def fail(self, path):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(LexicalIndex, "save", fail)
+    with pytest.raises(OSError):
+        index.compact()
+    monkeypatch.undo()
+
+    assert index.count == 8
+    assert index.deleted_count == 4
+    assert len(index.quantized) == 8
+    assert len(index.lexical) == 8
+    rows, _ = index.search_exact(np.eye(8, dtype=np.float32)[3], 1)
+    assert index.texts[rows[0][0]] == "chunk 3"
+
+    # Compacting again once the failure is gone still works
+    assert index.compact()
+    assert len(index.quantized) == len(index.lexical) == 4
+
+
+def test_append_after_an_interrupted_append_keeps_texts_in_step(tmp_path):
+    index = KnowledgeBaseIndex(tmp_path)
+    index.add(np.eye(3, dtype=np.float32)[:2], ["zero", "one"], [{}, {}])
+
+    # A crash after the chunk line was written but before meta.json was updated
+    with open(tmp_path / KnowledgeBaseIndex.CHUNKS_FILE, "a", encoding="utf-8") as f:
+        f.write('{"text": "ORPHAN", "metadata": {}}\n')
+
+    index = KnowledgeBaseIndex.load(tmp_path)
+    index.add(np.eye(3, dtype=np.float32)[2:], ["two"], [{}])
+
+    loaded = KnowledgeBaseIndex.load(tmp_path)
+    assert loaded.texts == ["zero", "one", "two"]
+    rows, _ = loaded.search_exact(np.eye(3, dtype=np.float32)[2], 1)
+    assert loaded.texts[rows[0][0]] == "two"
+
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.calls = 0
+
+    async def aembed_documents(self, texts):
+        self.calls += 1
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+def test_hybrid_search_answers_identifier_queries_lexically(tmp_path):
+    import asyncio
+
+    from app.services.vector_store import VectorStore
+
+    embeddings = CountingEmbeddings()
+    store = VectorStore(embeddings=embeddings, storage_dir=str(tmp_path), storage_mode="float32")
+    texts = ["Order AB1234 shipped on Monday.", "Our office opens at nine.", "Returns take five days."]
+
+    async def scenario():
+        await store.aadd_texts(texts, [{"content_hash": f"h{i}"} for i in range(3)], "kb")
+        calls_after_add = embeddings.calls
+        identifier = await store.ahybrid_search("where is AB1234", "kb", top_k=2)
+        skipped_embedding = embeddings.calls == calls_after_add
+
+        # Once the identifier's chunk is gone the query is embedded as usual
+        await store.aset_document("kb", "doc", "doc", ["h1", "h2"])
+        index = await store.aget_index("kb")
+        index.delete([0])
+        fallback = await store.ahybrid_search("where is AB1234", "kb", top_k=2)
+        return identifier, skipped_embedding, fallback
+
+    identifier, skipped_embedding, fallback = asyncio.run(scenario())
+
+    assert [result.text for result in identifier] == ["Order AB1234 shipped on Monday."]
+    assert skipped_embedding
+    assert fallback and all(result.text != texts[0] for result in fallback)